@@ -1,18 +1,35 @@
 import sys
+from functools import partial
 from pathlib import Path
+from typing import Any
 
 import pandas as pd
 
 from analysis.analyzer.plot_reward import plot_reward
 from analysis.analyzer.plot_reward_dist import plot_reward_distribution
+from analysis.analyzer.resource_profile import export_resource_profile
+from analysis.analyzer.reward_curves import load_reward_curves
 from analysis.analyzer.reward_stats import export_reward_statistics
-from analysis.provider.result_collector import collect_experiment_results
-from analysis.provider.result_synthesizer import synthesize_experiment_results
+from analysis.analyzer.utils.rendering import (
+    DEFAULT_RENDER_OPTIONS,
+    RenderOptions,
+    render_parallel,
+)
+from analysis.provider.result_collector import (
+    collect_experiment_results,
+    collect_resource_samples,
+)
+from analysis.provider.result_cache import CACHE_DIR
+from analysis.provider.result_synthesizer import (
+    synthesize_experiment_results,
+    write_results_tree,
+)
 from app.utils.file_utils import ensure_dirs, ensure_empty_dirs
 
 # analysis parameters
 SMOOTH_WINDOW = 5
 TAIL_EPISODES: int = 1000
+BOOTSTRAP_RESAMPLES: int = 10_000
 
 # parameters for result synthesis
 VARIANTS = ["var_one", "var_two", "var_three", "var_four"]
@@ -20,29 +37,83 @@ RUN_COUNT = 3
 EPISODE_COUNT = 5_000
 
 
-def analyze(result_df: pd.DataFrame, result_dir: Path) -> None:
+def analyze(
+    result_df: pd.DataFrame,
+    result_dir: Path,
+    resource_df: pd.DataFrame | None = None,
+    bootstrap: bool = False,
+    options: RenderOptions = DEFAULT_RENDER_OPTIONS,
+    render_workers: int | None = None,
+) -> None:
     anal_dir = result_dir / "analysis"
     ensure_empty_dirs(anal_dir)
     # run analyzers
-    export_reward_statistics(result_df, TAIL_EPISODES, anal_dir)
-    plot_reward_distribution(result_df, TAIL_EPISODES, anal_dir)
-    plot_reward(result_df, anal_dir, tail=TAIL_EPISODES, smooth=SMOOTH_WINDOW)
+    resamples = BOOTSTRAP_RESAMPLES if bootstrap else None
+    export_reward_statistics(result_df, TAIL_EPISODES, anal_dir, resamples)
+    curves = load_reward_curves(result_df, result_dir / CACHE_DIR, SMOOTH_WINDOW)
+    # render the figures in parallel, passing only the data they need
+    rewards = result_df[["variant", "run", "reward"]]
+    render_parallel(
+        [
+            partial(
+                plot_reward_distribution, rewards, TAIL_EPISODES, anal_dir, options
+            ),
+            partial(
+                plot_reward,
+                curves,
+                anal_dir,
+                tail=TAIL_EPISODES,
+                smooth=SMOOTH_WINDOW,
+                options=options,
+            ),
+        ],
+        render_workers,
+    )
+    if resource_df is not None and not resource_df.empty:
+        export_resource_profile(result_df, resource_df, anal_dir)
 
 
-def collect_and_analyze(result_dir: Path) -> None:
+def collect_and_analyze(
+    result_dir: Path,
+    bootstrap: bool = False,
+    options: RenderOptions = DEFAULT_RENDER_OPTIONS,
+    render_workers: int | None = None,
+) -> None:
     result_df = collect_experiment_results(result_dir)
-    analyze(result_df, result_dir)
+    resource_df = collect_resource_samples(result_dir)
+    analyze(result_df, result_dir, resource_df, bootstrap, options, render_workers)
 
 
 def main() -> None:
+    def arg(name: str, default: Any) -> Any:
+        if name not in sys.argv:
+            return default
+        return type(default)(sys.argv[sys.argv.index(name) + 1])
+
     result_dir = Path(sys.argv[1])
+    bootstrap = "--bootstrap" in sys.argv
+    options = RenderOptions(
+        fmt="png" if "--png" in sys.argv else "svg",
+        rasterized="--rasterize" in sys.argv,
+        max_points=None if "--full-curves" in sys.argv else RenderOptions.max_points,
+    )
     if "--simulate" in sys.argv:  # a poor man's CLI ;-)
         print("Simulating analysis with synthetic data.")
         ensure_dirs(result_dir)
-        result_df = synthesize_experiment_results(VARIANTS, RUN_COUNT, EPISODE_COUNT)
+        variants = VARIANTS
+        if (variant_count := arg("--variants", len(VARIANTS))) != len(VARIANTS):
+            variants = [f"var_{i + 1}" for i in range(variant_count)]
+        runs, episodes = arg("--runs", RUN_COUNT), arg("--episodes", EPISODE_COUNT)
+        result_df = synthesize_experiment_results(variants, runs, episodes)
+        if "--tree" not in sys.argv:
+            analyze(result_df, result_dir, bootstrap=bootstrap, options=options)
+            return
+        # write the results as the logs of the runs, to be collected as usual
+        write_results_tree(result_df, result_dir, columnar="--columnar" in sys.argv)
+        del result_df
+        collect_and_analyze(result_dir, bootstrap, options)
     else:
-        result_df = collect_experiment_results(result_dir)
-    analyze(result_df, result_dir)
+        collect_and_analyze(result_dir, bootstrap, options)
 
 
 if __name__ == "__main__":
@@ -1,69 +1,92 @@
-from copy import deepcopy
 from pathlib import Path
 from typing import Final
 
-import matplotlib.pyplot as plt
 import pandas as pd
-import seaborn as sns
 from analysis.analyzer.utils.coloring import generate_color_mapping
+from analysis.analyzer.utils.rendering import (
+    DEFAULT_RENDER_OPTIONS,
+    RenderOptions,
+    downsample,
+    figure,
+)
+from matplotlib.figure import Figure
 from matplotlib.lines import Line2D
 
 EPSILON_COLOR: Final[str] = "#D95F02"
 FIG_SIZE: Final[tuple[int, int]] = (12, 7)
-plt.rcParams.update({"font.size": 17})
 
 
 def plot_reward(
-    df: pd.DataFrame,
+    curves: pd.DataFrame,
     out_dir: Path,
     *,
     tail: int | None = None,
     smooth: int | None = None,
+    options: RenderOptions = DEFAULT_RENDER_OPTIONS,
 ) -> None:
     """
     Plot the rewards from reinforcement learning experiments.
 
-    The function plots the rewards over episodes and can also highlight the tail-end episodes used for statistical evaluation. Optionally, the reward values can be smoothed for clarity.
+    The function plots the mean reward of each variant over episodes with its confidence interval, and can also highlight the tail-end episodes used for statistical evaluation.
 
     Args:
-        df (pd.DataFrame): Data containing 'reward' and 'episode' columns.
+        curves (pd.DataFrame): The reward curves of the variants, see `aggregate_reward_curves`.
         out_dir (Path): The dir path to save the figure to.
         tail (int?): Number of tail-end episodes used for statistical evaluation.
                               A gray rectangle will be drawn to indicate this span.
                               Defaults to None (no rectangle drawn).
-        smooth (int?): Window size for reward smoothing. If provided, rewards
-                                will be smoothed using a rolling centered mean. Defaults to None (no smoothing).
+        smooth (int?): Window size the rewards of the runs were smoothed with, to
+                                be noted in the figure. Defaults to None (no smoothing).
+        options (RenderOptions, optional): The options to render the figure with,
+                                           curves are downsampled to their max points.
+                                           Defaults to DEFAULT_RENDER_OPTIONS.
     """
-    df = deepcopy(df)
-    if smooth:
-        df.reset_index(drop=True, inplace=True)
-        df["reward"] = (
-            df["reward"].rolling(smooth, center=True, min_periods=smooth).mean()
-        )
-        df["reward"].fillna(method="bfill", inplace=True)
-        df["reward"].fillna(method="ffill", inplace=True)
+    with figure(out_dir / "reward", FIG_SIZE, options) as fig:
+        draw_reward(fig, curves, tail, smooth, options)
+
 
-    # create a figure and a first axis for the reward
-    _, ax1 = plt.subplots(figsize=FIG_SIZE)
+def draw_reward(
+    fig: Figure,
+    curves: pd.DataFrame,
+    tail: int | None,
+    smooth: int | None,
+    options: RenderOptions,
+) -> None:
+    """
+    Draw the rewards on a figure, see `plot_reward`.
+    """
+    # create a first axis for the reward
+    ax1 = fig.subplots()
 
     # create color map
-    variants = df["variant"].unique()
+    variants = curves.index.unique("variant")
     color_map = generate_color_mapping(variants)  # type:ignore
 
     # plot the mean reward and confidence intervals on the first y-axis
-    sns.lineplot(
-        data=df,
-        x="episode",
-        y="reward",
-        hue="variant",
-        ax=ax1,
-        palette=color_map,
-        linewidth=2,
-    )
+    for variant in variants:
+        curve = curves.loc[variant]
+        curve = curve.iloc[downsample(curve.index, curve["mean"].to_numpy(), options)]
+        color = color_map[variant]
+        ax1.plot(
+            curve.index,
+            curve["mean"],
+            color=color,
+            linewidth=2,
+            label=variant,
+            rasterized=options.rasterized,
+        )
+        ax1.fill_between(
+            curve.index,
+            curve["ci_lower"],
+            curve["ci_upper"],
+            color=color,
+            alpha=0.2,
+            rasterized=options.rasterized,
+        )
 
     # add a gray rectangle for evaluation episodes
     if tail:
-        last_episode = df["episode"].max()
+        last_episode = curves.index.get_level_values("episode").max()
         ax1.axvspan(
             last_episode - tail,
             last_episode,
@@ -82,20 +105,15 @@ def plot_reward(
     ax2 = ax1.twinx()
     ax2.set_ylabel("epsilon", fontweight="bold")
 
-    first_variant = df["variant"].iloc[0]
-    eps_df = df[df["variant"] == first_variant]  # assume single epsilon regimen
-    eps_df = eps_df[["episode", "epsilon"]]
-    eps_df["epsilon"] = eps_df["epsilon"].round(2)
-
-    sns.lineplot(
-        data=eps_df,
-        x="episode",
-        y="epsilon",
+    # assume single epsilon regimen
+    epsilon = curves.loc[variants[0], "epsilon"].round(2)
+    epsilon = epsilon.iloc[downsample(epsilon.index, epsilon.to_numpy(), options)]
+    ax2.plot(
+        epsilon.index,
+        epsilon,
         color=EPSILON_COLOR,
-        ax=ax2,
-        legend=False,  # type:ignore
         linewidth=3,
-        errorbar=None,  # to avoid error bars
+        rasterized=options.rasterized,
     )
 
     # get the handles and labels for all lines
@@ -115,8 +133,7 @@ def plot_reward(
         bbox_to_anchor=(0, 0.1),
     )
 
-    # create plot
-    plt.title("Reward and Epsilon over Episodes", fontsize=22)
+    # set the titles
+    ax1.set_title("Reward and Epsilon over Episodes", fontsize=22)
     if smooth:
-        plt.suptitle(f"(Reward smoothed with window size {smooth})", fontsize=16)
-    plt.savefig(out_dir / "reward.svg")
+        fig.suptitle(f"(Reward smoothed with window size {smooth})", fontsize=16)
@@ -1,17 +1,25 @@
 from pathlib import Path
 from typing import Final
 
-import matplotlib.pyplot as plt
 import pandas as pd
 import seaborn as sns
 
 from analysis.analyzer.utils.coloring import generate_color_mapping
+from analysis.analyzer.utils.rendering import (
+    DEFAULT_RENDER_OPTIONS,
+    RenderOptions,
+    figure,
+)
 
 FIG_SIZE: Final[tuple[int, int]] = (12, 7)
-plt.rcParams.update({"font.size": 17})
 
 
-def plot_reward_distribution(data: pd.DataFrame, tail: int, out_dir: Path) -> None:
+def plot_reward_distribution(
+    data: pd.DataFrame,
+    tail: int,
+    out_dir: Path,
+    options: RenderOptions = DEFAULT_RENDER_OPTIONS,
+) -> None:
     """
     Plot the reward distribution of each experiment as violin plots.
 
@@ -19,6 +27,8 @@ def plot_reward_distribution(data: pd.DataFrame, tail: int, out_dir: Path) -> No
         data (pd.DataFrame): The frame holding the experimental data.
         tail (int): The number of episodes from the end to consider.
         out_dir (Path): The dir path to save the figure to.
+        options (RenderOptions, optional): The options to render the figure with.
+            Defaults to DEFAULT_RENDER_OPTIONS.
     """
     # get the last X episodes
     tail_df = data.groupby(["variant", "run"]).tail(tail)
@@ -31,26 +41,30 @@ def plot_reward_distribution(data: pd.DataFrame, tail: int, out_dir: Path) -> No
 
     # exclude 'random_walker' from the dataset
     tail_df = tail_df[tail_df["variant"] != "random_walker"]
+    if isinstance(tail_df["variant"].dtype, pd.CategoricalDtype):
+        tail_df["variant"] = tail_df["variant"].cat.remove_unused_categories()
 
-    # set up the figure and axes
-    plt.figure(figsize=FIG_SIZE)
-    sns.violinplot(
-        x="variant",
-        y="reward",
-        data=tail_df,
-        palette=color_map,
-        inner="quartile",
-        width=1,
-    )
-
-    # set title and labels
-    plt.title("Reward Distribution of DQN Architectures", fontsize=22)
-    plt.xlabel("architecture", fontweight="bold")
-    plt.ylabel("reward", fontweight="bold")
-    plt.xticks(rotation=45)
-    plt.ylim(-21, 21)
-    plt.axhline(0, color="grey", linestyle="--", linewidth=0.5)
-    plt.tight_layout()
-
-    # save the figure
-    plt.savefig(out_dir / "reward_dist.svg")
+    # set up the figure and axes, the figure is saved on exit
+    with figure(out_dir / "reward_dist", FIG_SIZE, options) as fig:
+        ax = fig.subplots()
+        sns.violinplot(
+            x="variant",
+            y="reward",
+            data=tail_df,
+            palette=color_map,
+            inner="quartile",
+            width=1,
+            ax=ax,
+        )
+        if options.rasterized:
+            for collection in ax.collections:
+                collection.set_rasterized(True)
+
+        # set title and labels
+        ax.set_title("Reward Distribution of DQN Architectures", fontsize=22)
+        ax.set_xlabel("architecture", fontweight="bold")
+        ax.set_ylabel("reward", fontweight="bold")
+        ax.tick_params(axis="x", labelrotation=45)
+        ax.set_ylim(-21, 21)
+        ax.axhline(0, color="grey", linestyle="--", linewidth=0.5)
+        fig.tight_layout()
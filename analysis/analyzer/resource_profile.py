@@ -0,0 +1,54 @@
+from pathlib import Path
+
+import pandas as pd
+from analysis.provider.result_collector import join_resource_samples
+
+
+def summarize_resources(resource_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Summarize the resource usage of each run.
+
+    Args:
+        resource_df (pd.DataFrame): The resource samples of all runs.
+
+    Returns:
+        pd.DataFrame: The duration, CPU utilization, i.e. CPU seconds per second,
+            and peak usages per run.
+    """
+    runs = resource_df.assign(cpu=resource_df["cpu_user"] + resource_df["cpu_system"])
+    runs = runs.groupby(["variant", "run"])
+    duration = runs["time"].max() - runs["time"].min()
+    sampled = duration.where(duration > 0)  # a single sample has no utilization
+    return pd.DataFrame(
+        {
+            "duration": duration,
+            "cpu_utilization": (runs["cpu"].max() - runs["cpu"].min()) / sampled,
+            "peak_rss_bytes": runs["rss_bytes"].max(),
+            "peak_replay_bytes": runs["replay_bytes"].max(),
+            "peak_threads": runs["threads"].max(),
+            "peak_torch_reserved_bytes": runs["torch_reserved_bytes"].max(),
+        }
+    )
+
+
+def export_resource_profile(
+    result_df: pd.DataFrame, resource_df: pd.DataFrame, out_dir: Path
+) -> None:
+    """
+    Export the resource usage of variants, overall and along the episodes.
+
+    Args:
+        result_df (pd.DataFrame): The training results.
+        resource_df (pd.DataFrame): The resource samples of all runs.
+        out_dir (Path): The dir path to save the CSV files to.
+    """
+    # peak usage of the variants, the mean and max of their runs
+    summary = summarize_resources(resource_df).groupby("variant")
+    profile = summary.mean().join(summary.max().add_prefix("max_"))
+    profile.round(2).to_csv(out_dir / "resource_profile.csv")
+
+    # memory usage of the variants along the episodes, averaged over their runs
+    joined_df = join_resource_samples(result_df, resource_df)
+    columns = ["rss_bytes", "replay_bytes", "threads", "torch_reserved_bytes"]
+    curves = joined_df.groupby(["variant", "episode"], observed=True)[columns].mean()
+    curves.dropna(how="all").round(0).to_csv(out_dir / "resource_episodes.csv")
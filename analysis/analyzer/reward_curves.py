@@ -0,0 +1,97 @@
+from pathlib import Path
+from typing import Final
+
+import pandas as pd
+from analysis.analyzer.reward_stats import calculate_ci
+
+CURVES_PREFIX: Final[str] = "reward_curves"
+
+# the columns the curves are derived from, to key their cache
+CURVE_INPUTS: Final[list[str]] = ["variant", "run", "episode", "reward", "epsilon"]
+
+
+def smooth_rewards(result_df: pd.DataFrame, window: int) -> pd.Series:
+    """
+    Smooth the reward of each run by a rolling centered mean.
+
+    The mean is rolled over all runs at once, windows spanning two runs are
+    discarded, and the episodes at the edges of each run take the closest mean.
+
+    Args:
+        result_df (pd.DataFrame): The training results, ordered by episode per run.
+        window (int): The window size.
+
+    Returns:
+        pd.Series: The smoothed rewards.
+    """
+    runs = result_df.groupby(["variant", "run"], observed=True, sort=False)
+    position = runs.cumcount()
+    length = runs["episode"].transform("size")
+    rolled = result_df["reward"].rolling(window, center=True, min_periods=window)
+    smoothed = rolled.mean()
+    within_run = (position >= window // 2) & (position < length - (window - 1) // 2)
+    smoothed = smoothed.where(within_run)
+    keys = [result_df["variant"], result_df["run"]]
+    smoothed = smoothed.groupby(keys, observed=True, sort=False).bfill()
+    return smoothed.groupby(keys, observed=True, sort=False).ffill()
+
+
+def aggregate_reward_curves(
+    result_df: pd.DataFrame, smooth: int | None = None
+) -> pd.DataFrame:
+    """
+    Aggregate the reward of each variant per episode over its runs.
+
+    Args:
+        result_df (pd.DataFrame): The training results.
+        smooth (int?): Window size to smooth the reward of each run with before,
+            see `smooth_rewards`. Defaults to None (no smoothing).
+
+    Returns:
+        pd.DataFrame: The mean, std, count and 95% confidence interval of the
+            reward, and the mean epsilon, per variant and episode.
+    """
+    df = result_df[CURVE_INPUTS].sort_values(["variant", "run", "episode"])
+    if smooth:
+        df["reward"] = smooth_rewards(df, smooth)
+    curves = df.groupby(["variant", "episode"], observed=True).agg(
+        mean=("reward", "mean"),
+        std=("reward", "std"),
+        count=("reward", "count"),
+        epsilon=("epsilon", "mean"),
+    )
+    return pd.concat([curves, calculate_ci(curves, "mean", "std", "count")], axis=1)
+
+
+def load_reward_curves(
+    result_df: pd.DataFrame, cache_dir: Path, smooth: int | None = None
+) -> pd.DataFrame:
+    """
+    Return the aggregated reward curves, cached on disk for reuse.
+
+    The cache is keyed by a hash of the results and the smoothing, curves cached
+    for other results are replaced.
+
+    Args:
+        result_df (pd.DataFrame): The training results.
+        cache_dir (Path): The dir to cache the curves in.
+        smooth (int?): Window size to smooth the reward of each run with before.
+            Defaults to None (no smoothing).
+
+    Returns:
+        pd.DataFrame: The curves, see `aggregate_reward_curves`.
+    """
+    inputs = pd.util.hash_pandas_object(result_df[CURVE_INPUTS], index=False)
+    key = f"{int(inputs.sum()) & (2**64 - 1):016x}-{len(result_df)}-{smooth or 0}"
+    cache_file = cache_dir / f"{CURVES_PREFIX}-{key}.parquet"
+    if cache_file.exists():
+        return pd.read_parquet(cache_file)
+
+    curves = aggregate_reward_curves(result_df, smooth)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    for stale_file in cache_dir.glob(f"{CURVES_PREFIX}-*.parquet"):
+        stale_file.unlink(missing_ok=True)
+    tmp_file = cache_dir / f".{cache_file.name}.tmp"
+    curves.to_parquet(tmp_file)
+    tmp_file.replace(cache_file)
+    return curves
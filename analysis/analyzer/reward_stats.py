@@ -3,6 +3,7 @@ from pathlib import Path
 import numpy as np
 import pandas as pd
 import scipy.stats as stats
+from analysis.analyzer.utils import statistics
 
 
 def calculate_ci(
@@ -27,35 +28,89 @@ def calculate_ci(
     return pd.DataFrame({"ci_upper": ci_upper, "ci_lower": ci_lower})
 
 
+def group_rewards(tail_df: pd.DataFrame) -> dict[str, np.ndarray]:
+    """
+    Group the rewards by variant, in a single pass.
+
+    Args:
+        tail_df (pd.DataFrame): The dataframe holding the data.
+
+    Returns:
+        dict[str, np.ndarray]: The rewards by variant, sorted by variant.
+    """
+    groups = tail_df.groupby("variant", observed=True)["reward"]
+    return dict(sorted((str(v), rewards.to_numpy()) for v, rewards in groups))
+
+
 def pairwise_mannwhitneyu(tail_df: pd.DataFrame, out_dir: Path) -> None:
     """
     Perform pairwise Mann-Whitney U tests between all variants and export to CSV.
 
+    All pairs are tested at once, see `statistics.pairwise_mannwhitneyu`.
+
     Args:
         tail_df (pd.DataFrame): The dataframe holding the data.
-        tail (int): Number of episodes to consider from the tail for each run.
+        out_dir (Path): The dir path to save the CSV file to.
     """
-    variants = sorted(tail_df["variant"].unique())
+    rewards = group_rewards(tail_df)
+    variants = list(rewards)
     n_variants = len(variants)
-    p_value_matrix = np.full((n_variants, n_variants), np.nan)
-
-    for i in range(n_variants):
-        for j in range(i + 1, n_variants):
-            # i+1 to skip diagonal and duplicates (since it's symmetric)
-            sample1 = tail_df[tail_df["variant"] == variants[i]]["reward"]
-            sample2 = tail_df[tail_df["variant"] == variants[j]]["reward"]
-            _, p_value = stats.mannwhitneyu(sample1, sample2, alternative="two-sided")
-            # apply Bonferroni correction and fill the symmetric matrix
-            corrected_p_value = min(p_value * n_variants * (n_variants - 1) / 2, 1)
-            p_value_matrix[i, j] = corrected_p_value
-            p_value_matrix[j, i] = corrected_p_value
+    _, p_value_matrix = statistics.pairwise_mannwhitneyu(list(rewards.values()))
 
     # Apply Bonferroni correction
+    p_value_matrix = np.minimum(p_value_matrix * n_variants * (n_variants - 1) / 2, 1)
     comparison_matrix = pd.DataFrame(p_value_matrix, index=variants, columns=variants)
     comparison_matrix.to_csv(out_dir / "reward_pairwise.csv")
 
 
-def export_reward_statistics(result_df: pd.DataFrame, tail: int, out_dir: Path) -> None:
+def rank_rewards(reward_metrics: pd.DataFrame) -> pd.DataFrame:
+    """
+    Rank variants by the 95% confidence interval of their mean reward.
+
+    Args:
+        reward_metrics (pd.DataFrame): The mean, std and count of the reward per
+            variant.
+
+    Returns:
+        pd.DataFrame: The metrics and the confidence interval, ranked by the lower
+            bound of the confidence interval, then by the mean.
+    """
+    ci_df = calculate_ci(reward_metrics, "mean", "std", "count")
+    reward_metrics = pd.concat([reward_metrics, ci_df], axis=1)
+    return reward_metrics.sort_values(["ci_lower", "mean"], ascending=False)
+
+
+def summarize_rewards(result_df: pd.DataFrame, tail: int) -> pd.DataFrame:
+    """
+    Summarize the reward of variants by the tail means of their runs.
+
+    The runs are the independent samples, not the episodes of their tails, which
+    are correlated. Variants of a single run have no confidence interval, they are
+    ranked by the mean after all others.
+
+    Args:
+        result_df (pd.DataFrame): The input DataFrame containing results.
+        tail (int): The number of last records to consider as an plateau assumption.
+
+    Returns:
+        pd.DataFrame: The mean, std, count of runs and 95% confidence interval of the
+            tail means per variant, ranked by the lower bound of the confidence
+            interval.
+    """
+    tail_df = result_df.groupby(["variant", "run"], observed=True).tail(tail)
+    run_means = tail_df.groupby(["variant", "run"], observed=True)["reward"].mean()
+    reward_metrics = run_means.groupby("variant", observed=True).agg(
+        ["mean", "std", "count"]
+    )
+    return rank_rewards(reward_metrics)
+
+
+def export_reward_statistics(
+    result_df: pd.DataFrame,
+    tail: int,
+    out_dir: Path,
+    bootstrap_resamples: int | None = None,
+) -> None:
     """
     Calculate and export statistics on the reward of variants.
 
@@ -63,15 +118,23 @@ def export_reward_statistics(result_df: pd.DataFrame, tail: int, out_dir: Path)
         result_df (pd.DataFrame): The input DataFrame containing results.
         tail (int): The number of last records to consider as an plateau assumption.
         out_dir (Path): The path of the CSV file to export the results to.
+        bootstrap_resamples (int?): The number of resamples to further calculate
+            bootstrap confidence intervals of the mean reward with. Defaults to None
+            (no bootstrap confidence intervals).
     """
     tail_df = result_df.groupby(["variant", "run"]).tail(tail)
-    reward_metrics = tail_df.groupby("variant")["reward"].agg(["mean", "std", "count"])
-    ci_df = calculate_ci(reward_metrics, "mean", "std", "count")
-    reward_metrics = pd.concat([reward_metrics, ci_df], axis=1)
-
-    # rank based on the lower bound of the confidence interval
-    ranked_results = reward_metrics.sort_values("ci_lower", ascending=False)
-    ranked_results = ranked_results.drop(columns="count")
+    reward_metrics = tail_df.groupby("variant", observed=True)["reward"].agg(
+        ["mean", "std", "count"]
+    )
+    ranked_results = rank_rewards(reward_metrics).drop(columns="count")
+    if bootstrap_resamples:
+        rewards = group_rewards(tail_df)
+        samples = list(rewards.values())
+        bounds = statistics.bootstrap_mean_ci(samples, bootstrap_resamples)
+        boot_df = pd.DataFrame(
+            bounds, index=list(rewards), columns=["boot_ci_lower", "boot_ci_upper"]
+        )
+        ranked_results = ranked_results.join(boot_df)
     ranked_results = ranked_results.round(2)
     ranked_results.to_csv(out_dir / "reward_stats.csv")
 
@@ -1,6 +1,6 @@
 from typing import Final
 
-import matplotlib.pyplot as plt
+import matplotlib
 import numpy as np
 
 # see: https://matplotlib.org/stable/tutorials/colors/colormaps.html
@@ -17,6 +17,6 @@ def generate_color_mapping(variants: list[str]) -> dict[str, np.ndarray]:
     Returns:
     - Dict[str, np.ndarray]: A dictionary mapping each experiment to a color.
     """
-    cmap = plt.cm.get_cmap(PALETTE_NAME)  # type:ignore
+    cmap = matplotlib.colormaps[PALETTE_NAME]
     colors = cmap(np.linspace(0, 1, len(variants)))
     return {experiment: colors[i] for i, experiment in enumerate(variants)}
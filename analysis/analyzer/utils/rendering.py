@@ -0,0 +1,158 @@
+import os
+from collections.abc import Callable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Final, Literal
+
+import matplotlib
+import numpy as np
+from matplotlib.figure import Figure
+
+RC_PARAMS: Final[dict[str, int]] = {"font.size": 17}
+
+
+@dataclass(frozen=True)
+class RenderOptions:
+    """Options of rendering figures to files.
+
+    Attributes:
+    fmt (str): The file format, 'svg' or 'png'. Default is 'svg'.
+
+    rasterized (bool):
+        Whether to rasterize the data of SVGs, e.g. lines, keeping text and axes as
+        vectors. Default is False.
+
+    dpi (int): The resolution of PNGs and rasterized data. Default is 100.
+
+    max_points (int?):
+        The max number of points per curve, to downsample longer curves to.
+        If None curves are not downsampled. Default is 1,000.
+    """
+
+    fmt: Literal["svg", "png"] = "svg"
+    rasterized: bool = False
+    dpi: int = 100
+    max_points: int | None = 1_000
+
+
+DEFAULT_RENDER_OPTIONS: Final[RenderOptions] = RenderOptions()
+
+
+def lttb(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    """Select points of a curve preserving its shape, Largest-Triangle-Three-Buckets.
+
+    The first and the last point are kept. The points in between are divided into
+    equally sized buckets, from each the point is kept that forms the largest
+    triangle with the point kept from the previous bucket and the mean of the next
+    bucket.
+
+    Args:
+        x (np.ndarray): The x values, ascending.
+        y (np.ndarray): The y values.
+        max_points (int): The max number of points to keep, at least 3.
+
+    Returns:
+        np.ndarray: The indices of the points to keep, ascending.
+    """
+    n = len(x)
+    if n <= max_points:
+        return np.arange(n)
+    x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, n - 1, max_points - 1).astype(int)
+
+    # the mean of each bucket, the one of the last point following the last bucket
+    sums_x = np.add.reduceat(x[: n - 1], edges[:-1])
+    sums_y = np.add.reduceat(y[: n - 1], edges[:-1])
+    sizes = np.diff(edges)
+    means_x = np.append(sums_x / sizes, x[-1])
+    means_y = np.append(sums_y / sizes, y[-1])
+
+    selected = np.empty(max_points, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    for b in range(max_points - 2):
+        start, end = edges[b], edges[b + 1]
+        a = selected[b]
+        # twice the triangle area for each candidate point of the bucket
+        areas = np.abs(
+            (x[a] - means_x[b + 1]) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (means_y[b + 1] - y[a])
+        )
+        selected[b + 1] = start + np.argmax(areas)
+    return selected
+
+
+def downsample(
+    x: np.ndarray, y: np.ndarray, options: RenderOptions
+) -> np.ndarray | slice:
+    """Select the points of a curve to draw, according to the options.
+
+    Args:
+        x (np.ndarray): The x values, ascending.
+        y (np.ndarray): The y values, whose shape is to be preserved.
+        options (RenderOptions): The options.
+
+    Returns:
+        np.ndarray | slice: The indices of the points to draw, to select the points
+            of related curves with as well.
+    """
+    if options.max_points is None:
+        return slice(None)
+    return lttb(x, y, max(options.max_points, 3))
+
+
+@contextmanager
+def figure(
+    out_file: Path, size: tuple[int, int], options: RenderOptions
+) -> Iterator[Figure]:
+    """Create a figure, to be saved on exit and released afterwards.
+
+    The figure is independent of the global state of pyplot, so that it is
+    released once done, and several figures can be rendered concurrently.
+
+    Args:
+        out_file (Path): The file to save the figure to, without suffix.
+        size (tuple[int, int]): The size of the figure in inches.
+        options (RenderOptions): The options.
+
+    Yields:
+        Figure: The figure to draw on.
+    """
+    with matplotlib.rc_context(RC_PARAMS):
+        fig = Figure(figsize=size)
+        try:
+            yield fig
+            fig.savefig(out_file.with_suffix(f".{options.fmt}"), dpi=options.dpi)
+        finally:
+            fig.clear()
+
+
+def render_parallel(
+    renders: list[Callable[[], None]], max_workers: int | None = None
+) -> None:
+    """Render figures in parallel processes, or in-process for a single worker.
+
+    Args:
+        renders (list[Callable[[], None]]): The picklable functions rendering a
+            figure each, e.g. partial applications of the plot functions.
+        max_workers (int?): The max number of processes. Defaults to None (one per
+            render, up to the number of CPUs).
+
+    Raises:
+        Exception: The first error of a render, after all renders finished, or
+            right away, if rendering in-process.
+    """
+    if not renders:
+        return
+    if max_workers == 1:
+        for render in renders:
+            render()
+        return
+    # spawn, as forking a process with the threads of pyarrow is unsafe
+    max_workers = max_workers or min(len(renders), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers, mp_context=get_context("spawn")) as executor:
+        futures = [executor.submit(render) for render in renders]
+    for future in futures:
+        future.result()
@@ -0,0 +1,101 @@
+from typing import Final
+
+import numpy as np
+from scipy import sparse, stats
+
+# the max number of resampled values to hold in memory at once when bootstrapping
+BOOTSTRAP_CHUNK_SIZE: Final[int] = 10_000_000
+
+
+def pairwise_mannwhitneyu(samples: list[np.ndarray]) -> tuple[np.ndarray, np.ndarray]:
+    """Perform two-sided Mann-Whitney U tests between all pairs of samples.
+
+    Each sample is sorted once, the U statistics of all pairs are derived by
+    counting, for each value, the smaller and equal values of every other sample.
+    The p-values follow from the normal approximation with tie and continuity
+    correction, like `scipy.stats.mannwhitneyu`. Pairs with a sample of at most 8
+    values and no ties are tested exactly by scipy instead, like it does.
+
+    Args:
+        samples (list[np.ndarray]): The samples, e.g. the rewards of each variant.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: The U statistics of the first sample of
+            each pair, and the p-values, as matrices with nan on the diagonal.
+    """
+    sorted_samples = [np.sort(np.asarray(s, dtype=np.float64)) for s in samples]
+    sizes = np.array([len(s) for s in sorted_samples])
+    values = np.concatenate(sorted_samples)
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+
+    # u[i, j]: the number of values of j below each value of i, ties count half
+    u = np.empty((len(samples), len(samples)))
+    for j, sample in enumerate(sorted_samples):
+        below = np.searchsorted(sample, values, side="left")
+        below_or_equal = np.searchsorted(sample, values, side="right")
+        u[:, j] = np.add.reduceat((below + below_or_equal) / 2, starts)
+
+    # tie term: sum of t³ - t over the tied values of each pair, with t = a + b
+    # of both samples, (a + b)³ - (a + b) = a³ - a + b³ - b + 3a²b + 3ab²
+    unique, inverse = np.unique(values, return_inverse=True)
+    groups = np.repeat(np.arange(len(samples)), sizes)
+    counts = sparse.csr_matrix(
+        (np.ones_like(values), (groups, inverse)), shape=(len(samples), len(unique))
+    )
+    counts.sum_duplicates()
+    within = np.asarray((counts.power(3) - counts).sum(axis=1)).ravel()
+    across = (counts.power(2) @ counts.T).toarray()
+    ties = within[:, None] + within[None, :] + 3 * (across + across.T)
+
+    n1, n2 = sizes[:, None], sizes[None, :]
+    n = n1 + n2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sigma = np.sqrt(n1 * n2 / 12 * ((n + 1) - ties / (n * (n - 1))))
+        z = (np.maximum(u, n1 * n2 - u) - n1 * n2 / 2 - 0.5) / sigma
+    p_values = np.clip(2 * stats.norm.sf(z), 0, 1)
+
+    # small samples without ties are tested exactly
+    for i, j in zip(*np.nonzero(((n1 <= 8) | (n2 <= 8)) & (ties == 0))):
+        if i < j:
+            result = stats.mannwhitneyu(samples[i], samples[j], method="exact")
+            p_values[i, j] = p_values[j, i] = result.pvalue
+
+    np.fill_diagonal(u, np.nan)
+    np.fill_diagonal(p_values, np.nan)
+    return u, p_values
+
+
+def bootstrap_mean_ci(
+    samples: list[np.ndarray],
+    resamples: int = 10_000,
+    confidence: float = 0.95,
+    seed: int | None = 0,
+) -> np.ndarray:
+    """Calculate percentile bootstrap confidence intervals of the sample means.
+
+    The resamples of each sample are drawn and averaged as a single matrix, in
+    chunks to bound the memory.
+
+    Args:
+        samples (list[np.ndarray]): The samples, e.g. the rewards of each variant.
+        resamples (int, optional): The number of resamples. Defaults to 10,000.
+        confidence (float, optional): The confidence level. Defaults to 0.95.
+        seed (int?): The seed of the resampling. Defaults to 0.
+
+    Returns:
+        np.ndarray: The lower and upper bounds of each sample, as rows.
+    """
+    rng = np.random.default_rng(seed)
+    alpha = (1 - confidence) / 2
+    bounds = np.empty((len(samples), 2))
+    for i, sample in enumerate(samples):
+        sample = np.asarray(sample, dtype=np.float64)
+        chunk = max(BOOTSTRAP_CHUNK_SIZE // max(len(sample), 1), 1)
+        means = np.concatenate(
+            [
+                sample[rng.integers(0, len(sample), (size, len(sample)))].mean(axis=1)
+                for size in np.diff([*range(0, resamples, chunk), resamples])
+            ]
+        )
+        bounds[i] = np.quantile(means, [alpha, 1 - alpha])
+    return bounds
@@ -0,0 +1,111 @@
+import csv
+import io
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Final, TypeVar
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+
+T = TypeVar("T")
+
+# explicit types of the log columns, all other columns are float32 metrics
+LOG_COLUMN_TYPES: Final[dict[str, pa.DataType]] = {
+    "episode": pa.int32(),
+    "experiment": pa.dictionary(pa.int32(), pa.string()),
+    "variant": pa.dictionary(pa.int32(), pa.string()),
+    "run": pa.int32(),
+    "steps": pa.int32(),
+}
+
+
+def log_column_types(columns: Iterable[str]) -> dict[str, pa.DataType]:
+    """Return the explicit types of the columns of a log.
+
+    Args:
+        columns (Iterable[str]): The column names.
+
+    Returns:
+        dict[str, pa.DataType]: The types by column.
+    """
+    return {c: LOG_COLUMN_TYPES.get(c, pa.float32()) for c in columns}
+
+
+def read_log_table(
+    source: Path | bytes, columns: list[str] | None = None
+) -> tuple[pa.Table, list[str]]:
+    """Parse a CSV log with the explicit types of its columns.
+
+    Args:
+        source (Path | bytes): The log file, or a chunk of its lines.
+        columns (list[str]?): The column names of a chunk without header, None to
+            read them from the header. Defaults to None.
+
+    Returns:
+        tuple[pa.Table, list[str]]: The rows, and the column names.
+    """
+    data = source.read_bytes() if isinstance(source, Path) else source
+    if columns is None:
+        header, _, data = data.partition(b"\n")
+        columns = next(csv.reader([header.decode()]), [])
+    if not data:
+        types = log_column_types(columns)
+        return pa.schema(list(types.items())).empty_table(), columns
+    table = pa_csv.read_csv(
+        io.BytesIO(data),
+        read_options=pa_csv.ReadOptions(column_names=columns),
+        convert_options=pa_csv.ConvertOptions(column_types=log_column_types(columns)),
+    )
+    return table, columns
+
+
+def cast_log_table(table: pa.Table) -> pa.Table:
+    """Cast the columns of a log to their explicit types, e.g. read from Parquet.
+
+    Args:
+        table (pa.Table): The log.
+
+    Returns:
+        pa.Table: The log with the explicit types.
+    """
+    types = log_column_types(table.column_names)
+    return table.cast(pa.schema(list(types.items())))
+
+
+def concat_log_tables(tables: list[pa.Table]) -> pd.DataFrame:
+    """Concatenate logs into a single data frame, converting them only once.
+
+    The columns of the logs are chunked rather than copied when concatenating,
+    columns missing in some logs, e.g. of older runs, are filled with nulls.
+
+    Args:
+        tables (list[pa.Table]): The logs.
+
+    Returns:
+        pd.DataFrame: The logs, `experiment` and `variant` being categorical.
+    """
+    if not tables:
+        return pd.DataFrame()
+    table = pa.concat_tables(tables, promote_options="default")
+    return table.to_pandas(self_destruct=True, split_blocks=True)
+
+
+def map_parallel(
+    fn: Callable[..., T], *iterables: Iterable, max_workers: int | None = None
+) -> list[T]:
+    """Map a function over iterables in a thread pool, e.g. to read files.
+
+    Parsing and I/O release the GIL, hence threads suffice.
+
+    Args:
+        fn (Callable[..., T]): The function to map.
+        max_workers (int?): The max number of threads. Defaults to None (a number
+            of threads depending on the number of CPUs).
+
+    Returns:
+        list[T]: The results, in order.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(fn, *iterables))
@@ -0,0 +1,207 @@
+import hashlib
+import io
+import json
+import os
+from pathlib import Path
+from typing import Any, Final
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from analysis.provider.log_reader import (
+    concat_log_tables,
+    map_parallel,
+    read_log_table,
+)
+
+CACHE_DIR: Final[str] = ".ingest"
+RESULTS_FILE: Final[str] = "results.parquet"
+MANIFEST_FILE: Final[str] = "manifest.json"
+
+# the version of the cache format, caches of other versions are rebuilt
+CACHE_VERSION: Final[int] = 2
+
+# the number of bytes before the resume offset, to verify a log was only appended
+TAIL_BYTES: Final[int] = 4_096
+
+
+def tail_digest(f: io.BufferedReader, offset: int) -> str:
+    """Hash the bytes of a file right before an offset.
+
+    Args:
+        f (io.BufferedReader): The file, opened in binary mode.
+        offset (int): The offset.
+
+    Returns:
+        str: The digest.
+    """
+    f.seek(max(offset - TAIL_BYTES, 0))
+    return hashlib.sha256(f.read(min(offset, TAIL_BYTES))).hexdigest()
+
+
+def is_unchanged(log_file: Path, entry: dict[str, Any]) -> bool:
+    """Check whether a log did not change since it was ingested."""
+    stat = log_file.stat()
+    return stat.st_size == entry["size"] and stat.st_mtime_ns == entry["mtime_ns"]
+
+
+def is_appended(log_file: Path, entry: dict[str, Any]) -> bool:
+    """Check whether a log was only appended to since it was ingested.
+
+    Logs truncated on resuming a run and rewritten since are read anew.
+    """
+    if log_file.stat().st_size < entry["offset"]:
+        return False
+    with open(log_file, "rb") as f:
+        return tail_digest(f, entry["offset"]) == entry["tail"]
+
+
+def read_log_increment(
+    log_file: Path, entry: dict[str, Any] | None = None
+) -> tuple[pa.Table, dict[str, Any]]:
+    """Read the rows of a log appended since it was ingested, or all rows.
+
+    Only complete lines are read, a line being written is left for later.
+
+    Args:
+        log_file (Path): The CSV log.
+        entry (dict[str, Any]?): The manifest entry of the log, None to read all
+            rows. Defaults to None.
+
+    Returns:
+        tuple[pa.Table, dict[str, Any]]: The rows read, and the updated manifest
+            entry of the log.
+    """
+    offset = entry["offset"] if entry else 0
+    stat = log_file.stat()
+    with open(log_file, "rb") as f:
+        f.seek(offset)
+        data = f.read(stat.st_size - offset)
+        data = data[: data.rfind(b"\n") + 1]
+        offset += len(data)
+        tail = tail_digest(f, offset)
+
+    # past the header, unless no line was complete before
+    columns = entry["columns"] if entry and entry["offset"] else None
+    table, columns = read_log_table(data, columns)
+    rows = (entry["rows"] if entry else 0) + table.num_rows
+    return table, {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "offset": offset,
+        "tail": tail,
+        "columns": columns,
+        "rows": rows,
+    }
+
+
+def load_cache(cache_dir: Path) -> tuple[pa.Table, dict[str, dict[str, Any]]]:
+    """Load the consolidated results and the manifest of their logs.
+
+    Args:
+        cache_dir (Path): The cache dir of the experiment.
+
+    Returns:
+        tuple[pa.Table, dict[str, dict[str, Any]]]: The results, and the manifest
+            entries by log, in the order of their rows. Both empty, if not cached
+            (yet), cached in another format, or inconsistent.
+    """
+    try:
+        manifest = json.loads((cache_dir / MANIFEST_FILE).read_text())
+        if manifest.get("version") != CACHE_VERSION:
+            return pa.table({}), {}
+        results = pq.read_table(cache_dir / RESULTS_FILE)
+    except (OSError, ValueError, pa.ArrowException):
+        return pa.table({}), {}
+    entries = manifest["logs"]
+    if results.num_rows != sum(e["rows"] for e in entries.values()):
+        return pa.table({}), {}  # interrupted while saving
+    return results, entries
+
+
+def save_cache(
+    cache_dir: Path, results: pa.Table, entries: dict[str, dict[str, Any]]
+) -> None:
+    """Save the consolidated results and the manifest of their logs, atomically.
+
+    Args:
+        cache_dir (Path): The cache dir of the experiment.
+        results (pa.Table): The results.
+        entries (dict[str, dict[str, Any]]): The manifest entries by log, in the
+            order of their rows.
+    """
+    manifest = {"version": CACHE_VERSION, "logs": entries}
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    for name, write in (
+        (RESULTS_FILE, lambda file: pq.write_table(results, file)),
+        (MANIFEST_FILE, lambda file: file.write_text(json.dumps(manifest))),
+    ):
+        tmp_file = cache_dir / f".{name}.tmp"
+        write(tmp_file)
+        os.replace(tmp_file, cache_dir / name)
+
+
+def ingest_experiment_results(
+    result_dir: Path, log_file: str, max_workers: int | None = None
+) -> pd.DataFrame:
+    """Return all training results of an experiment, reading changed logs only.
+
+    The results are cached in a consolidated columnar file per experiment, along
+    with a manifest of the size, modification time and read offset of each log.
+    Logs appended to since are read from their offset, other changed logs anew,
+    in parallel.
+
+    Args:
+        result_dir (Path): Path to experiment dir.
+        log_file (str): The file name of the CSV logs.
+        max_workers (int?): The max number of threads reading logs.
+            Defaults to None (a number of threads depending on the number of CPUs).
+
+    Returns:
+        pd.DataFrame: The training results, ordered by log.
+    """
+    cache_dir = result_dir / CACHE_DIR
+    cached, entries = load_cache(cache_dir)
+
+    # the first row of each log within the cached results
+    starts, row = {}, 0
+    for source, entry in entries.items():
+        starts[source] = row
+        row += entry["rows"]
+
+    # the cached rows of each log, and the logs to read (from their offset)
+    slices: dict[str, pa.Table] = {}
+    reads: dict[str, tuple[Path, dict[str, Any] | None]] = {}
+    manifest: dict[str, dict[str, Any]] = {}
+    for file in sorted(result_dir.rglob(log_file)):
+        source = file.relative_to(result_dir).as_posix()
+        entry = entries.get(source)
+        if entry and (is_unchanged(file, entry) or is_appended(file, entry)):
+            slices[source] = cached.slice(starts[source], entry["rows"])
+            if is_unchanged(file, entry):
+                manifest[source] = entry
+                continue
+        else:
+            entry = None
+        reads[source] = (file, entry)
+        manifest[source] = {}  # keep the order of the logs
+
+    increments = map_parallel(
+        lambda read: read_log_increment(*read), reads.values(), max_workers=max_workers
+    )
+    for source, (increment, entry) in zip(reads, increments):
+        manifest[source] = entry
+        slices[source] = pa.concat_tables(
+            [slices[source], increment] if source in slices else [increment],
+            promote_options="default",
+        )
+    tables = [slices[source] for source in manifest if slices[source].num_rows]
+
+    if manifest != entries:
+        results = (
+            pa.concat_tables(tables, promote_options="default")
+            if tables
+            else pa.table({})
+        )
+        save_cache(cache_dir, results, manifest)
+    return concat_log_tables(tables)
@@ -2,18 +2,114 @@ from pathlib import Path
 from typing import Final
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from analysis.provider.log_reader import (
+    cast_log_table,
+    concat_log_tables,
+    map_parallel,
+    read_log_table,
+)
+from analysis.provider.result_cache import ingest_experiment_results
 
 LOG_FILE: Final[str] = "train_log.csv"
+LOG_PARTS_DIR: Final[str] = "train_log.parquet"
+RESOURCES_FILE: Final[str] = "resources.csv"
 
 
-def collect_experiment_results(result_dir: Path) -> pd.DataFrame:
+def read_run_table(run_dir: Path) -> pa.Table:
+    """Return the training results of a single run, with the explicit log types.
+
+    The columnar log is read if present, the CSV log of older runs otherwise.
+
+    Args:
+        run_dir (Path): Path to run dir.
+
+    Returns:
+        pa.Table: The training results.
+    """
+    parts_dir = run_dir / LOG_PARTS_DIR
+    if parts_dir.is_dir():
+        table = pq.read_table(parts_dir)
+        return cast_log_table(table.sort_by("episode"))
+    return read_log_table(run_dir / LOG_FILE)[0]
+
+
+def read_run_results(run_dir: Path) -> pd.DataFrame:
+    """Return the training results of a single run.
+
+    Args:
+        run_dir (Path): Path to run dir.
+
+    Returns:
+        pd.DataFrame: The training results.
+    """
+    return concat_log_tables([read_run_table(run_dir)])
+
+
+def collect_experiment_results(
+    result_dir: Path, cache: bool = True, max_workers: int | None = None
+) -> pd.DataFrame:
     """Return all training results as a single data frame.
 
+    The logs are read in parallel, with explicit types: `experiment` and `variant`
+    are categorical, `episode`, `run` and `steps` integers, all metrics float32.
+
     Args:
         result_dir (Path): Path to experiment dir.
+        cache (bool, optional): Whether to read only the logs changed since the
+            last collection, see `ingest_experiment_results`. Defaults to True.
+        max_workers (int?): The max number of threads reading logs.
+            Defaults to None (a number of threads depending on the number of CPUs).
 
     Returns:
         pd.DataFrame: The training results.
     """
-    frames = [pd.read_csv(f) for f in result_dir.rglob(LOG_FILE)]
-    return pd.concat(frames)
+    if cache:
+        return ingest_experiment_results(result_dir, LOG_FILE, max_workers)
+    run_dirs = [f.parent for f in sorted(result_dir.rglob(LOG_FILE))]
+    tables = map_parallel(read_run_table, run_dirs, max_workers=max_workers)
+    return concat_log_tables(tables)
+
+
+def collect_resource_samples(result_dir: Path) -> pd.DataFrame:
+    """Return the resource samples of all runs as a single data frame.
+
+    Args:
+        result_dir (Path): Path to experiment dir.
+
+    Returns:
+        pd.DataFrame: The resource samples, labeled by variant and run, empty if
+            no run was sampled.
+    """
+    frames = [
+        pd.read_csv(f).assign(variant=f.parents[1].name, run=int(f.parent.name))
+        for f in sorted(result_dir.rglob(RESOURCES_FILE))
+        if f.parent.name.isdigit()  # of a run dir
+    ]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def join_resource_samples(
+    result_df: pd.DataFrame, resource_df: pd.DataFrame
+) -> pd.DataFrame:
+    """Join each episode with the latest resource sample of its run up to its end.
+
+    Args:
+        result_df (pd.DataFrame): The training results.
+        resource_df (pd.DataFrame): The resource samples.
+
+    Returns:
+        pd.DataFrame: The training results, with the columns of the resource
+            samples, empty for episodes before the first sample of their run.
+    """
+    # the keys must match in type, e.g. typed results against inferred samples
+    keys = ["variant", "run", "episode"]
+    resource_df = resource_df.astype(result_df[keys].dtypes.to_dict())
+    return pd.merge_asof(
+        result_df.sort_values("episode"),
+        resource_df.drop(columns="time").sort_values("episode"),
+        on="episode",
+        by=["variant", "run"],
+        direction="backward",
+    )
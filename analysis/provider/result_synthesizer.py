@@ -1,10 +1,13 @@
 # %%
+from pathlib import Path
 from typing import Final
 
-import matplotlib.cm as cm
-import matplotlib.pyplot as plt  # type:ignore
-import numpy as np  # type:ignore
-import pandas as pd  # type:ignore
+import numpy as np  # type: ignore
+import pandas as pd  # type: ignore
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+from analysis.provider.log_reader import map_parallel
+from analysis.provider.result_collector import LOG_FILE
 
 experiment: Final[str] = "synthetic_data"
 
@@ -26,73 +29,105 @@ def sigmoid(x: np.ndarray, a: float, b: float, c: float, d: float) -> np.ndarray
     return a / (1.0 + np.exp(-c * (x - b))) + d
 
 
-def synthesize_run_data(
-    var_id: str, run: int, e: int, max_performance: float, inflection_point: int
+def synthesize_experiment_results(
+    experiments: list[str], runs: int, num_episodes: int, seed: int | None = None
 ) -> pd.DataFrame:
     """
-    Generate synthetic data for a single experiment run.
+    Generate synthetic data for all experiment runs.
+
+    The rewards of all variants, runs and episodes are generated at once, as an
+    array of shape (variants, runs, episodes). The max performance of the variants
+    increases by 5 per variant, starting at 15, the inflection point of each run is
+    drawn from 30% to 90% of the episodes. The columns have the types of the collected results.
 
     Args:
-    - var_id: Variant ID.
-    - run: Run number.
-    - e: Number of datapoints (episodes).
-    - max_performance: Maximal performance (height of plateau).
-    - inflection_point: Episode number of the inflection point.
+        experiments (list[str]): The experiment ids.
+        runs (int): Number of runs per experiment to generate.
+        num_episodes (int): Number of episodes to generate per experiment.
+        seed (int?): The seed of the noise. Defaults to None (unseeded).
 
     Returns:
-    - DataFrame holding synthetic data for the experiment run.
+        pd.DataFrame: The generated data, ordered by variant, run and episode.
     """
-    x = np.linspace(0, e, e)
-    noise = np.random.normal(0, max_performance * 0.05, e)
+    rng = np.random.default_rng(seed)
+    n_variants, n_rows = len(experiments), len(experiments) * runs * num_episodes
+    variant_ids = np.arange(1, n_variants + 1, dtype=np.float32)[:, None, None]
+    max_performance = variant_ids * 5 + 10
+    low, high = int(num_episodes * 0.3), int(num_episodes * 0.9)
+    inflection_point = rng.integers(low, max(high, low + 1), (n_variants, runs, 1))
+    inflection_point = inflection_point.astype(np.float32)
 
     # Modify the sigmoid's parameters for the desired behavior
+    x = np.linspace(0, num_episodes, num_episodes, dtype=np.float32)
+    noise = rng.standard_normal((n_variants, runs, num_episodes), dtype=np.float32)
+    noise *= max_performance * 0.05
     y = sigmoid(x, max_performance + 21, inflection_point, 0.005, -21) + noise
-    y = np.clip(y, -21, 21)
+    y = np.clip(y, -21, 21, out=y).astype(np.float32, copy=False)
 
-    epsilons = [max(1.0 - 0.001 * e, 0.1) for e in range(1, e + 1)]
+    episodes = np.arange(1, num_episodes + 1, dtype=np.int32)
+    epsilons = np.maximum(1.0 - 0.001 * episodes, 0.1).astype(np.float32)
 
     # Create the DataFrame
-    df = pd.DataFrame(
+    return pd.DataFrame(
         {
-            "episode": range(1, e + 1),
-            "experiment": experiment,
-            "variant": [var_id] * e,
-            "run": [run] * e,
-            "epsilon": epsilons,
-            "reward": y,
-            "loss": 0.0,
-            "steps": 0,
-            "time": 0.0,
+            "episode": np.tile(episodes, n_variants * runs),
+            "experiment": pd.Categorical.from_codes(
+                np.zeros(n_rows, dtype=np.int8), [experiment]
+            ),
+            "variant": pd.Categorical.from_codes(
+                np.repeat(np.arange(n_variants, dtype=np.int32), runs * num_episodes),
+                experiments,
+            ),
+            "run": np.tile(
+                np.repeat(np.arange(1, runs + 1, dtype=np.int32), num_episodes),
+                n_variants,
+            ),
+            "epsilon": np.tile(epsilons, n_variants * runs),
+            "reward": y.ravel(),
+            "loss": np.zeros(n_rows, dtype=np.float32),
+            "steps": np.zeros(n_rows, dtype=np.int32),
+            "time": np.zeros(n_rows, dtype=np.float32),
         }
     )
 
-    return df
 
-
-def synthesize_experiment_results(
-    experiments: list[str], runs: int, num_episodes: int
-) -> pd.DataFrame:
+def write_results_tree(
+    result_df: pd.DataFrame,
+    result_dir: Path,
+    columnar: bool = False,
+    max_workers: int | None = None,
+) -> None:
     """
-    Generate synthetic data for all experiment runs.
+    Write results as the logs of the runs, as laid out by the training.
 
-    Args:
-        experiments (list[str]): The experiment ids.
-        runs (int): Number of runs per experiment to generate.
-        num_episodes (int): Number of episodes to generate per experiment.
+    Each run gets its `<variant>/<run>/train_log.csv`, to be collected like the
+    results of a real experiment, e.g. to load test the analysis.
 
-    Returns:
-        pd.DataFrame: The generated data.
+    Args:
+        result_df (pd.DataFrame): The results, ordered by variant, run and episode,
+            see `synthesize_experiment_results`.
+        result_dir (Path): The experiment dir to write the logs to.
+        columnar (bool, optional): Whether to write the columnar log of each run
+            as well, as the training does. Defaults to False.
+        max_workers (int?): The max number of threads writing logs. Defaults to
+            None (a number of threads depending on the number of CPUs).
     """
-    all_data = pd.DataFrame()
-    for i, exp in enumerate(experiments):
-        max_performance = (i + 1) * 5 + 10  # Increasing from 15 to 30
-        for j in range(runs):
-            inflection_point = np.random.randint(1500, num_episodes - 500)
-            df = synthesize_run_data(
-                exp, j + 1, num_episodes, max_performance, inflection_point
-            )
-            all_data = pd.concat([all_data, df], ignore_index=True)
-    return all_data
+    from app.utils.logging import log_parts_dir, write_log_part
+
+    table = pa.Table.from_pandas(result_df, preserve_index=False)
+    runs = result_df.groupby(["variant", "run"], observed=True, sort=False).size()
+    offsets = np.concatenate([[0], np.cumsum(runs.to_numpy())[:-1]])
+    options = pa_csv.WriteOptions(quoting_style="none")
+
+    def write_run(key: tuple[str, int], offset: int, length: int) -> None:
+        run_table = table.slice(offset, length)
+        log_file = result_dir / str(key[0]) / str(key[1]) / LOG_FILE
+        log_file.parent.mkdir(parents=True, exist_ok=True)
+        pa_csv.write_csv(run_table, log_file, write_options=options)
+        if columnar:
+            write_log_part(log_parts_dir(log_file), run_table)
+
+    map_parallel(write_run, runs.index, offsets, runs, max_workers=max_workers)
 
 
 # %%
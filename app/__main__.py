@@ -1,23 +1,52 @@
 import pprint
 import sys
+from contextlib import nullcontext
 from dataclasses import asdict, replace
+from functools import partial
 
 from yaml import Loader, dump, load  # type:ignore
 
 sys.dont_write_bytecode = True
 
-from multiprocessing import Pool, cpu_count
 from pathlib import Path
 from typing import Any, Final, Iterable
 
-from analysis.__main__ import collect_and_analyze
 from app.config import Config
-from app.loop import loop
+from app.runner import (
+    ExperimentAnalyzer,
+    JobQueue,
+    NodeBudget,
+    PopulationBasedTraining,
+    RunCache,
+    RunFailure,
+    RunScheduler,
+    SuccessiveHalving,
+    SweepMonitor,
+    read_run_key,
+    remove_run_key,
+    run_key,
+    run_worker,
+    write_run_key,
+)
+from app.runner.monitor import METRICS_PORT
+from app.runner.resources import limit_threads
 from app.utils.file_utils import ensure_dirs
+from app.utils.logging import LogLevel, logger
+from app.utils.run_state import has_snapshot, mark_complete
 
 EXPERIMENT_DIR: Final[Path] = Path("experiments")
 RESULTS_DIR: Final[Path] = Path("results")
-NUM_WORKERS: Final[int] = cpu_count()
+QUEUE_DIR: Final[Path] = Path("queue")
+THREADS_PER_RUN: Final[int] = 1
+
+# modules for the fork server to import once for all workers
+PRELOAD_MODULES: Final[tuple[str, ...]] = (
+    "torch",
+    "gym",
+    "cv2",
+    "app.loop",
+    "app.loop_multi_seed",
+)
 
 
 def copy_orginal_files(files: Iterable[Path], dest_dir: Path) -> None:
@@ -70,24 +99,51 @@ def validate_variants(variants: list[Config]) -> None:
         variants (list[Config]): The configuration instances.
 
     Raises:
-        ValueError: If no experiments are given, or if experiments are duplicated.
+        ValueError: If no experiments are given, if experiments are duplicated, or
+            if multi-seed variants are to be snapshot, which is not supported.
     """
     if not variants:
         raise ValueError("No experiment files found. Exiting.")
     if len(variants) != len(set(variants)):
         raise ValueError("Variants found not to be unique.")
+    for variant in variants:
+        if variant.multi_seed and variant.snapshot_interval:
+            raise ValueError(
+                f"Variant {variant.variant} of {variant.experiment} cannot be "
+                "snapshot, as multi-seed variants do not support resuming."
+            )
 
 
 def multiply_variants(variants: list[Config]) -> list[Config]:
     """Multiply variants to individual runs according to run_count.
 
+    Multi-seed variants are not multiplied, as all their runs are trained at once.
+
     Args:
         variants (list[Config]): The configuration instances.
 
     Returns:
         list[Config]: The multiplied configuration instances.
     """
-    return [replace(v, run=i) for v in variants for i in range(v.run_count)]
+    return [
+        replace(v, run=i)
+        for v in variants
+        for i in range(1 if v.multi_seed else v.run_count)
+    ]
+
+
+def expand_seeds(variant: Config) -> list[Config]:
+    """Expand a multi-seed variant to its individual runs.
+
+    Args:
+        variant (Config): The configuration instance of a multi-seed variant.
+
+    Returns:
+        list[Config]: The configuration instances of the individual runs.
+    """
+    if not variant.multi_seed:
+        return [variant]
+    return [replace(variant, run=i) for i in range(variant.run_count)]
 
 
 def save_experiment(config: Config, file_path: Path) -> None:
@@ -111,27 +167,260 @@ def pretty_print_config(config: Config) -> None:
     print("\n")
 
 
-def run_train_loop(variant) -> None:
+def get_run_dir(config: Config) -> Path:
+    """Provide the result dir of a run.
+
+    Args:
+        config (Config): The configuration instance of the run.
+
+    Returns:
+        Path: The result dir.
+    """
+    return RESULTS_DIR / config.experiment / config.variant / str(config.run)
+
+
+def save_failures(failures: list[RunFailure]) -> None:
+    """Persist the errors of failed runs to their result dirs.
+
+    Args:
+        failures (list[RunFailure]): The failed runs.
+    """
+    for failure in failures:
+        run_dir = get_run_dir(failure.config)
+        ensure_dirs(run_dir)
+        error_file = run_dir / "error.log"
+        error_file.write_text(f"Attempts: {failure.attempts}\n\n{failure.error}")
+        logger.log(str(LogLevel.FAILURE), f"Run failed, see: {error_file}")
+
+
+def plan_runs(
+    variants: list[Config], cache: RunCache
+) -> tuple[list[Config], list[Config]]:
+    """Split runs into those to train and those to reuse from the cache.
+
+    Runs are reused if they have been completed before, with the same
+    configuration and code version. Duplicate runs of the sweep are trained only
+    once and reused by all others.
+
+    Args:
+        variants (list[Config]): The configuration instances of the runs.
+        cache (RunCache): The cache of completed runs.
+
+    Returns:
+        tuple[list[Config], list[Config]]: The runs to train, and to reuse.
+    """
+    to_train: dict[tuple[str, ...], Config] = {}
+    to_reuse: list[Config] = []
+    for variant in variants:
+        runs = expand_seeds(variant)
+        keys = tuple(run_key(r) for r in runs)
+        if all(cache.lookup(r) for r in runs) or keys in to_train:
+            to_reuse.append(variant)
+        else:
+            to_train[keys] = variant
+    return list(to_train.values()), to_reuse
+
+
+def reuse_runs(variants: list[Config], cache: RunCache) -> None:
+    """Materialize the results of completed runs in the result dirs of others.
+
+    Args:
+        variants (list[Config]): The configuration instances of the runs to reuse.
+        cache (RunCache): The cache of completed runs.
+    """
+    for variant in variants:
+        runs = expand_seeds(variant)
+        if not all(cache.lookup(r) for r in runs):
+            continue  # source run not completed (yet)
+        for run in runs:
+            cache.materialize(run, get_run_dir(run))
+        variant_dir = get_run_dir(variant).parent
+        save_experiment(replace(variant, run=None), variant_dir / "variant.yaml")
+
+
+def run_train_loop(variant: Config, reuse_emulator: bool = False) -> None:
     """Prepare and conduct the training of a single run.
 
+    Multi-seed variants conduct the training of all their runs at once.
+    Interrupted runs are resumed, unless their configuration or the code changed,
+    or they are multi-seed runs, which cannot be snapshot.
+
     Args:
-        variant (_type_): The configuration instance of the individual run.
+        variant (Config): The configuration instance of the individual run.
+        reuse_emulator (bool, optional): Whether to reuse the emulator of previous
+            runs of the worker process. Defaults to False.
     """
+    from app.loop import loop
+    from app.loop_multi_seed import loop_multi_seed
+
     # ensure result dirs
-    exp_result_dir = RESULTS_DIR / variant.experiment
-    variant_dir = exp_result_dir / variant.variant
-    run_dir = variant_dir / str(variant.run)
-    ensure_dirs(exp_result_dir, variant_dir, run_dir)
+    runs = expand_seeds(variant)
+    run_dirs = [get_run_dir(r) for r in runs]
+    variant_dir = run_dirs[0].parent
+    ensure_dirs(*run_dirs)
 
     # persist config for reproducibility
     save_experiment(replace(variant, run=None), variant_dir / "variant.yaml")
 
+    # record run keys, a completed run is only valid for its key
+    keys = [run_key(r) for r in runs]
+    resume = has_snapshot(run_dirs[0]) and read_run_key(run_dirs[0]) == keys[0]
+    for run_dir, key in zip(run_dirs, keys):
+        mark_complete(run_dir, False)
+        write_run_key(run_dir, key)
+
+    # start training, resume incomplete runs, multi-seed runs always start over
+    if variant.multi_seed:
+        loop_multi_seed(runs, run_dirs)
+    else:
+        loop(variant, run_dirs[0], resume=resume, reuse_emulator=reuse_emulator)
+
+
+def run_stage(
+    run: Config, reuse_emulator: bool = False, record_key: bool = True
+) -> None:
+    """Prepare and conduct a stage of a single run, for a budget of episodes.
+
+    Used by the sweeps training runs in stages, i.e. successive halving and
+    population based training. The run continues from the snapshot of the
+    previous stage, if any, and keeps its snapshot to be continued by the next.
+    The config of the variant is saved by the sweep, as the stages train with a
+    budget, or with the configuration of another variant.
+
+    Args:
+        run (Config): The configuration instance of the individual run.
+        reuse_emulator (bool, optional): Whether to reuse the emulator of previous
+            runs of the worker process. Defaults to False.
+        record_key (bool, optional): Whether to record the run key, i.e. whether
+            the results may be reused by other sweeps. Defaults to True.
+    """
+    from app.loop import loop
+
+    # ensure result dir
+    run_dir = get_run_dir(run)
+    ensure_dirs(run_dir)
+
+    # record run key, snapshots to continue from are vetted by the sweep
+    mark_complete(run_dir, False)
+    if record_key:
+        write_run_key(run_dir, run_key(run))
+    else:
+        remove_run_key(run_dir)
+
     # start training
-    loop(variant, run_dir)
+    loop(
+        run,
+        run_dir,
+        resume=has_snapshot(run_dir),
+        keep_snapshot=True,
+        reuse_emulator=reuse_emulator,
+    )
+
+
+def save_variants(variants: list[Config]) -> None:
+    """Persist the configs of variants for reproducibility, as configured.
+
+    Args:
+        variants (list[Config]): The configuration instances of the variants.
+    """
+    for variant in variants:
+        variant_dir = get_run_dir(variant).parent
+        ensure_dirs(variant_dir)
+        save_experiment(replace(variant, run=None), variant_dir / "variant.yaml")
+
+
+def run_sweep(
+    scheduler: RunScheduler,
+    variants: list[Config],
+    analyzer: ExperimentAnalyzer,
+    reuse_emulator: bool = False,
+) -> list[RunFailure]:
+    """Conduct all runs of all variants, reusing completed runs.
+
+    Args:
+        scheduler (RunScheduler): The scheduler to conduct the runs.
+        variants (list[Config]): The configuration instances of the variants.
+        analyzer (ExperimentAnalyzer): Analyzes experiments once their runs finish.
+        reuse_emulator (bool, optional): Whether the runs reuse the emulator of
+            previous runs of their worker process. Defaults to False.
+
+    Returns:
+        list[RunFailure]: The runs that failed in all their attempts.
+    """
+    # clone config for each run
+    variants = multiply_variants(variants)
+
+    # skip completed runs, train duplicate runs only once
+    cache = RunCache(RESULTS_DIR)
+    if "--no-cache" in sys.argv:
+        cache.index.clear()
+    variants, reused = plan_runs(variants, cache)
+    logger.log(
+        str(LogLevel.GREEN),
+        f"Training {len(variants)} runs, reusing {len(reused)} cached runs.",
+    )
+
+    reuse_runs(reused, cache)
+
+    # train in parallel, analyze experiments as soon as their runs are finished
+    analyzer.expect(variants)
+    fn = partial(run_train_loop, reuse_emulator=reuse_emulator)
+    failures = scheduler.run(fn, variants, on_finish=analyzer.finish)
+
+    # reuse duplicate runs trained by this sweep
+    reuse_runs(reused, RunCache(RESULTS_DIR))
+    return failures
+
+
+def run_queued(variant: Config) -> None:
+    """Conduct a run claimed from the job queue, unless completed meanwhile.
+
+    Duplicate runs of the sweep are all enqueued, a duplicate claimed after its
+    source completed is reused instead.
+
+    Args:
+        variant (Config): The configuration instance of the individual run.
+    """
+    cache = RunCache(RESULTS_DIR)
+    if all(cache.lookup(r) for r in expand_seeds(variant)):
+        reuse_runs([variant], cache)
+    else:
+        run_train_loop(variant)
+
+
+def enqueue_sweep(variants: list[Config]) -> None:
+    """Enqueue all runs of all variants to be conducted by workers, see `work`.
+
+    Args:
+        variants (list[Config]): The configuration instances of the variants.
+    """
+    # clone config for each run
+    variants = multiply_variants(variants)
+
+    # skip completed runs
+    cache = RunCache(RESULTS_DIR)
+    if "--no-cache" in sys.argv:
+        cache.index.clear()
+    variants = [v for v in variants if not all(map(cache.lookup, expand_seeds(v)))]
+
+    count = JobQueue(QUEUE_DIR).enqueue(variants)
+    logger.log(str(LogLevel.GREEN), f"Enqueued {count} runs to {QUEUE_DIR}")
+
+
+def work() -> None:
+    """Conduct runs of the job queue, until no run is left."""
+    limit_threads(THREADS_PER_RUN)
+    failures = run_worker(JobQueue(QUEUE_DIR), run_queued)
+    save_failures(failures)
 
 
 def train() -> None:
     """Main method to coordinate the entire training process."""
+    # conduct runs enqueued by any node, sharing the file system
+    if "--worker" in sys.argv:
+        work()
+        return
+
     # glob experiment files
     experiment_files = [e for e in EXPERIMENT_DIR.glob("*.yaml")]
     variants = load_experiments(experiment_files)
@@ -139,17 +428,47 @@ def train() -> None:
     # some validation
     validate_variants(variants)
 
-    # clone config for each run
-    variants = multiply_variants(variants)
-
-    # train in parallel
-    with Pool(NUM_WORKERS) as p:
-        p.map(run_train_loop, variants)
-
-    # analyze results
-    result_dirs = [d for d in RESULTS_DIR.glob("*") if d.is_dir()]
-    with Pool(NUM_WORKERS) as p:
-        p.map(collect_and_analyze, result_dirs)
+    # only enqueue runs for workers
+    if "--enqueue" in sys.argv:
+        enqueue_sweep(variants)
+        return
+
+    # train in parallel, within the resource budget of the node, and analyze in the
+    # background, experiments not yet up to date are analyzed on exit at the latest,
+    # optionally serve live metrics of the running runs
+    budget = NodeBudget.detect(threads_per_run=THREADS_PER_RUN)
+    # preloaded workers start fast, their runs further reuse the emulator
+    preloaded = "--preload" in sys.argv
+    preload = PRELOAD_MODULES if preloaded else ()
+    stage = partial(run_stage, reuse_emulator=preloaded)
+    pin = "--pin-cpus" in sys.argv
+    monitor: Any = nullcontext()
+    if "--metrics" in sys.argv:
+        port = METRICS_PORT
+        if "--metrics-port" in sys.argv:
+            port = int(sys.argv[sys.argv.index("--metrics-port") + 1])
+        monitor = SweepMonitor(RESULTS_DIR, port)
+    with (
+        ExperimentAnalyzer(RESULTS_DIR) as analyzer,
+        RunScheduler(budget, pin=pin, preload=preload) as scheduler,
+        monitor,
+    ):
+        if "--halving" in sys.argv:
+            # train only the most promising variants for all episodes
+            save_variants(variants)
+            halving = SuccessiveHalving(scheduler, get_run_dir)
+            failures = halving.run(stage, variants)
+        elif "--pbt" in sys.argv:
+            # train a population, replacing bad hyperparameters along the way, the
+            # results depend on the lineage, so they must not be reused
+            save_variants(variants)
+            pbt = PopulationBasedTraining(
+                scheduler, get_run_dir, copy_replay="--pbt-copy-replay" in sys.argv
+            )
+            failures = pbt.run(partial(stage, record_key=False), variants)
+        else:
+            failures = run_sweep(scheduler, variants, analyzer, preloaded)
+        save_failures(failures)
 
 
 if __name__ == "__main__":
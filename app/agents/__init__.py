@@ -1,6 +1,7 @@
 from typing import Any
 
 from app.agents._dqn_abstract_agent import DqnAbstractAgent
+from app.agents._stacked_learner import StackedDqnLearner
 from app.agents.dqn_basic import BasicDQNAgent
 from app.agents.dqn_double import DoubleDQNAgent
 from app.agents.dqn_dueling import DuelingDQNAgent
@@ -27,4 +28,4 @@ def make_agent(agent_name: str, **kwargs: Any) -> DqnAbstractAgent:
     return agent_(**kwargs)
 
 
-__all__ = ["DqnAbstractAgent", "make_agent"]
+__all__ = ["DqnAbstractAgent", "StackedDqnLearner", "make_agent"]
@@ -3,7 +3,6 @@ from abc import ABC, abstractmethod
 from pathlib import Path
 from typing import Any, NamedTuple, Optional, Self
 
-import lightning.pytorch as pl
 import numpy as np
 import torch
 import torch.nn.functional as F
@@ -12,7 +11,9 @@ from torch import Tensor, nn
 
 from app.memory import ReplayMemory, Transition
 from app.nets import BaseNet
+from app.utils.checkpoint import load_checkpoint, save_checkpoint
 from app.utils.logging import LogLevel, logger
+from app.utils.phase_timer import PhaseTimer
 
 
 class Minibatch(NamedTuple):
@@ -38,7 +39,7 @@ def get_torch_device() -> torch.device:
         return torch.device("cpu")
 
 
-class DqnAbstractAgent(ABC, pl.LightningModule):
+class DqnAbstractAgent(ABC, nn.Module):
     def __init__(
         self: Self,
         state_shape: tuple[int, int, int],
@@ -66,13 +67,17 @@ class DqnAbstractAgent(ABC, pl.LightningModule):
         self.model = net.build_net(self.state_shape, self.num_actions, self.device_)
         self.optimizer = optim.RMSprop(self.model.parameters(), lr=alpha)
         self.scaler = torch.cuda.amp.GradScaler(enabled=self.use_amp)  # type:ignore
+        self.timer = PhaseTimer(sample_interval=0)
+        self.grad_steps = 0  # the number of optimizer steps taken
 
     def replay(self: Self) -> float:
         # sample memory
         sample = self.memory.sample()
+        self.timer.lap("sample")
 
         # convert the minibatch to a more convenient format
         states, actions, rewards, next_states, dones = self._encode_minibatch(sample)
+        self.timer.lap("encode")
 
         # mask dones
         dones = 1 - dones
@@ -96,8 +101,10 @@ class DqnAbstractAgent(ABC, pl.LightningModule):
         # update the weights
         self._update_weights(losses)
 
-        # return losses
-        return losses.mean().item()
+        # return losses, synchronizing with the device
+        loss = losses.mean().item()
+        self.timer.lap("learn")
+        return loss
 
     @abstractmethod
     def _calc_max_q_prime(self: Self, next_states: Tensor) -> float:
@@ -137,8 +144,11 @@ class DqnAbstractAgent(ABC, pl.LightningModule):
         # https://h-huang.github.io/tutorials/recipes/recipes/amp_recipe.html#inspecting-modifying-gradients-e-g-clipping
         self.scaler.unscale_(self.optimizer)
         nn.utils.clip_grad_norm_(self.model.parameters(), max_norm=1.0)  # type: ignore
+        scale = self.scaler.get_scale()
         self.scaler.step(self.optimizer)
         self.scaler.update()
+        # the scaler skips the step on inf or nan gradients, lowering the scale
+        self.grad_steps += self.scaler.get_scale() >= scale
 
     def remember(self: Self, transition: Transition) -> None:
         self.memory.push(transition)
@@ -165,26 +175,64 @@ class DqnAbstractAgent(ABC, pl.LightningModule):
         if self.epsilon > self.epsilon_min:
             self.epsilon -= epsilon_step
 
-    def load(self: Self, name: Path) -> None:
-        """Load model from path.
+    def checkpoint_state(self: Self) -> dict[str, Any]:
+        """Provide the state to be checkpointed.
+
+        Returns:
+            dict[str, Any]: The state dicts of model, optimizer and scaler.
+        """
+        return {
+            "model": self.model.state_dict(),
+            "optimizer": self.optimizer.state_dict(),
+            "scaler": self.scaler.state_dict(),
+        }
+
+    def load_checkpoint_state(self: Self, checkpoint: dict[str, Any]) -> None:
+        """Restore the state from a checkpoint.
 
         Args:
-            name (Path): The path to the model file.
+            checkpoint (dict[str, Any]): The checkpointed state.
         """
-        checkpoint = torch.load(name)
         self.model.load_state_dict(checkpoint["model"])
         self.optimizer.load_state_dict(checkpoint["optimizer"])
         self.scaler.load_state_dict(checkpoint["scaler"])
 
+    def training_state(self: Self) -> dict[str, Any]:
+        """Provide the full state required to resume training.
+
+        In contrast to the checkpoint state, this includes the exploration state.
+        The replay memory is not included, as it is persisted separately.
+
+        Returns:
+            dict[str, Any]: The training state.
+        """
+        return self.checkpoint_state() | {"epsilon": self.epsilon}
+
+    def load_training_state(self: Self, state: dict[str, Any]) -> None:
+        """Restore the full state required to resume training.
+
+        Args:
+            state (dict[str, Any]): The training state.
+        """
+        self.load_checkpoint_state(state)
+        self.epsilon = state["epsilon"]
+
+        # the learning rate is configured, it may differ from the restored one
+        for group in self.optimizer.param_groups:
+            group["lr"] = self.alpha
+
+    def load(self: Self, name: Path) -> None:
+        """Load model from path.
+
+        Args:
+            name (Path): The path to the model file.
+        """
+        self.load_checkpoint_state(load_checkpoint(name))
+
     def save(self: Self, name: Path) -> None:
         """Save model to path.
 
         Args:
             name (Path): The file path to save the model to.
         """
-        checkpoint = {
-            "model": self.model.state_dict(),
-            "optimizer": self.optimizer.state_dict(),
-            "scaler": self.scaler.state_dict(),
-        }
-        torch.save(checkpoint, name)
+        save_checkpoint(self.checkpoint_state(), name)
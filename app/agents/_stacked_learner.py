@@ -0,0 +1,316 @@
+from copy import deepcopy
+from typing import Self
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+from app.agents._dqn_abstract_agent import DqnAbstractAgent
+from app.agents.dqn_basic import BasicDQNAgent
+from app.agents.dqn_double import DoubleDQNAgent
+from torch import Tensor, nn, optim
+from torch.func import functional_call, stack_module_state, vmap
+
+
+class StackedDqnLearner:
+    """Train the networks of several independent agents as one stacked model.
+
+    The parameters of all agents are stacked along a leading seed dimension and
+    the forward pass is vectorized over that dimension with `torch.func.vmap`.
+    Thus, R tiny batch updates are fused into one larger update. Each agent keeps
+    its own replay memory and epsilon, only the learning step is shared.
+
+    As the parameters of the seeds are disjoint, summing the per-seed losses
+    yields exactly the per-seed gradients. Gradient clipping is applied per seed,
+    so is the loss scaling of mixed precision: inf or nan gradients of a seed only
+    skip the step of that seed, as they would when training it alone.
+    """
+
+    def __init__(self: Self, agents: list[DqnAbstractAgent]):
+        if not all(self.supports(a) for a in agents):
+            raise ValueError("Agents do not support stacked training.")
+        if len({type(a) for a in agents}) != 1:
+            raise ValueError("Stacked agents must be of the same type.")
+        self.agents = agents
+        self.device_ = agents[0].device_
+        self.gamma = agents[0].gamma
+        self.use_amp = agents[0].use_amp
+
+        # stateless copy of the network, used as blueprint for the functional call
+        self.base_model = deepcopy(agents[0].model).to("meta")
+        self.params, self.buffers = stack_module_state([a.model for a in agents])
+        self.optimizer = optim.RMSprop(self.params.values(), lr=agents[0].alpha)
+
+        # loss scales per seed, taken from and updated like the scalers of the agents
+        scaler = agents[0].scaler
+        self.scaling = scaler.is_enabled()  # disabled without CUDA
+        self.scales = torch.tensor(
+            [a.scaler.get_scale() for a in agents], device=self.device_
+        )
+        self.growth_trackers = torch.zeros_like(self.scales, dtype=torch.int32)
+        if self.scaling:
+            self.growth_factor = scaler.get_growth_factor()
+            self.backoff_factor = scaler.get_backoff_factor()
+            self.growth_interval = scaler.get_growth_interval()
+
+        # double DQN: stacked target network
+        self.target_net_update_interval: int | None = None
+        self.target_params: dict[str, Tensor] = {}
+        if isinstance(agents[0], DoubleDQNAgent):
+            self.target_net_update_interval = agents[0].target_net_update_interval
+            self.__update_target()
+        self._step_counter: int = 0
+
+    @staticmethod
+    def supports(agent: DqnAbstractAgent) -> bool:
+        """Whether the agent can be trained in stacked form, see `supports_model`.
+
+        Args:
+            agent (DqnAbstractAgent): The agent instance.
+
+        Returns:
+            bool: True if agent is supported.
+        """
+        return StackedDqnLearner.supports_model(agent.name, agent.model)
+
+    @staticmethod
+    def supports_model(agent_name: str, model: nn.Module) -> bool:
+        """Whether an agent with the model can be trained in stacked form.
+
+        Dueling and random agents are not supported, neither are networks holding
+        batch norm layers, as their running stats cannot be updated under vmap.
+
+        Args:
+            agent_name (str): The name of the agent.
+            model (nn.Module): The network of the agent.
+
+        Returns:
+            bool: True if agent and network are supported.
+        """
+        if agent_name not in (BasicDQNAgent.name, DoubleDQNAgent.name):
+            return False
+        batch_norm = nn.modules.batchnorm._BatchNorm
+        return not any(isinstance(m, batch_norm) for m in model.modules())
+
+    @property
+    def num_seeds(self: Self) -> int:
+        return len(self.agents)
+
+    def __update_target(self: Self) -> None:
+        self.target_params = {k: v.detach().clone() for k, v in self.params.items()}
+
+    def _forward(self: Self, params: dict[str, Tensor], x: Tensor) -> Tensor:
+        """Vectorized forward pass of all seeds.
+
+        Args:
+            params (dict[str, Tensor]): The stacked parameters.
+            x (Tensor): The stacked input of shape (seeds, batch, ...).
+
+        Returns:
+            Tensor: The stacked Q-values of shape (seeds, batch, actions).
+        """
+
+        def call(p: dict[str, Tensor], b: dict[str, Tensor], x_: Tensor) -> Tensor:
+            return functional_call(self.base_model, (p, b), (x_,))
+
+        with torch.cuda.amp.autocast(enabled=self.use_amp):  # type: ignore
+            return vmap(call)(params, self.buffers, x)
+
+    @torch.no_grad()
+    def act(self: Self, states: list[np.ndarray]) -> list[int]:
+        """Take greedy actions of all seeds in a single forward pass.
+
+        Args:
+            states (list[np.ndarray]): One state per seed.
+
+        Returns:
+            list[int]: The greedy action per seed.
+        """
+        x = torch.from_numpy(np.stack(states)).to(self.device_).unsqueeze(1)
+        return self._forward(self.params, x).argmax(-1).squeeze(1).tolist()
+
+    def replay(self: Self) -> list[float]:
+        """Conduct one fused learning step for all seeds.
+
+        Returns:
+            list[float]: The loss of each seed.
+        """
+        # target update logic
+        self._step_counter += 1
+        if (
+            self.target_net_update_interval
+            and self._step_counter % self.target_net_update_interval == 0
+        ):
+            self.__update_target()
+
+        # sample each memory and stack along seed dimension
+        batches = [a._encode_minibatch(a.memory.sample()) for a in self.agents]
+        states, actions, rewards, next_states, dones = (
+            torch.stack(t) for t in zip(*batches)
+        )
+
+        # mask dones
+        dones = 1 - dones
+
+        # predict Q-values for the initial states
+        q_a = self._forward(self.params, states).gather(2, actions)
+
+        # calc max q prime value
+        with torch.no_grad():
+            params = self.target_params or self.params
+            max_q_prime = self._forward(params, next_states).max(2)[0].unsqueeze(2)
+
+        # compute the expected Q values
+        target = rewards + self.gamma * max_q_prime * dones
+
+        # calc losses per seed
+        with torch.cuda.amp.autocast(enabled=self.use_amp):  # type: ignore
+            losses = F.smooth_l1_loss(q_a, target, reduction="none").mean(dim=(1, 2))
+
+        # update the weights
+        self._update_weights(losses)
+
+        return losses.detach().tolist()
+
+    def _update_weights(self: Self, losses: Tensor) -> None:
+        self.optimizer.zero_grad(set_to_none=True)
+        if not self.scaling:
+            losses.sum().backward()
+            self.__clip_grad_norm(max_norm=1.0)
+            self.optimizer.step()
+            for agent in self.agents:
+                agent.grad_steps += 1
+            return
+
+        (losses * self.scales).sum().backward()
+        finite = self.__unscale_grads()
+        self.__clip_grad_norm(max_norm=1.0)
+        self.__step(finite)
+        self.__update_scales(finite)
+        for agent, stepped in zip(self.agents, finite.tolist()):
+            agent.grad_steps += stepped
+
+    @torch.no_grad()
+    def __unscale_grads(self: Self) -> Tensor:
+        """Unscale gradients in-place, individually per seed.
+
+        Returns:
+            Tensor: Whether the gradients of each seed are finite.
+        """
+        inv_scales = self.scales.double().reciprocal().float()
+        finite = torch.ones_like(self.scales, dtype=torch.bool)
+        for p in self.params.values():
+            if p.grad is None:
+                continue
+            p.grad.mul_(inv_scales.view(-1, *[1] * (p.grad.dim() - 1)))
+            finite &= p.grad.flatten(1).isfinite().all(dim=1)
+        return finite
+
+    @torch.no_grad()
+    def __step(self: Self, finite: Tensor) -> None:
+        """Step the optimizer for the seeds with finite gradients only.
+
+        The parameters and optimizer state of the other seeds are restored after
+        the step, as a scaler skips the step of a single model.
+        """
+        skipped = (~finite).nonzero().squeeze(1)
+        if not len(skipped):
+            self.optimizer.step()
+            return
+
+        saved = []
+        for p in self.params.values():
+            state = self.optimizer.state.get(p, {})
+            slices = {
+                k: v[skipped].clone()
+                for k, v in state.items()
+                if torch.is_tensor(v) and v.dim()
+            }
+            saved.append((p[skipped].clone(), slices))
+        self.optimizer.step()
+        for p, (param, slices) in zip(self.params.values(), saved):
+            p[skipped] = param
+            # state initialized by this step is reset to its initial zeros
+            for k, v in self.optimizer.state[p].items():
+                if torch.is_tensor(v) and v.dim():
+                    v[skipped] = slices.get(k, 0)
+
+    def __update_scales(self: Self, finite: Tensor) -> None:
+        """Update the loss scales per seed, as a scaler does for a single model."""
+        trackers = torch.where(finite, self.growth_trackers + 1, 0)
+        grow = trackers == self.growth_interval
+        self.scales = torch.where(
+            finite,
+            torch.where(grow, self.scales * self.growth_factor, self.scales),
+            self.scales * self.backoff_factor,
+        )
+        self.growth_trackers = torch.where(grow, 0, trackers).int()
+
+    @torch.no_grad()
+    def __clip_grad_norm(self: Self, max_norm: float) -> None:
+        """Clip gradients to max norm, individually per seed."""
+        grads = [p.grad for p in self.params.values() if p.grad is not None]
+        norms = torch.stack([g.flatten(1).norm(dim=1) for g in grads]).norm(dim=0)
+        coefs = (max_norm / (norms + 1e-6)).clamp(max=1.0)
+        for g in grads:
+            g.mul_(coefs.view(-1, *[1] * (g.dim() - 1)))
+
+    @torch.no_grad()
+    def drop(self: Self, indices: list[int]) -> None:
+        """Drop seeds from the stacked training, e.g. once they finished training.
+
+        The dropped agents are synced before. The remaining seeds keep their
+        weights, optimizer and scaler state, so their training is unaffected.
+
+        Args:
+            indices (list[int]): The indices of the seeds to drop.
+        """
+        self.sync_to_agents()
+        keep = [i for i in range(self.num_seeds) if i not in indices]
+        self.agents = [self.agents[i] for i in keep]
+
+        def select(tensors: dict[str, Tensor]) -> dict[str, Tensor]:
+            return {k: v[keep].clone() for k, v in tensors.items()}
+
+        params = {k: v.requires_grad_() for k, v in select(self.params).items()}
+        optimizer = optim.RMSprop(params.values(), lr=self.agents[0].alpha)
+        for old, new in zip(self.params.values(), params.values()):
+            optimizer.state[new] = {
+                k: v[keep].clone() if torch.is_tensor(v) and v.dim() else deepcopy(v)
+                for k, v in self.optimizer.state.get(old, {}).items()
+            }
+        self.params, self.optimizer = params, optimizer
+        self.buffers = select(self.buffers)
+        self.target_params = select(self.target_params)
+        self.scales = self.scales[keep]
+        self.growth_trackers = self.growth_trackers[keep]
+
+    @torch.no_grad()
+    def sync_to_agents(self: Self) -> None:
+        """Write the stacked weights, optimizer and scaler state back to the agents.
+
+        Required before saving or otherwise inspecting an individual agent.
+        """
+        for i, agent in enumerate(self.agents):
+            state = {k: v[i] for k, v in (self.params | self.buffers).items()}
+            agent.model.load_state_dict(state)
+            if isinstance(agent, DoubleDQNAgent):
+                target = {k: v[i] for k, v in self.target_params.items()}
+                agent.target_model.load_state_dict(state | target)
+                agent._step_counter = self._step_counter
+
+            if self.scaling:
+                agent.scaler.load_state_dict(
+                    agent.scaler.state_dict()
+                    | {
+                        "scale": self.scales[i].item(),
+                        "_growth_tracker": int(self.growth_trackers[i].item()),
+                    }
+                )
+
+            # slice optimizer state of seed
+            for stacked, param in zip(self.params.values(), agent.model.parameters()):
+                stacked_state = self.optimizer.state.get(stacked, {})
+                agent.optimizer.state[param] = {
+                    k: v[i].clone() if torch.is_tensor(v) and v.dim() else deepcopy(v)
+                    for k, v in stacked_state.items()
+                }
@@ -1,5 +1,5 @@
 from copy import deepcopy
-from typing import Self
+from typing import Any, Self
 
 import torch
 from app.agents._dqn_abstract_agent import DqnAbstractAgent
@@ -29,8 +29,20 @@ class DoubleDQNAgent(DqnAbstractAgent):
         self._step_counter += 1
         if self._step_counter % self.target_net_update_interval == 0:
             self.target_model = deepcopy(self.model)
+            self.timer.lap("learn")  # rather than the sampling to come
         return super().replay()
 
+    def training_state(self: Self) -> dict[str, Any]:
+        return super().training_state() | {
+            "target_model": self.target_model.state_dict(),
+            "step_counter": self._step_counter,
+        }
+
+    def load_training_state(self: Self, state: dict[str, Any]) -> None:
+        super().load_training_state(state)
+        self.target_model.load_state_dict(state["target_model"])
+        self._step_counter = state["step_counter"]
+
     @torch.no_grad()
     def _calc_max_q_prime(self: Self, next_states: Tensor) -> float:
         return self.target_model(next_states).max(1)[0].unsqueeze(1)
@@ -1,5 +1,4 @@
-from pathlib import Path
-from typing import Self
+from typing import Any, Self
 
 import torch
 from app.agents._dqn_abstract_agent import DqnAbstractAgent
@@ -58,20 +57,13 @@ class DuelingDQNAgent(DqnAbstractAgent):
             value = self.value(feature)
             return value + advantage - advantage.mean()
 
-    def load(self: Self, name: Path) -> None:
-        checkpoint = torch.load(name)
-        self.model.load_state_dict(checkpoint["model"])
-        self.advantage.load_state_dict(checkpoint["advantage"])
-        self.value.load_state_dict(checkpoint["value"])
-        self.optimizer.load_state_dict(checkpoint["optimizer"])
-        self.scaler.load_state_dict(checkpoint["scaler"])
-
-    def save(self: Self, name: Path) -> None:
-        checkpoint = {
-            "model": self.model.state_dict(),
+    def checkpoint_state(self: Self) -> dict[str, Any]:
+        return super().checkpoint_state() | {
             "advantage": self.advantage.state_dict(),
             "value": self.value.state_dict(),
-            "optimizer": self.optimizer.state_dict(),
-            "scaler": self.scaler.state_dict(),
         }
-        torch.save(checkpoint, name)
+
+    def load_checkpoint_state(self: Self, checkpoint: dict[str, Any]) -> None:
+        super().load_checkpoint_state(checkpoint)
+        self.advantage.load_state_dict(checkpoint["advantage"])
+        self.value.load_state_dict(checkpoint["value"])
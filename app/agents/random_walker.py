@@ -1,11 +1,11 @@
 import random
 from pathlib import Path
-from typing import Self
+from typing import Any, Self
 
 from torch import Tensor
 
 from app.agents._dqn_abstract_agent import DqnAbstractAgent
-from app.memory import Transition
+from app.memory import ReplayMemory, Transition
 
 
 class RandomWalkerAgent(DqnAbstractAgent):
@@ -24,6 +24,8 @@ class RandomWalkerAgent(DqnAbstractAgent):
         self.num_actions = kwargs["action_space"]
         self.epsilon = 0.0
         self.epsilon_min = 0.0
+        self.memory = ReplayMemory(capacity=0, batch_size=0)  # stays empty
+        self.grad_steps = 0  # never learns
 
     def act(self: Self, state) -> int:
         return random.randrange(self.num_actions)
@@ -37,6 +39,18 @@ class RandomWalkerAgent(DqnAbstractAgent):
     def remember(self: Self, transition: Transition) -> None:
         pass
 
+    def checkpoint_state(self: Self) -> dict[str, Any]:
+        return {}
+
+    def load_checkpoint_state(self: Self, checkpoint: dict[str, Any]) -> None:
+        pass
+
+    def training_state(self: Self) -> dict[str, Any]:
+        return {}
+
+    def load_training_state(self: Self, state: dict[str, Any]) -> None:
+        pass
+
     def load(self: Self, name: Path) -> None:
         pass
 
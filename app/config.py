@@ -15,6 +15,12 @@ class Config:
 
     run_count (int): The number of independent runs of an experiment. Default 3.
 
+    multi_seed (bool):
+        Whether to train all runs of a variant in a single process, fusing their
+        updates into one vectorized step. Only the agents 'basic_dqn' and
+        'double_dqn' with the nets 'linear_deep_net' and 'linear_flat_net' are
+        fused, others are trained one run after the other. Default is False.
+
     env_name (str): The environment to be used. Default is 'pong'.
 
     frame_skip (int): The number of frames to skip per action. Default is 4.
@@ -56,10 +62,40 @@ class Config:
         The number of steps after which the model should be saved.
         If None model will be saved at the end of epoch only. Default is None.
 
+    checkpoint_keep (int?):
+        The number of most recent model checkpoints to keep.
+        If None all checkpoints are kept. Default is None.
+
+    checkpoint_compress (bool): Whether to gzip model checkpoints. Default is False.
+
+    snapshot_interval (int?):
+        The number of episodes after which the full training state, including the
+        replay memory, is snapshot to allow resuming an interrupted run.
+        If None no snapshots are taken. Default is None.
+
     video_record_interval (int): Steps between video recordings. Default is 2500.
 
     save_state_img (bool): Whether to take images during training. Default is False.
 
+    phase_timing_interval (int):
+        Time the phases of every n-th step only, e.g. emulator, acting or learning,
+        extrapolating the times per episode. 0 disables timing. Default is 1.
+
+    resource_sample_interval (float?):
+        Seconds between samples of the resource usage of the training process, e.g.
+        CPU time, memory and threads. If None no samples are taken. Default is 10.0.
+
+    profile_episode (int?):
+        The first episode to profile with the torch profiler, saving a Chrome trace
+        and tables of the top operators to the run's result dir. If None no episodes
+        are profiled. Default is None.
+
+    profile_episode_count (int): The number of episodes to profile. Default is 1.
+
+    profile_run (int?):
+        The run to profile. If None all runs of the variant are profiled.
+        Default is 0.
+
     use_amp (bool): Whether to use automatic mixed precision. Default is True.
     """
 
@@ -70,6 +106,7 @@ class Config:
 
     # run_count
     run_count: int = 3
+    multi_seed: bool = False
 
     # environment parameters
     env_name: str = "pong"
@@ -95,10 +132,18 @@ class Config:
 
     # save parameter
     model_save_interval: int | None = None
+    checkpoint_keep: int | None = None
+    checkpoint_compress: bool = False
+    snapshot_interval: int | None = None
     video_record_interval: int = 2_500
 
     # debugging
     save_state_img: bool = False
+    phase_timing_interval: int = 1
+    resource_sample_interval: float | None = 10.0
+    profile_episode: int | None = None
+    profile_episode_count: int = 1
+    profile_run: int | None = 0
 
     # automatic mixed precision
     use_amp: bool = True
@@ -1,10 +1,14 @@
 from typing import Any
 
+import gym
 from app.envs._base_env import BaseEnvWrapper
 from app.envs.pong_env import PongEnvWrapper
 
 env_registry = [PongEnvWrapper]
 
+# emulators of the current process, by name of the environment wrapper
+emulator_cache: dict[str, gym.Env] = {}
+
 
 def make_env(name: str, **kwargs: Any) -> BaseEnvWrapper:
     """Create environment wrapper of provided name.
@@ -19,4 +23,23 @@ def make_env(name: str, **kwargs: Any) -> BaseEnvWrapper:
     return env_(**kwargs)
 
 
-__all__ = ["BaseEnvWrapper", "make_env"]
+def acquire_env(name: str, **kwargs: Any) -> BaseEnvWrapper:
+    """Create environment wrapper of provided name, reusing the emulator.
+
+    The emulator is created once per process and reused by all subsequent wrappers
+    of the same name, sparing a run the initialization of the emulator and its ROM.
+    Only a single wrapper of a name may be in use at a time.
+
+    Args:
+        name (str): The identifier string of the environment wrapper.
+
+    Returns:
+        BaseEnvWrapper: A wrapper instance of the environment.
+    """
+    env_ = next(e for e in env_registry if e.name == name)
+    if name not in emulator_cache:
+        emulator_cache[name] = env_.make_emulator()
+    return env_(emulator=emulator_cache[name], **kwargs)
+
+
+__all__ = ["BaseEnvWrapper", "acquire_env", "make_env"]
@@ -8,6 +8,7 @@ import numpy as np
 from gym.spaces import Discrete
 
 from app.envs.step import Step
+from app.utils.phase_timer import PhaseTimer
 
 
 class BaseEnvWrapper(gym.Wrapper, ABC):
@@ -39,22 +40,29 @@ class BaseEnvWrapper(gym.Wrapper, ABC):
         # TODO: Make getter returning slice
         raise NotImplementedError()
 
+    @classmethod
+    def make_emulator(cls) -> gym.Env:
+        """Create the Atari environment, loading its ROM."""
+        env = gym.make(cls.env_name, render_mode="rgb_array")
+        env.metadata["render_fps"] = 25
+        return env
+
     def __init__(
         self: Self,
         state_dims: tuple[int, int],
         skip: int = 1,
         step_penalty: float = 0.0,
         stack_size: int = 1,
+        emulator: gym.Env | None = None,
     ):
-        env = gym.make(self.env_name, render_mode="rgb_array")
-        env.metadata["render_fps"] = 25
-        super().__init__(env)
+        super().__init__(emulator or self.make_emulator())
         self.state_dims = state_dims
         self.action_space = Discrete(len(self.valid_actions))
         self.skip = skip
         self.step_penalty = step_penalty
         self.stack_size = stack_size
         self.state_buffer: deque[np.ndarray] = deque([], maxlen=self.stack_size)
+        self.timer = PhaseTimer(sample_interval=0)
 
     def step(self: Self, action: int) -> Step:  # type:ignore
         action = list(self.valid_actions)[action]  # map to env action
@@ -70,15 +78,21 @@ class BaseEnvWrapper(gym.Wrapper, ABC):
 
         if total_reward == 0:
             total_reward = -self.step_penalty
+        self.timer.lap("emulator")
 
         self.state_buffer.append(self.__preprocess_state(next_state, self.state_dims))
         stacked_state = self.__stack_frames(self.state_buffer)
+        self.timer.lap("preprocess")
         return Step(stacked_state, total_reward, done)
 
     def reset(self: Self) -> np.ndarray:  # type:ignore
-        state = self.__preprocess_state(self.env.reset()[0], self.state_dims)
+        observation = self.env.reset()[0]
+        self.timer.lap("emulator")
+        state = self.__preprocess_state(observation, self.state_dims)
         self.state_buffer = deque([state] * self.stack_size, maxlen=self.stack_size)
-        return self.__stack_frames(self.state_buffer)
+        stacked_state = self.__stack_frames(self.state_buffer)
+        self.timer.lap("preprocess")
+        return stacked_state
 
     @staticmethod
     def __stack_frames(state_buffer: deque[np.ndarray]) -> np.ndarray:
@@ -1,40 +1,39 @@
 import random
+import shutil
 from pathlib import Path
 from typing import Final
 
-import cv2 as cv
 import numpy as np
 import torch
 from app.agents import DqnAbstractAgent, make_agent
 from app.config import Config
-from app.envs import BaseEnvWrapper, make_env
+from app.envs import BaseEnvWrapper, acquire_env, make_env
 from app.memory import Transition
 from app.nets import BaseNet, make_net
-from app.utils.file_utils import ensure_empty_dirs
+from app.utils.checkpoint import CheckpointWriter
+from app.utils.file_utils import ensure_dirs, ensure_empty_dirs
 from app.utils.logging import EpisodeLog, EpisodeLogger, LogLevel
-from app.utils.silence_stdout import silence_stdout
-from gym.wrappers.monitoring import video_recorder as vr
-
-
-def take_picture_of_state(state: np.ndarray, f_name: Path) -> None:
-    """Save brightened picture of current state to file.
-
-    Args:
-        state (np.ndarray): The state to taken picture of.
-        f_name (Path): The file path to save to.
-    """
-    state_transposed = np.transpose(state, (1, 2, 0))
-    state_transposed *= 255  # type:ignore | increase brightness
-    cv.imwrite(str(f_name), state_transposed)
+from app.utils.media_encoder import MediaEncoder, VideoCapture
+from app.utils.metrics import MetricsWriter
+from app.utils.phase_timer import PhaseTimer
+from app.utils.profiler import PROFILE_DIR, EpisodeProfiler, profile_episodes
+from app.utils.resource_sampler import RESOURCES_FILE, ResourceSampler
+from app.utils.run_state import (
+    load_snapshot,
+    mark_complete,
+    remove_snapshot,
+    save_snapshot,
+)
 
 
 def run_episode(
     agent: DqnAbstractAgent,
     env: BaseEnvWrapper,
     episode_log: EpisodeLog,
-    recorder: vr.VideoRecorder | None,
+    recorder: VideoCapture | None,
     img_dir: Path,
-    save_img: bool = False,
+    media: MediaEncoder | None = None,
+    timer: PhaseTimer | None = None,
 ) -> None:
     """Run single episode.
 
@@ -42,28 +41,38 @@ def run_episode(
         agent (DqnAbstractAgent): The agent instance.
         env (BaseEnvWrapper): The environment instance.
         episode_log (EpisodeLog): The episode logger instance.
-        recorder (vr.VideoRecorder | None): The video recorder instance.
+        recorder (VideoCapture | None): The video capture instance.
         img_dir (Path): Path to save images to.
-        save_img (bool, optional): Whether to save image states. Defaults to False.
+        media (MediaEncoder?): The encoder to save image states with, None to not
+            save image states. Defaults to None.
+        timer (PhaseTimer?): The timer shared with agent and environment, to record
+            the time per phase of the steps in the episode log. Defaults to None.
     """
+    timer = timer or PhaseTimer(sample_interval=0)
+    timer.reset()
 
     # reset environment
+    timer.tick()
     state = env.reset()
 
     done = False
     while not done:
         # prepare step
+        timer.tick()
         episode_log.steps += 1
         if recorder:
             recorder.capture_frame()
+        timer.lap("log")
 
         # act & observe
         action = agent.act(state)
+        timer.lap("act")
         next_state, reward, done = env.step(action)
 
         # save experience
         transition = Transition(state, action, reward, next_state, done)
         agent.remember(transition)
+        timer.lap("remember")
 
         # update policy network
         episode_log.loss += agent.replay()
@@ -73,41 +82,39 @@ def run_episode(
         episode_log.reward += reward
 
         # take picture of state randomly
-        if save_img and random.choices([True, False], [1, 512], k=1)[0]:
+        if media and random.choices([True, False], [1, 512], k=1)[0]:
             img_file = img_dir / f"{episode_log.episode}_{episode_log.steps}.png"
-            take_picture_of_state(state, img_file)
+            media.save_image(img_file, state)
+        timer.lap("log")
 
+    episode_log.record_phases(timer.seconds())
 
-def loop(config: Config, result_dir: Path) -> None:
-    """Run all episodes.
+
+def calc_input_shape(config: Config) -> tuple[int, int, int]:
+    """Calculate the input shape of the model.
 
     Args:
-        config (Config): The configuration object, holding the experiment parameters.
-        result_dir (Path): The dir to save experiment results to.
+        config (Config): The configuration object.
+
+    Returns:
+        tuple[int, int, int]: The input shape.
     """
-    # define and prepare result dirs
-    model_dir: Final[Path] = result_dir / "model"
-    video_dir: Final[Path] = result_dir / "video"
-    img_dir: Final[Path] = result_dir / "img"
-    ensure_empty_dirs(model_dir, video_dir, img_dir)
+    return (1, config.input_dim * config.num_stacked_frames, config.input_dim)
 
-    # calculate input shape
-    input_shape: Final[tuple[int, int, int]] = (
-        1,
-        config.input_dim * config.num_stacked_frames,
-        config.input_dim,
-    )
 
-    # configure torch
-    torch.autograd.set_detect_anomaly(False)  # type: ignore
-    torch.autograd.profiler.emit_nvtx(enabled=False)
-    torch.autograd.profiler.profile(enabled=False)
+def create_env(config: Config, reuse_emulator: bool = False) -> BaseEnvWrapper:
+    """Create environment according to configuration.
 
-    # set seed for reproducibility
-    np.random.seed(config.run)
+    Args:
+        config (Config): The configuration object.
+        reuse_emulator (bool, optional): Whether to reuse the emulator of previous
+            runs of the process. Defaults to False.
 
-    # create environment
-    env = make_env(
+    Returns:
+        BaseEnvWrapper: The environment instance.
+    """
+    make = acquire_env if reuse_emulator else make_env
+    return make(
         config.env_name,
         state_dims=(config.input_dim, config.input_dim),
         skip=config.frame_skip,
@@ -115,11 +122,21 @@ def loop(config: Config, result_dir: Path) -> None:
         stack_size=config.num_stacked_frames,
     )
 
-    # create the policy network
-    agent: DqnAbstractAgent = make_agent(
+
+def create_agent(config: Config, env: BaseEnvWrapper) -> DqnAbstractAgent:
+    """Create agent according to configuration.
+
+    Args:
+        config (Config): The configuration object.
+        env (BaseEnvWrapper): The environment the agent is acting in.
+
+    Returns:
+        DqnAbstractAgent: The agent instance.
+    """
+    return make_agent(
         config.agent_name,
         net=make_net(config.net_name),
-        state_shape=input_shape,
+        state_shape=calc_input_shape(config),
         action_space=env.action_space.n,  # type: ignore
         gamma=config.gamma,
         alpha=config.alpha,
@@ -129,52 +146,172 @@ def loop(config: Config, result_dir: Path) -> None:
         target_net_update_interval=config.target_net_update_interval,
     )
 
-    # init logger
+
+def configure_torch() -> None:
+    """Disable torch debugging facilities."""
+    torch.autograd.set_detect_anomaly(False)  # type: ignore
+    torch.autograd.profiler.emit_nvtx(enabled=False)
+    torch.autograd.profiler.profile(enabled=False)
+
+
+def is_save_episode(config: Config, episode: int) -> bool:
+    """Whether the model is to be saved after the given episode.
+
+    Args:
+        config (Config): The configuration object.
+        episode (int): The episode index.
+
+    Returns:
+        bool: True if model is to be saved.
+    """
+    return episode > 0 and (
+        bool(config.model_save_interval and episode % config.model_save_interval == 0)
+        or episode == config.episodes  # always save at end of epoch
+    )
+
+
+def is_snapshot_episode(config: Config, episode: int) -> bool:
+    """Whether the training state is to be snapshot after the given episode.
+
+    Args:
+        config (Config): The configuration object.
+        episode (int): The episode index.
+
+    Returns:
+        bool: True if training state is to be snapshot.
+    """
+    return bool(
+        config.snapshot_interval
+        and episode % config.snapshot_interval == 0
+        and episode < config.episodes
+    )
+
+
+def loop(
+    config: Config,
+    result_dir: Path,
+    resume: bool = False,
+    keep_snapshot: bool = False,
+    reuse_emulator: bool = False,
+) -> None:
+    """Run all episodes.
+
+    Args:
+        config (Config): The configuration object, holding the experiment parameters.
+        result_dir (Path): The dir to save experiment results to.
+        resume (bool, optional): Whether to resume from the snapshot in the result
+            dir, if there is any. Defaults to False.
+        keep_snapshot (bool, optional): Whether to snapshot the training state on
+            completion, to continue training for more episodes later.
+            Defaults to False.
+        reuse_emulator (bool, optional): Whether to reuse the emulator of previous
+            runs of the worker process, see `acquire_env`. Defaults to False.
+    """
+    # define result dirs
+    model_dir: Final[Path] = result_dir / "model"
+    video_dir: Final[Path] = result_dir / "video"
+    img_dir: Final[Path] = result_dir / "img"
+
+    # configure torch
+    configure_torch()
+
+    # set seed for reproducibility
+    np.random.seed(config.run)
+
+    # create environment, runs of a worker process are conducted one at a time
+    env = create_env(config, reuse_emulator)
+
+    # create the policy network
+    agent = create_agent(config, env)
+
+    # time the phases of the steps, shared by loop, agent and environment
+    timer = PhaseTimer(config.phase_timing_interval)
+    agent.timer = env.timer = timer
+
+    # init the writers of logs, metrics, resources, media, profiles and checkpoints
     logger = EpisodeLogger(log_file=result_dir / "train_log.csv")
+    metrics = MetricsWriter(result_dir)
+    sampler = ResourceSampler(
+        result_dir / RESOURCES_FILE, agent.memory, config.resource_sample_interval
+    )
+    media = MediaEncoder()
+    profiler = EpisodeProfiler(result_dir / PROFILE_DIR, profile_episodes(config))
+    checkpoints = CheckpointWriter(config.checkpoint_keep, config.checkpoint_compress)
 
-    # run main loop
-    for episode in range(1, config.episodes + 1):
-        # init episode logger
-        episode_log = EpisodeLog(
-            episode=episode,
-            epsilon=agent.epsilon,
-            experiment=config.experiment,
-            variant=config.variant,
-            run=config.run,
-        )
-        episode_log.start_timer()
-
-        # set up the video recorder
-        recorder = None
-        if episode % config.video_record_interval == 0:
-            video_path = str(video_dir / f"{env.name}_{agent.name}_{episode}.mp4")
-            logger.log(f"Recording video: {video_path}", LogLevel.VIDEO)
-            recorder = vr.VideoRecorder(env, video_path)
-
-        # run episode
-        run_episode(agent, env, episode_log, recorder, img_dir, config.save_state_img)
-
-        # log episode
-        episode_log.stop_timer()
-        logger.log(episode_log)
-
-        # update epsilon
-        if episode >= config.epsilon_decay_start:
-            # TODO: Implement some form of logging
-            # FIXME: The epsilon update is messed up, shared between loop and agent
-            agent.update_epsilon(config.epsilon_step)
-
-        # save model
-        if episode > 0 and (
-            (config.model_save_interval and episode % config.model_save_interval == 0)
-            or episode == config.episodes  # always save at end of epoch
-        ):
-            model_file = model_dir / f"{episode}.pth"
-            logger.log(f"Saving model: {model_file}", LogLevel.SAVE)
-            agent.save(model_file)
-
-        # close the video recorder
-        if recorder:
-            # shut the f*ck up, moviepy!
-            with silence_stdout():
+    # resume from snapshot or prepare result dirs for a fresh start
+    mark_complete(result_dir, False)
+    last_episode = load_snapshot(result_dir, agent) if resume else None
+    if last_episode is not None:
+        logger.log(f"Resuming after episode {last_episode}", LogLevel.GREEN)
+        ensure_dirs(model_dir, video_dir, img_dir)
+    else:
+        last_episode = 0
+        remove_snapshot(result_dir)
+        ensure_empty_dirs(model_dir, video_dir, img_dir)
+        (result_dir / RESOURCES_FILE).unlink(missing_ok=True)
+        shutil.rmtree(result_dir / PROFILE_DIR, ignore_errors=True)
+    logger.truncate(last_episode)
+
+    # run main loop while sampling resources, flush the buffered episode logs and
+    # write the pending media and profiles on exit, even on failure
+    with logger, sampler, media, profiler:
+        for episode in range(last_episode + 1, config.episodes + 1):
+            sampler.episode = episode
+
+            # init episode logger
+            episode_log = EpisodeLog(
+                episode=episode,
+                epsilon=agent.epsilon,
+                experiment=config.experiment,
+                variant=config.variant,
+                run=config.run,
+            )
+            episode_log.start_timer()
+
+            # set up the video capture, encoded in the background
+            recorder = None
+            if episode % config.video_record_interval == 0:
+                video_path = video_dir / f"{env.name}_{agent.name}_{episode}.mp4"
+                logger.log(f"Recording video: {video_path}", LogLevel.VIDEO)
+                recorder = media.record(env, video_path)
+
+            # run episode, profile it if selected
+            img_media = media if config.save_state_img else None
+            profiler.start_episode(episode)
+            run_episode(agent, env, episode_log, recorder, img_dir, img_media, timer)
+            profiler.end_episode(episode)
+
+            # log episode
+            episode_log.stop_timer()
+            logger.log(episode_log)
+            metrics.update(episode_log, agent.memory.fill, agent.grad_steps)
+
+            # update epsilon
+            if episode >= config.epsilon_decay_start:
+                # TODO: Implement some form of logging
+                # FIXME: The epsilon update is messed up, shared between loop and agent
+                agent.update_epsilon(config.epsilon_step)
+
+            # save model
+            if is_save_episode(config, episode) and (state := agent.checkpoint_state()):
+                checkpoints.submit(state, model_dir / f"{episode}.pth")
+
+            # complete the video, to be encoded in the background
+            if recorder:
                 recorder.close()
+
+            # snapshot training state
+            if is_snapshot_episode(config, episode):
+                logger.flush()
+                save_snapshot(result_dir, episode, agent)
+
+    # wait for pending checkpoints, publish final metrics
+    checkpoints.close()
+    metrics.write()
+
+    # snapshot is obsolete once the run is complete, unless it is to be continued
+    if keep_snapshot:
+        save_snapshot(result_dir, config.episodes, agent)
+    else:
+        remove_snapshot(result_dir)
+    mark_complete(result_dir)
@@ -0,0 +1,285 @@
+import shutil
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Self
+
+import numpy as np
+import torch
+from app.agents import DqnAbstractAgent, StackedDqnLearner
+from app.config import Config
+from app.envs import BaseEnvWrapper
+from app.loop import (
+    calc_input_shape,
+    configure_torch,
+    create_agent,
+    create_env,
+    is_save_episode,
+    loop,
+)
+from app.memory import Transition
+from app.nets import make_net
+from app.utils.checkpoint import CheckpointWriter
+from app.utils.file_utils import ensure_empty_dirs
+from app.utils.logging import EpisodeLog, EpisodeLogger, LogLevel, logger
+from app.utils.media_encoder import MediaEncoder, VideoCapture
+from app.utils.metrics import MetricsWriter
+from app.utils.profiler import PROFILE_DIR, EpisodeProfiler, profile_episodes
+from app.utils.resource_sampler import RESOURCES_FILE, ResourceSampler
+from app.utils.run_state import mark_complete
+
+
+@dataclass
+class Seed:
+    """The state of a single seed trained by the multi-seed loop."""
+
+    config: Config
+    result_dir: Path
+    env: BaseEnvWrapper
+    agent: DqnAbstractAgent
+    logger: EpisodeLogger
+    metrics: MetricsWriter
+    checkpoints: CheckpointWriter
+    media: MediaEncoder
+    profiler: EpisodeProfiler
+    sampler: ResourceSampler
+    rng: np.random.Generator
+    episode: int = 0
+    state: np.ndarray = field(init=False)
+    episode_log: EpisodeLog = field(init=False)
+    recorder: VideoCapture | None = None
+
+    @property
+    def active(self: Self) -> bool:
+        return self.episode <= self.config.episodes
+
+    @property
+    def model_dir(self: Self) -> Path:
+        return self.result_dir / "model"
+
+    @property
+    def video_dir(self: Self) -> Path:
+        return self.result_dir / "video"
+
+    @property
+    def img_dir(self: Self) -> Path:
+        return self.result_dir / "img"
+
+    def start_episode(self: Self) -> None:
+        """Advance to the next episode, unless all episodes are done."""
+        self.episode += 1
+        if not self.active:
+            return
+
+        self.episode_log = EpisodeLog(
+            episode=self.episode,
+            epsilon=self.agent.epsilon,
+            experiment=self.config.experiment,
+            variant=self.config.variant,
+            run=self.config.run,
+        )
+        self.episode_log.start_timer()
+        self.sampler.episode = self.episode
+
+        if self.episode % self.config.video_record_interval == 0:
+            video_name = f"{self.env.name}_{self.agent.name}_{self.episode}.mp4"
+            video_path = self.video_dir / video_name
+            self.logger.log(f"Recording video: {video_path}", LogLevel.VIDEO)
+            self.recorder = self.media.record(self.env, video_path)
+
+        self.profiler.start_episode(self.episode)
+        self.state = self.env.reset()
+
+    def step(self: Self, action: int) -> bool:
+        """Conduct a single environment step.
+
+        Args:
+            action (int): The action to take.
+
+        Returns:
+            bool: Whether the episode is done.
+        """
+        self.episode_log.steps += 1
+        if self.recorder:
+            self.recorder.capture_frame()
+
+        next_state, reward, done = self.env.step(action)
+        self.agent.remember(Transition(self.state, action, reward, next_state, done))
+        self.state = next_state
+        self.episode_log.reward += reward
+
+        if self.config.save_state_img and self.rng.random() < 1 / 513:
+            img_file = self.img_dir / f"{self.episode}_{self.episode_log.steps}.png"
+            self.media.save_image(img_file, self.state)
+
+        return done
+
+    def end_episode(self: Self, learner: StackedDqnLearner) -> None:
+        """Log the finished episode, update epsilon and save the model if due.
+
+        Args:
+            learner (StackedDqnLearner): The learner to sync weights from.
+        """
+        self.profiler.end_episode(self.episode)
+        self.episode_log.stop_timer()
+        self.logger.log(self.episode_log)
+        self.metrics.update(
+            self.episode_log, self.agent.memory.fill, self.agent.grad_steps
+        )
+
+        if self.episode >= self.config.epsilon_decay_start:
+            self.agent.update_epsilon(self.config.epsilon_step)
+
+        if is_save_episode(self.config, self.episode):
+            learner.sync_to_agents()
+            state = self.agent.checkpoint_state()
+            self.checkpoints.submit(state, self.model_dir / f"{self.episode}.pth")
+
+        if self.recorder:
+            self.recorder.close()
+            self.recorder = None
+
+
+def supports_stacked(config: Config) -> bool:
+    """Whether the seeds of a variant can be trained in stacked form.
+
+    Checked on a network of the variant, before creating any of its seeds, see
+    `StackedDqnLearner.supports_model`.
+
+    Args:
+        config (Config): The configuration object of the variant.
+
+    Returns:
+        bool: True if the agent and network of the variant are supported.
+    """
+    net = make_net(config.net_name)
+    model = net.build_net(calc_input_shape(config), 1, torch.device("cpu"))
+    return StackedDqnLearner.supports_model(config.agent_name, model)
+
+
+def loop_multi_seed(configs: list[Config], result_dirs: list[Path]) -> None:
+    """Run all episodes of several seeds of the same variant in one process.
+
+    Each seed keeps its own environment, replay memory, RNG and result dir, while the
+    learning steps of all seeds are fused into a single vectorized update. Seeds
+    advance in lockstep, one environment step each, followed by one fused update.
+    Seeds that have finished all episodes are dropped from the fused update.
+
+    Each seed samples the resource usage to its own result dir, tagged with its
+    own episodes and replay memory size. The figures of the process, e.g. CPU time
+    and memory, are those of all seeds though, as they share the process.
+
+    If the agent does not support stacked training, the seeds are trained one
+    after the other instead.
+
+    Args:
+        configs (list[Config]): The configuration objects, one per seed.
+        result_dirs (list[Path]): The dirs to save results to, one per seed.
+    """
+    # fall back to sequential training
+    if not supports_stacked(configs[0]):
+        logger.log(
+            str(LogLevel.YELLOW),
+            f"Agent {configs[0].agent_name} with net {configs[0].net_name} "
+            "does not support stacked training, training seeds sequentially.",
+        )
+        for config, result_dir in zip(configs, result_dirs):
+            loop(config, result_dir)
+        return
+
+    # configure torch
+    configure_torch()
+
+    # create seeds, sharing a media encoder, only one profiler can be active though
+    media = MediaEncoder()
+    seeds: list[Seed] = []
+    profiled = False
+    for config, result_dir in zip(configs, result_dirs):
+        env = create_env(config)
+        agent = create_agent(config, env)
+        # seed an RNG per seed for reproducibility, for exploration and replay
+        rng = np.random.default_rng(config.run)
+        agent.memory.rng = rng
+        logger_ = EpisodeLogger(log_file=result_dir / "train_log.csv")
+        metrics = MetricsWriter(result_dir)
+        checkpoints = CheckpointWriter(
+            config.checkpoint_keep, config.checkpoint_compress
+        )
+        episodes = None if profiled else profile_episodes(config)
+        profiled |= episodes is not None
+        profiler = EpisodeProfiler(result_dir / PROFILE_DIR, episodes)
+        sampler = ResourceSampler(
+            result_dir / RESOURCES_FILE, agent.memory, config.resource_sample_interval
+        )
+        seeds.append(
+            Seed(
+                config,
+                result_dir,
+                env,
+                agent,
+                logger_,
+                metrics,
+                checkpoints,
+                media,
+                profiler,
+                sampler,
+                rng,
+            )
+        )
+
+    for seed in seeds:
+        mark_complete(seed.result_dir, False)
+        ensure_empty_dirs(seed.model_dir, seed.video_dir, seed.img_dir)
+        shutil.rmtree(seed.result_dir / PROFILE_DIR, ignore_errors=True)
+        (seed.result_dir / RESOURCES_FILE).unlink(missing_ok=True)
+        seed.logger.truncate(0)
+        seed.start_episode()
+
+    active = [s for s in seeds if s.active]
+    learner = StackedDqnLearner([s.agent for s in active])
+
+    # run main loop while sampling resources, flush the buffered episode logs and
+    # write the pending media and profiles on exit, even on failure
+    with ExitStack() as stack:
+        stack.enter_context(media)
+        for seed in seeds:
+            stack.enter_context(seed.logger)
+            stack.enter_context(seed.sampler)
+            stack.enter_context(seed.profiler)
+
+        while active:
+            # act, greedy actions of all seeds are calculated in a single pass
+            explore = [s.rng.random() <= s.agent.epsilon for s in active]
+            greedy = []
+            if not all(explore):
+                greedy = learner.act([s.state for s in active])
+            actions = [
+                int(s.rng.integers(s.agent.num_actions)) if explore[i] else greedy[i]
+                for i, s in enumerate(active)
+            ]
+
+            # observe & save experience
+            dones = [s.step(a) for s, a in zip(active, actions)]
+
+            # update policy networks
+            losses = learner.replay()
+            for seed, loss in zip(active, losses):
+                seed.episode_log.loss += loss
+
+            # finish episodes
+            for seed, done in zip(active, dones):
+                if done:
+                    seed.end_episode(learner)
+                    seed.start_episode()
+
+            # drop seeds that finished all episodes from the fused update
+            finished = [i for i, s in enumerate(active) if not s.active]
+            active = [s for s in active if s.active]
+            if finished and active:
+                learner.drop(finished)
+
+    # wait for pending checkpoints
+    for seed in seeds:
+        seed.checkpoints.close()
+        seed.metrics.write()
+        mark_complete(seed.result_dir)
@@ -1,12 +1,19 @@
+import os
 import pickle
+import struct
 import zlib
 from collections import deque
-from typing import Deque, Self
+from itertools import pairwise
+from pathlib import Path
+from typing import Deque, Final, Self
 
 import numpy as np
 
 from app.memory.transition import Transition
 
+SNAPSHOT_MAGIC: Final[bytes] = b"MERLINRM"
+SNAPSHOT_HEADER: Final[struct.Struct] = struct.Struct("<8sQ")  # magic, count
+
 
 def ensure_transitions(func):
     """Ensure buffer has at least one transition, else raise ValueError."""
@@ -20,14 +27,26 @@ def ensure_transitions(func):
 
 
 class ReplayMemory:
-    def __init__(self: Self, capacity: int, batch_size: int):
+    def __init__(
+        self: Self,
+        capacity: int,
+        batch_size: int,
+        rng: np.random.Generator | None = None,
+    ):
         self.capacity = capacity
         self.batch_size = batch_size
+        self.rng = rng  # the global numpy RNG if None
         self.buffer: Deque[bytes] = deque(maxlen=capacity)
+        self.nbytes = 0  # of all compressed transitions
 
     def push(self: Self, transition: Transition) -> None:
         bytes_ = zlib.compress(pickle.dumps(transition))
+        if len(self.buffer) == self.capacity:  # the oldest transition is evicted
+            if not self.buffer:
+                return
+            self.nbytes -= len(self.buffer[0])
         self.buffer.append(bytes_)
+        self.nbytes += len(bytes_)
 
     def __getitem__(self: Self, index: int) -> Transition:
         bytes_ = self.buffer[index]
@@ -36,6 +55,11 @@ class ReplayMemory:
     def __len__(self: Self) -> int:
         return len(self.buffer)
 
+    @property
+    def fill(self: Self) -> float:
+        """The ratio of the capacity holding transitions."""
+        return len(self) / self.capacity if self.capacity else 0.0
+
     @ensure_transitions
     def __draw_random_indices(self: Self) -> list[int]:
         """Draw random indices of transition entries.
@@ -47,7 +71,8 @@ class ReplayMemory:
             list[int]: The drawn indcies.
         """
         sample_size = min(len(self), self.batch_size) - 1
-        indices = np.random.choice(len(self), sample_size, replace=False).tolist()
+        choice = self.rng.choice if self.rng else np.random.choice
+        indices = choice(len(self), sample_size, replace=False).tolist()
         pad = [-1] * (self.batch_size - len(indices))
         return [*indices, *pad]
 
@@ -60,3 +85,47 @@ class ReplayMemory:
         """
         indices = self.__draw_random_indices()
         return [self[i] for i in indices]
+
+    def dump(self: Self, path: Path) -> None:
+        """Dump all transitions to a binary file, atomically.
+
+        The transitions are stored in their compressed form, preceded by a table of
+        their lengths, so that dumping and loading needs no (de)serialization.
+
+        Args:
+            path (Path): The file path to dump to.
+        """
+        lengths = np.fromiter(map(len, self.buffer), np.uint32, len(self.buffer))
+        tmp_path = path.with_name(f"{path.name}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, len(lengths)))
+            f.write(lengths.tobytes())
+            f.writelines(self.buffer)
+        os.replace(tmp_path, path)
+
+    def load(self: Self, path: Path) -> None:
+        """Replace all transitions by those of a binary dump.
+
+        Args:
+            path (Path): The file path of the dump.
+
+        Raises:
+            ValueError: If the file is not a replay memory dump, or is truncated.
+        """
+        with open(path, "rb") as f:
+            header = f.read(SNAPSHOT_HEADER.size)
+            if not header.startswith(SNAPSHOT_MAGIC):
+                raise ValueError(f"Not a replay memory dump: {path}")
+            if len(header) < SNAPSHOT_HEADER.size:
+                raise ValueError(f"Truncated replay memory dump: {path}")
+            _, count = SNAPSHOT_HEADER.unpack(header)
+            lengths = np.frombuffer(f.read(4 * count), np.uint32)
+            data = f.read()
+        if len(lengths) < count or len(data) != lengths.sum(dtype=np.int64):
+            raise ValueError(f"Truncated replay memory dump: {path}")
+        bounds = [0, *np.cumsum(lengths, dtype=np.int64).tolist()]
+        self.buffer = deque(
+            (data[start:end] for start, end in pairwise(bounds)),
+            maxlen=self.capacity,
+        )
+        self.nbytes = sum(map(len, self.buffer))
@@ -0,0 +1,31 @@
+from app.runner.analyzer import ExperimentAnalyzer
+from app.runner.halving import SuccessiveHalving
+from app.runner.job_queue import JobQueue, run_worker
+from app.runner.monitor import SweepMonitor
+from app.runner.pbt import PopulationBasedTraining
+from app.runner.resources import NodeBudget
+from app.runner.run_cache import (
+    RunCache,
+    read_run_key,
+    remove_run_key,
+    run_key,
+    write_run_key,
+)
+from app.runner.scheduler import RunFailure, RunScheduler
+
+__all__ = [
+    "ExperimentAnalyzer",
+    "JobQueue",
+    "NodeBudget",
+    "PopulationBasedTraining",
+    "RunCache",
+    "RunFailure",
+    "RunScheduler",
+    "SuccessiveHalving",
+    "SweepMonitor",
+    "read_run_key",
+    "remove_run_key",
+    "run_key",
+    "run_worker",
+    "write_run_key",
+]
@@ -0,0 +1,134 @@
+import hashlib
+import traceback
+from collections import Counter
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Final, Self
+
+from app.config import Config
+from app.utils.logging import LogLevel, logger
+
+__all__ = ["ExperimentAnalyzer"]
+
+ANALYSIS_DIR: Final[str] = "analysis"
+FINGERPRINT_FILE: Final[str] = "inputs.sha256"
+LOG_FILE: Final[str] = "train_log.csv"
+
+
+def fingerprint(experiment_dir: Path) -> str:
+    """Fingerprint the inputs of an experiment's analysis, i.e. its training logs.
+
+    Args:
+        experiment_dir (Path): The result dir of the experiment.
+
+    Returns:
+        str: The fingerprint.
+    """
+    digest = hashlib.sha256()
+    for log_file in sorted(experiment_dir.rglob(LOG_FILE)):
+        stat = log_file.stat()
+        relative_path = log_file.relative_to(experiment_dir).as_posix()
+        digest.update(f"{relative_path}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return digest.hexdigest()
+
+
+def analyze_experiment(experiment_dir: Path, inputs: str) -> None:
+    """Analyze experiment and record the fingerprint of the analyzed inputs.
+
+    Args:
+        experiment_dir (Path): The result dir of the experiment.
+        inputs (str): The fingerprint of the inputs.
+    """
+    from analysis.__main__ import collect_and_analyze
+
+    # render in-process, the CPUs are left to the runs
+    collect_and_analyze(experiment_dir, render_workers=1)
+    (experiment_dir / ANALYSIS_DIR / FINGERPRINT_FILE).write_text(inputs)
+
+
+class ExperimentAnalyzer:
+    """Analyze experiments in the background, as soon as all their runs finished.
+
+    Experiments whose training logs did not change since their last analysis are
+    skipped. On exit, all remaining experiments of the results dir are analyzed,
+    including those of previous sweeps, unless unchanged.
+
+    Analyses run in a single worker process by default, rendering their figures
+    in-process, so they take at most one CPU from the runs trained meanwhile.
+
+    Use as context manager, to wait for all analyses on exit.
+    """
+
+    def __init__(self: Self, results_dir: Path, max_workers: int = 1):
+        """Initialize the analyzer.
+
+        Args:
+            results_dir (Path): The dir holding the result dirs of all experiments.
+            max_workers (int, optional): The max number of concurrent analyses.
+                Defaults to 1.
+        """
+        self.results_dir = results_dir
+        self.executor = ProcessPoolExecutor(max_workers=max_workers)
+        self.pending_runs: Counter[str] = Counter()
+        self.analyses: dict[Future[None], str] = {}
+
+    def __enter__(self: Self) -> Self:
+        return self
+
+    def __exit__(self: Self, *_) -> None:
+        self.close()
+
+    def expect(self: Self, configs: list[Config]) -> None:
+        """Register runs to wait for, before analyzing their experiments.
+
+        Args:
+            configs (list[Config]): The configuration instances of the runs.
+        """
+        self.pending_runs.update(c.experiment for c in configs)
+
+    def finish(self: Self, config: Config) -> None:
+        """Register a run as finished, analyze its experiment if it was the last.
+
+        Args:
+            config (Config): The configuration instance of the finished run.
+        """
+        self.pending_runs[config.experiment] -= 1
+        if self.pending_runs[config.experiment] <= 0:
+            del self.pending_runs[config.experiment]
+            self.submit(config.experiment)
+
+    def submit(self: Self, experiment: str) -> None:
+        """Analyze experiment in the background, unless its inputs are unchanged.
+
+        Args:
+            experiment (str): The experiment to analyze.
+        """
+        experiment_dir = self.results_dir / experiment
+        inputs = fingerprint(experiment_dir)
+        fingerprint_file = experiment_dir / ANALYSIS_DIR / FINGERPRINT_FILE
+        if fingerprint_file.exists() and fingerprint_file.read_text() == inputs:
+            logger.log(str(LogLevel.GREEN), f"Analysis of {experiment} is up to date.")
+            return
+        logger.log(str(LogLevel.GREEN), f"Analyzing {experiment}")
+        future = self.executor.submit(analyze_experiment, experiment_dir, inputs)
+        self.analyses[future] = experiment
+        future.add_done_callback(self.__report)
+
+    def close(self: Self) -> None:
+        """Analyze all remaining experiments and wait for all analyses."""
+        wait(self.analyses)  # avoid analyzing an experiment concurrently
+        for experiment_dir in sorted(self.results_dir.glob("*")):
+            if experiment_dir.is_dir() and any(experiment_dir.rglob(LOG_FILE)):
+                self.submit(experiment_dir.name)
+        wait(self.analyses)
+        self.executor.shutdown()
+
+    def __report(self: Self, future: Future[None]) -> None:
+        experiment = self.analyses[future]
+        if error := future.exception():
+            message = "".join(traceback.format_exception(error))
+            logger.log(
+                str(LogLevel.FAILURE), f"Analysis of {experiment} failed: {message}"
+            )
+        else:
+            logger.log(str(LogLevel.GREEN), f"Analyzed {experiment}")
@@ -0,0 +1,239 @@
+import math
+from collections import defaultdict
+from collections.abc import Callable
+from dataclasses import replace
+from pathlib import Path
+from typing import Final, Self
+
+from app.config import Config
+from app.runner.run_cache import read_run_key, run_key
+from app.runner.scheduler import RunFailure, RunScheduler
+from app.utils.logging import LogLevel, logger
+from app.utils.run_state import is_complete, remove_snapshot
+
+__all__ = ["SuccessiveHalving", "rung_budgets"]
+
+# the factor by which variants are reduced and budgets increased per rung
+HALVING_ETA: Final[int] = 3
+
+# the least number of episodes per run in the first rung
+HALVING_MIN_EPISODES: Final[int] = 500
+
+# the share of episodes of a rung to rank variants by
+HALVING_TAIL: Final[float] = 0.2
+
+
+def rung_budgets(
+    episodes: int, eta: int = HALVING_ETA, min_episodes: int = HALVING_MIN_EPISODES
+) -> list[int]:
+    """Calculate the episode budgets of the rungs, increasing by factor eta.
+
+    Args:
+        episodes (int): The budget of the final rung.
+        eta (int, optional): The factor between rungs. Defaults to HALVING_ETA.
+        min_episodes (int, optional): The least budget of the first rung.
+            Defaults to HALVING_MIN_EPISODES.
+
+    Returns:
+        list[int]: The budgets, in ascending order, ending on episodes.
+    """
+    budgets = [episodes]
+    while budgets[0] // eta >= min_episodes:
+        budgets.insert(0, budgets[0] // eta)
+    return budgets
+
+
+class SuccessiveHalving:
+    """Conduct a sweep by successive halving, per experiment.
+
+    All variants of an experiment are trained for a small budget of episodes
+    first. Only the top 1/eta of them, ranked by the reward over the tail episodes
+    of their runs, are promoted to the next rung, which trains them for eta times
+    as many episodes. The last rung trains the remaining variants for their full
+    number of episodes.
+
+    Promoted runs resume from the snapshot taken at the end of the previous rung,
+    so no episode is trained twice. Runs eliminated in an earlier rung keep their
+    snapshot, to be continued by a later sweep.
+    """
+
+    def __init__(
+        self: Self,
+        scheduler: RunScheduler,
+        get_run_dir: Callable[[Config], Path],
+        eta: int = HALVING_ETA,
+        min_episodes: int = HALVING_MIN_EPISODES,
+    ):
+        """Initialize the sweep.
+
+        Args:
+            scheduler (RunScheduler): The scheduler to conduct the runs of a rung.
+            get_run_dir (Callable[[Config], Path]): Provides the result dir of a run.
+            eta (int, optional): The factor by which variants are reduced and
+                budgets increased per rung. Defaults to HALVING_ETA.
+            min_episodes (int, optional): The least number of episodes per run in
+                the first rung. Defaults to HALVING_MIN_EPISODES.
+        """
+        if eta < 2:
+            raise ValueError("Eta must be at least 2.")
+        self.scheduler = scheduler
+        self.get_run_dir = get_run_dir
+        self.eta = eta
+        self.min_episodes = min_episodes
+        self.__variants: dict[tuple[str, str], Config] = {}
+        self.__budgets: dict[str, list[int]] = {}
+
+    def run(
+        self: Self, fn: Callable[[Config], None], variants: list[Config]
+    ) -> list[RunFailure]:
+        """Conduct all rungs of the sweep.
+
+        Args:
+            fn (Callable[[Config], None]): The function conducting a single run,
+                resuming from and keeping its snapshot.
+            variants (list[Config]): The configuration instances of the variants.
+
+        Returns:
+            list[RunFailure]: The runs that failed in all their attempts.
+        """
+        # split variants by experiment, each experiment has its own rungs
+        survivors: dict[str, list[Config]] = defaultdict(list)
+        for variant in variants:
+            if variant.multi_seed:
+                logger.log(
+                    str(LogLevel.YELLOW),
+                    f"Variant {variant.variant} is trained as individual runs, "
+                    "as multi-seed variants do not support resuming.",
+                )
+                variant = replace(variant, multi_seed=False)
+            survivors[variant.experiment].append(variant)
+            self.__variants[variant.experiment, variant.variant] = variant
+        budgets = self.__budgets = {
+            e: rung_budgets(max(v.episodes for v in vs), self.eta, self.min_episodes)
+            for e, vs in survivors.items()
+        }
+
+        failures: list[RunFailure] = []
+        for rung in range(max(len(b) for b in budgets.values())):
+            # conduct the current rung of all experiments at once
+            runs: list[Config] = []
+            for experiment, experiment_variants in survivors.items():
+                if rung >= len(budgets[experiment]):
+                    continue
+                budget = budgets[experiment][rung]
+                logger.log(
+                    str(LogLevel.GREEN),
+                    f"Rung {rung + 1}/{len(budgets[experiment])} of {experiment}: "
+                    f"{len(experiment_variants)} variants for {budget} episodes.",
+                )
+                for variant in experiment_variants:
+                    runs.extend(self.__rung_runs(variant, budget))
+            failures.extend(self.scheduler.run(fn, self.__prepare(runs)))
+
+            # promote the best variants to the next rung
+            for experiment, experiment_variants in survivors.items():
+                if rung + 1 < len(budgets[experiment]):
+                    budget = budgets[experiment][rung]
+                    survivors[experiment] = self.__promote(experiment_variants, budget)
+
+        # the final snapshots are obsolete
+        for experiment_variants in survivors.values():
+            for variant in experiment_variants:
+                for run in range(variant.run_count):
+                    remove_snapshot(self.get_run_dir(replace(variant, run=run)))
+
+        return failures
+
+    @staticmethod
+    def __rung_runs(variant: Config, budget: int) -> list[Config]:
+        """Provide the runs of a variant for the budget of a rung."""
+        variant = replace(variant, episodes=min(budget, variant.episodes))
+        return [replace(variant, run=i) for i in range(variant.run_count)]
+
+    def __trained_episodes(self: Self, run: Config) -> int | None:
+        """Provide the number of episodes the run was last trained for in the sweep.
+
+        Args:
+            run (Config): The run of a rung.
+
+        Returns:
+            int | None: The number of episodes, None if the run dir holds no run
+                of the same variant for any budget of the sweep.
+        """
+        key = read_run_key(self.get_run_dir(run))
+        variant = self.__variants[run.experiment, run.variant]
+        for budget in self.__budgets[run.experiment]:
+            episodes = min(budget, variant.episodes)
+            if key == run_key(replace(variant, run=run.run, episodes=episodes)):
+                return episodes
+        return None
+
+    def __prepare(self: Self, runs: list[Config]) -> list[Config]:
+        """Filter runs already trained, discard snapshots not to continue from.
+
+        A snapshot may only be continued if it stems from the same run, trained
+        for fewer episodes, i.e. from a previous rung or an interrupted attempt
+        of the current rung.
+
+        Args:
+            runs (list[Config]): The runs of the rung.
+
+        Returns:
+            list[Config]: The runs to conduct.
+        """
+        pending: list[Config] = []
+        for run in runs:
+            run_dir = self.get_run_dir(run)
+            trained = self.__trained_episodes(run)
+            if trained is None:
+                remove_snapshot(run_dir)
+            elif trained > run.episodes:
+                continue  # trained in a later rung before
+            elif trained == run.episodes and is_complete(run_dir):
+                continue
+            pending.append(run)
+        return pending
+
+    def __promote(self: Self, variants: list[Config], budget: int) -> list[Config]:
+        """Rank the variants of an experiment and keep the top 1/eta of them.
+
+        If no run of the experiment left results, e.g. as all of them failed, the
+        variants cannot be ranked and are all kept, to be retried in the next rung.
+
+        Args:
+            variants (list[Config]): The variants of the experiment.
+            budget (int): The budget of the finished rung.
+
+        Returns:
+            list[Config]: The promoted variants.
+        """
+        import pandas as pd
+        from analysis.analyzer.reward_stats import summarize_rewards
+
+        logs = []
+        for variant in variants:
+            for run in self.__rung_runs(variant, budget):
+                log_file = self.get_run_dir(run) / "train_log.csv"
+                if self.__trained_episodes(run) is not None and log_file.exists():
+                    log_df = pd.read_csv(log_file)
+                    logs.append(log_df[log_df["episode"] <= run.episodes])
+        if not logs:
+            logger.log(
+                str(LogLevel.FAILURE),
+                f"No results of {variants[0].experiment} after {budget} episodes, "
+                "keeping all its variants to retry them in the next rung.",
+            )
+            return variants
+
+        # rank by tail reward, variants without any results are ranked last
+        tail = max(1, round(budget * HALVING_TAIL))
+        ranking = summarize_rewards(pd.concat(logs), tail).index.tolist()
+        ranks = {v: i for i, v in enumerate(ranking)}
+        ranked = sorted(variants, key=lambda v: ranks.get(v.variant, math.inf))
+        promoted = ranked[: math.ceil(len(variants) / self.eta)]
+        logger.log(
+            str(LogLevel.GREEN),
+            f"Promoting variants of {variants[0].experiment}: "
+            + ", ".join(v.variant for v in promoted),
+        )
+        return promoted
@@ -0,0 +1,347 @@
+import os
+import socket
+import time
+import traceback
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from threading import Event, Thread
+from typing import Any, Final, Self
+
+from app.config import Config
+from app.runner.scheduler import RunFailure
+from app.utils.logging import LogLevel, logger
+from yaml import Loader, dump, load  # type: ignore
+
+__all__ = ["JobQueue", "run_worker"]
+
+PENDING_DIR: Final[str] = "pending"
+CLAIMED_DIR: Final[str] = "claimed"
+DONE_DIR: Final[str] = "done"
+FAILED_DIR: Final[str] = "failed"
+
+JOB_SUFFIX: Final[str] = ".yaml"
+TMP_SUFFIX: Final[str] = ".tmp"
+OWNER_SEPARATOR: Final[str] = "@"
+
+# seconds between heartbeats of a claimed job
+HEARTBEAT_INTERVAL: Final[float] = 30.0
+
+# seconds without heartbeat after which a claim is considered stale
+STALE_AFTER: Final[float] = 300.0
+
+# seconds to wait for claimed jobs to finish or become stale
+POLL_INTERVAL: Final[float] = 10.0
+
+
+@dataclass(frozen=True)
+class Job:
+    """A job claimed from the queue."""
+
+    name: str
+    config: Config
+    attempts: int
+    path: Path
+
+
+def job_name(config: Config) -> str:
+    """Provide the name of a run's job."""
+    return f"{config.experiment}--{config.variant}--{config.run}{JOB_SUFFIX}"
+
+
+def worker_name() -> str:
+    """Provide a name of the current process, unique across nodes."""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class JobQueue:
+    """A queue of runs, shared via a directory on a shared file system.
+
+    Each job is a file, moving from the `pending` dir to the `claimed` dir, and on
+    to the `done` or `failed` dir. All moves are atomic renames, so that each job
+    is claimed by a single worker only, no matter how many workers of how many
+    nodes compete for it.
+
+    Workers touch their claimed jobs regularly. Claims without any heartbeat for
+    a while are considered stale, e.g. from a crashed worker or node, and are put
+    back to pending. The clocks of all nodes must thus be roughly in sync.
+    """
+
+    def __init__(
+        self: Self,
+        queue_dir: Path,
+        stale_after: float = STALE_AFTER,
+        max_attempts: int = 2,
+    ):
+        """Initialize the queue, creating its dirs if necessary.
+
+        Args:
+            queue_dir (Path): The dir of the queue, on a shared file system.
+            stale_after (float, optional): Seconds without heartbeat after which a
+                claim is considered stale. Defaults to STALE_AFTER.
+            max_attempts (int, optional): The max number of attempts of a job.
+                Defaults to 2.
+        """
+        self.queue_dir = queue_dir
+        self.stale_after = stale_after
+        self.max_attempts = max_attempts
+        for name in (PENDING_DIR, CLAIMED_DIR, DONE_DIR, FAILED_DIR):
+            (queue_dir / name).mkdir(parents=True, exist_ok=True)
+
+    @property
+    def pending_dir(self: Self) -> Path:
+        return self.queue_dir / PENDING_DIR
+
+    @property
+    def claimed_dir(self: Self) -> Path:
+        return self.queue_dir / CLAIMED_DIR
+
+    @property
+    def done_dir(self: Self) -> Path:
+        return self.queue_dir / DONE_DIR
+
+    @property
+    def failed_dir(self: Self) -> Path:
+        return self.queue_dir / FAILED_DIR
+
+    @property
+    def is_drained(self: Self) -> bool:
+        """Whether no job is pending or claimed anymore."""
+        return not any(self.pending_dir.glob(f"*{JOB_SUFFIX}")) and not any(
+            self.claimed_dir.iterdir()
+        )
+
+    def enqueue(self: Self, configs: list[Config]) -> int:
+        """Add runs to the queue, updating the config of runs already pending.
+
+        Runs already claimed keep their config, as they are in progress, a warning
+        is logged if it differs.
+
+        Args:
+            configs (list[Config]): The configuration instances of the runs.
+
+        Returns:
+            int: The number of enqueued jobs, including the updated ones.
+        """
+        claimed = {
+            p.name.split(OWNER_SEPARATOR)[0]: p for p in self.claimed_dir.iterdir()
+        }
+        count = 0
+        for config in configs:
+            name = job_name(config)
+            path = self.pending_dir / name
+            if name in claimed:
+                self.__warn_if_changed(claimed[name], config)
+                continue
+            if path.exists():
+                # take over the pending job atomically, competing with claiming
+                # workers, to update its config
+                try:
+                    os.rename(path, path.with_name(f"{name}{TMP_SUFFIX}"))
+                except FileNotFoundError:
+                    logger.log(
+                        str(LogLevel.YELLOW),
+                        f"Job {name} was claimed while updating it, it runs with "
+                        "its former config.",
+                    )
+                    continue
+            else:
+                (self.done_dir / name).unlink(missing_ok=True)
+                (self.failed_dir / name).unlink(missing_ok=True)
+            self.__write(path, config, attempts=0)
+            count += 1
+        return count
+
+    def claim(self: Self, worker: str) -> Job | None:
+        """Claim the next pending job.
+
+        Args:
+            worker (str): The name of the claiming worker.
+
+        Returns:
+            Job | None: The claimed job, None if no job is pending.
+        """
+        for path in sorted(self.pending_dir.glob(f"*{JOB_SUFFIX}")):
+            claimed_path = self.claimed_dir / f"{path.name}{OWNER_SEPARATOR}{worker}"
+            try:
+                os.rename(path, claimed_path)
+            except FileNotFoundError:
+                continue  # claimed by another worker
+            os.utime(claimed_path)
+            content = self.__read(claimed_path)
+            config = Config(**content["config"])
+            return Job(path.name, config, content["attempts"] + 1, claimed_path)
+        return None
+
+    def heartbeat(self: Self, job: Job) -> None:
+        """Signal that the job is still being worked on."""
+        try:
+            os.utime(job.path)
+        except FileNotFoundError:
+            pass  # reclaimed meanwhile, reported on completion
+
+    def complete(self: Self, job: Job) -> None:
+        """Mark claimed job as done.
+
+        Args:
+            job (Job): The claimed job.
+        """
+        self.__release(job, self.done_dir / job.name)
+
+    def fail(self: Self, job: Job, error: str) -> bool:
+        """Put failed job back to pending, or mark it as failed after all attempts.
+
+        Args:
+            job (Job): The claimed job.
+            error (str): The error message.
+
+        Returns:
+            bool: Whether the job failed for good.
+        """
+        if job.attempts < self.max_attempts:
+            self.__write(self.pending_dir / job.name, job.config, job.attempts)
+            self.__release(job)
+            return False
+        self.__release(job, self.failed_dir / job.name)
+        (self.failed_dir / f"{job.name}.log").write_text(error)
+        return True
+
+    def reclaim_stale(self: Self, worker: str) -> int:
+        """Put jobs back to pending, whose claims lack a recent heartbeat.
+
+        The reclaiming worker takes over the claim first, so that a reclaim which is
+        interrupted leaves a claim behind, to be reclaimed once stale in turn.
+
+        Args:
+            worker (str): The name of the reclaiming worker.
+
+        Returns:
+            int: The number of reclaimed jobs.
+        """
+        count = 0
+        now = time.time()
+        for path in self.claimed_dir.iterdir():
+            try:
+                if now - path.stat().st_mtime < self.stale_after:
+                    continue
+                # take over the claim atomically, competing with other reclaimers
+                name, owner = path.name.split(OWNER_SEPARATOR, 1)
+                claimed_path = self.claimed_dir / f"{name}{OWNER_SEPARATOR}{worker}"
+                os.rename(path, claimed_path)
+                os.utime(claimed_path)
+                content = self.__read(claimed_path)
+            except FileNotFoundError:
+                continue
+            config = Config(**content["config"])
+            logger.log(
+                str(LogLevel.YELLOW),
+                f"Reclaiming job {name}, its worker {owner} is unresponsive.",
+            )
+            job = Job(name, config, content["attempts"] + 1, claimed_path)
+            self.fail(job, f"Worker {owner} became unresponsive.")
+            count += 1
+        return count
+
+    def __release(self: Self, job: Job, destination: Path | None = None) -> None:
+        """Release the claim of a job, optionally moving it to the destination."""
+        try:
+            if destination:
+                os.rename(job.path, destination)
+            else:
+                job.path.unlink()
+        except FileNotFoundError:
+            logger.log(
+                str(LogLevel.YELLOW),
+                f"Claim of job {job.name} was lost, as it was reclaimed meanwhile.",
+            )
+
+    def __warn_if_changed(self: Self, path: Path, config: Config) -> None:
+        """Warn if the config of a claimed job differs from the given one."""
+        try:
+            content = self.__read(path)
+        except FileNotFoundError:
+            return  # released meanwhile
+        if Config(**content["config"]) != config:
+            name = path.name.split(OWNER_SEPARATOR)[0]
+            logger.log(
+                str(LogLevel.YELLOW),
+                f"Job {name} is already claimed, it runs with its former config.",
+            )
+
+    @staticmethod
+    def __read(path: Path) -> dict[str, Any]:
+        return load(path.read_text(), Loader)
+
+    @staticmethod
+    def __write(path: Path, config: Config, attempts: int) -> None:
+        """Write job file atomically."""
+        tmp_path = path.with_name(f"{path.name}{TMP_SUFFIX}")
+        tmp_path.write_text(dump({"attempts": attempts, "config": asdict(config)}))
+        os.replace(tmp_path, path)
+
+
+class Heartbeat:
+    """Touch a claimed job regularly in a background thread, while in context."""
+
+    def __init__(self: Self, queue: JobQueue, job: Job):
+        self.queue = queue
+        self.job = job
+        self.stopped = Event()
+        self.thread = Thread(target=self.__beat, name="heartbeat", daemon=True)
+
+    def __enter__(self: Self) -> Self:
+        self.thread.start()
+        return self
+
+    def __exit__(self: Self, *_) -> None:
+        self.stopped.set()
+        self.thread.join()
+
+    def __beat(self: Self) -> None:
+        while not self.stopped.wait(HEARTBEAT_INTERVAL):
+            self.queue.heartbeat(self.job)
+
+
+def run_worker(
+    queue: JobQueue,
+    fn: Callable[[Config], None],
+    poll_interval: float = POLL_INTERVAL,
+) -> list[RunFailure]:
+    """Claim and conduct jobs one after the other, until the queue is drained.
+
+    While jobs are claimed by other workers, the worker keeps polling, to reclaim
+    them should their workers become unresponsive.
+
+    Args:
+        queue (JobQueue): The queue to work on.
+        fn (Callable[[Config], None]): The function conducting a single run.
+        poll_interval (float, optional): Seconds to wait if no job is pending.
+            Defaults to POLL_INTERVAL.
+
+    Returns:
+        list[RunFailure]: The runs that failed for good in this worker.
+    """
+    worker = worker_name()
+    failures: list[RunFailure] = []
+    while True:
+        queue.reclaim_stale(worker)
+        job = queue.claim(worker)
+        if job is None:
+            if queue.is_drained:
+                break
+            time.sleep(poll_interval)
+            continue
+
+        logger.log(str(LogLevel.GREEN), f"Worker {worker} claimed job {job.name}")
+        try:
+            with Heartbeat(queue, job):
+                fn(job.config)
+        except Exception as e:  # noqa: BLE001, a failing job must not stop the worker
+            message = "".join(traceback.format_exception(e))
+            logger.log(str(LogLevel.FAILURE), f"Job {job.name} failed: {message}")
+            if queue.fail(job, message):
+                failures.append(RunFailure(job.config, job.attempts, message))
+        else:
+            queue.complete(job)
+            logger.log(str(LogLevel.GREEN), f"Worker {worker} finished job {job.name}")
+    return failures
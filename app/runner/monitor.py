@@ -0,0 +1,183 @@
+import time
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from threading import Event, Thread
+from typing import Any, Final, Self
+
+from app.utils.logging import LogLevel, logger
+from app.utils.metrics import METRICS_FILE, read_metrics
+from app.utils.run_state import is_complete
+
+__all__ = ["SweepMonitor"]
+
+METRICS_PORT: Final[int] = 8000
+
+# seconds between console dashboards
+DASHBOARD_INTERVAL: Final[float] = 60.0
+
+# seconds without metrics after which a run is considered stalled
+STALLED_AFTER: Final[float] = 300.0
+
+# exported metrics: name, type, help
+PROMETHEUS_METRICS: Final[tuple[tuple[str, str, str], ...]] = (
+    ("episodes", "counter", "Episodes finished by the run."),
+    ("env_steps", "counter", "Environment steps taken by the run."),
+    ("grad_steps", "counter", "Gradient steps taken by the run."),
+    ("episodes_per_second", "gauge", "Recent rate of finished episodes."),
+    ("env_steps_per_second", "gauge", "Recent rate of environment steps."),
+    ("grad_steps_per_second", "gauge", "Recent rate of gradient steps."),
+    ("replay_fill", "gauge", "Fill ratio of the replay memory."),
+    ("epsilon", "gauge", "Exploration rate of the agent."),
+    ("recent_reward", "gauge", "Mean reward of the recent episodes."),
+    ("rss_bytes", "gauge", "Resident set size of the run's process."),
+    ("age_seconds", "gauge", "Seconds since the run last published metrics."),
+)
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """Serve the metrics of all running runs in the Prometheus text format."""
+
+    def __init__(self: Self, monitor: "SweepMonitor", *args: Any, **kwargs: Any):
+        self.monitor = monitor
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self: Self) -> None:
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = self.monitor.prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self: Self, *_: Any) -> None:
+        pass  # keep the console for the training output
+
+
+class SweepMonitor:
+    """Monitor the running runs of a sweep, via the metrics they publish.
+
+    Serves the metrics on a local HTTP endpoint for Prometheus, and logs a compact
+    dashboard to the console regularly, flagging stalled runs. If the port is not
+    available, only the dashboard is logged, the sweep is not affected.
+
+    Use as context manager, to serve while in context.
+    """
+
+    def __init__(
+        self: Self,
+        results_dir: Path,
+        port: int = METRICS_PORT,
+        dashboard_interval: float = DASHBOARD_INTERVAL,
+    ):
+        """Initialize the monitor.
+
+        Args:
+            results_dir (Path): The dir holding the result dirs of all experiments.
+            port (int, optional): The local port to serve the metrics on.
+                Defaults to METRICS_PORT.
+            dashboard_interval (float, optional): Seconds between dashboards.
+                Defaults to DASHBOARD_INTERVAL.
+        """
+        self.results_dir = results_dir
+        self.dashboard_interval = dashboard_interval
+        self.started = time.time()
+        self.stopped = Event()
+        self.threads = [
+            Thread(target=self.__log_dashboards, name="dashboard", daemon=True)
+        ]
+        self.server: ThreadingHTTPServer | None = None
+        try:
+            self.server = ThreadingHTTPServer(
+                ("127.0.0.1", port), partial(MetricsHandler, self)
+            )
+        except OSError as e:
+            logger.log(
+                str(LogLevel.YELLOW),
+                f"Cannot serve metrics on port {port}, logging the dashboard only: "
+                f"{e}",
+            )
+            return
+        self.threads.append(
+            Thread(target=self.server.serve_forever, name="metrics", daemon=True)
+        )
+
+    def __enter__(self: Self) -> Self:
+        for thread in self.threads:
+            thread.start()
+        if self.server:
+            host, port = self.server.server_address[:2]
+            url = f"http://{host}:{port}/metrics"
+            logger.log(str(LogLevel.GREEN), f"Serving metrics on {url}")
+        return self
+
+    def __exit__(self: Self, *_) -> None:
+        self.stopped.set()
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+        for thread in self.threads:
+            thread.join()
+
+    def collect(self: Self) -> list[dict[str, Any]]:
+        """Collect the latest metrics of all running runs.
+
+        Runs of previous sweeps, which did not complete, are skipped.
+
+        Returns:
+            list[dict[str, Any]]: The metrics by run, including their age.
+        """
+        now = time.time()
+        runs = []
+        for file in sorted(self.results_dir.glob(f"*/*/*/{METRICS_FILE}")):
+            if is_complete(file.parent) or (metrics := read_metrics(file)) is None:
+                continue
+            if metrics["updated"] < self.started:
+                continue
+            runs.append(metrics | {"age_seconds": now - metrics["updated"]})
+        return runs
+
+    def prometheus(self: Self) -> str:
+        """Render the metrics of all running runs in the Prometheus text format."""
+        runs = self.collect()
+        lines = []
+        for name, type_, help_ in PROMETHEUS_METRICS:
+            lines += [f"# HELP merlin_{name} {help_}", f"# TYPE merlin_{name} {type_}"]
+            for run in runs:
+                labels = ",".join(
+                    f'{label}="{run[label]}"'
+                    for label in ("experiment", "variant", "run")
+                )
+                lines.append(f"merlin_{name}{{{labels}}} {run[name]}")
+        return "\n".join(lines) + "\n"
+
+    def dashboard(self: Self) -> str:
+        """Render a compact table of the metrics of all running runs."""
+        header = (
+            f"{'run':<32} {'episode':>7} {'steps/s':>8} {'grads/s':>8} "
+            f"{'eps/h':>6} {'replay':>6} {'epsilon':>7} {'reward':>7} "
+            f"{'rss':>6} {'age':>5}"
+        )
+        lines = [header]
+        for run in self.collect():
+            run_id = f"{run['experiment']}/{run['variant']}/{run['run']}"
+            age = run["age_seconds"]
+            lines.append(
+                f"{run_id[-32:]:<32} {run['episode']:>7} "
+                f"{run['env_steps_per_second']:>8.1f} "
+                f"{run['grad_steps_per_second']:>8.1f} "
+                f"{run['episodes_per_second'] * 3_600:>6.0f} "
+                f"{run['replay_fill']:>6.0%} {run['epsilon']:>7.3f} "
+                f"{run['recent_reward']:>7.2f} "
+                f"{run['rss_bytes'] / 1_024**3:>5.1f}G {age:>5.0f}"
+                + (" STALLED" if age > STALLED_AFTER else "")
+            )
+        return "\n".join(lines)
+
+    def __log_dashboards(self: Self) -> None:
+        while not self.stopped.wait(self.dashboard_interval):
+            if self.collect():
+                logger.log(str(LogLevel.GREEN), self.dashboard())
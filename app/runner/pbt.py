@@ -0,0 +1,252 @@
+import csv
+import math
+import random
+from collections import defaultdict
+from collections.abc import Callable
+from dataclasses import replace
+from pathlib import Path
+from typing import Any, Final, Self
+
+from app.config import Config
+from app.runner.run_cache import remove_run_key
+from app.runner.scheduler import RunFailure, RunScheduler
+from app.utils.logging import LogLevel, logger
+from app.utils.run_state import copy_snapshot, remove_snapshot
+
+__all__ = ["PopulationBasedTraining"]
+
+# the number of episodes between exploiting and exploring
+PBT_INTERVAL: Final[int] = 250
+
+# the share of members copying from, respectively copied by, other members
+PBT_QUANTILE: Final[float] = 0.25
+
+# the hyperparameters to explore, with the factors to perturb them by
+PBT_PERTURBATIONS: Final[dict[str, tuple[float, ...]]] = {
+    "alpha": (0.8, 1.25),
+    "epsilon_step": (0.8, 1.25),
+}
+
+LINEAGE_FILE: Final[str] = "pbt_lineage.csv"
+
+
+class PopulationBasedTraining:
+    """Conduct a sweep by population based training, per experiment.
+
+    All runs of all variants of an experiment form a population, trained in
+    rounds of a fixed number of episodes. After each round, the members are ranked
+    by their reward within the round. The bottom members continue training from
+    the training state of a random top member (exploit), taking on its entire
+    configuration, e.g. its net, gamma and memory size, so that the state copied
+    is trained as it was configured, with its hyperparameters perturbed (explore).
+    Each member keeps its own training log, while the history of copies, of the
+    variant whose configuration each member trains with and of the hyperparameters
+    is logged to the lineage file of the experiment.
+    """
+
+    def __init__(
+        self: Self,
+        scheduler: RunScheduler,
+        get_run_dir: Callable[[Config], Path],
+        interval: int = PBT_INTERVAL,
+        quantile: float = PBT_QUANTILE,
+        copy_replay: bool = False,
+    ):
+        """Initialize the sweep.
+
+        Args:
+            scheduler (RunScheduler): The scheduler to conduct the runs of a round.
+            get_run_dir (Callable[[Config], Path]): Provides the result dir of a run.
+            interval (int, optional): The number of episodes per round.
+                Defaults to PBT_INTERVAL.
+            quantile (float, optional): The share of members copying from,
+                respectively copied by, other members. Defaults to PBT_QUANTILE.
+            copy_replay (bool, optional): Whether to copy the replay memory along
+                with the training state. Defaults to False.
+        """
+        if not 0 < quantile <= 0.5:
+            raise ValueError("Quantile must be in (0, 0.5].")
+        self.scheduler = scheduler
+        self.get_run_dir = get_run_dir
+        self.interval = interval
+        self.quantile = quantile
+        self.copy_replay = copy_replay
+        self.__config_variants: dict[tuple[str, int], str] = {}
+
+    def run(
+        self: Self, fn: Callable[[Config], None], variants: list[Config]
+    ) -> list[RunFailure]:
+        """Conduct all rounds of the sweep.
+
+        Args:
+            fn (Callable[[Config], None]): The function conducting a single run,
+                resuming from and keeping its snapshot.
+            variants (list[Config]): The configuration instances of the variants.
+
+        Returns:
+            list[RunFailure]: The runs that failed in all their attempts.
+        """
+        # split runs by experiment, each experiment has its own population
+        populations: dict[str, list[Config]] = defaultdict(list)
+        self.__config_variants.clear()
+        for variant in variants:
+            variant = replace(variant, multi_seed=False)
+            for run in range(variant.run_count):
+                member = replace(variant, run=run)
+                remove_snapshot(self.get_run_dir(member))
+                remove_run_key(self.get_run_dir(member))
+                populations[variant.experiment].append(member)
+        for experiment, members in populations.items():
+            self.__lineage_file(members).unlink(missing_ok=True)
+            self.__log_lineage(members, 0, {})
+
+        failures: list[RunFailure] = []
+        episodes = max(m.episodes for ms in populations.values() for m in ms)
+        rounds = math.ceil(episodes / self.interval)
+        for round_ in range(1, rounds + 1):
+            logger.log(str(LogLevel.GREEN), f"PBT round {round_}/{rounds}")
+            runs = [
+                replace(m, episodes=min(round_ * self.interval, m.episodes))
+                for members in populations.values()
+                for m in members
+            ]
+            failures.extend(self.scheduler.run(fn, runs))
+            if round_ == rounds:
+                break
+
+            # exploit & explore
+            for experiment, members in populations.items():
+                populations[experiment] = self.__evolve(members, round_)
+
+        # the final snapshots are obsolete, the results are not reproducible
+        for members in populations.values():
+            for member in members:
+                remove_snapshot(self.get_run_dir(member))
+                remove_run_key(self.get_run_dir(member))
+
+        return failures
+
+    def __evolve(self: Self, members: list[Config], round_: int) -> list[Config]:
+        """Replace the bottom members by perturbed copies of the top members.
+
+        Args:
+            members (list[Config]): The members of the population.
+            round_ (int): The finished round.
+
+        Returns:
+            list[Config]: The members, with perturbed hyperparameters.
+        """
+        ranked = self.__rank(members, round_)
+        count = math.floor(len(ranked) * self.quantile)
+        if not count:
+            return members
+
+        top, bottom = ranked[:count], ranked[-count:]
+        sources: dict[tuple[str, int], Config] = {}
+        evolved: dict[tuple[str, int], Config] = {}
+        for member in bottom:
+            source = random.choice(top)
+            copy_snapshot(
+                self.get_run_dir(source), self.get_run_dir(member), self.copy_replay
+            )
+            # the results depend on the lineage, they are no run of any config
+            remove_run_key(self.get_run_dir(member))
+            perturbed = {
+                k: getattr(source, k) * random.choice(factors)
+                for k, factors in PBT_PERTURBATIONS.items()
+            }
+            # the member takes on the entire configuration of the state copied,
+            # keeping only its identity, i.e. its result dir and training log
+            evolved[member.variant, member.run] = replace(
+                source, variant=member.variant, run=member.run, **perturbed
+            )
+            sources[member.variant, member.run] = source
+            self.__config_variants[member.variant, member.run] = self.__config_variant(
+                source
+            )
+            logger.log(
+                str(LogLevel.GREEN),
+                f"PBT member {member.variant}/{member.run} continues from "
+                f"{source.variant}/{source.run} with the configuration of "
+                f"{self.__config_variant(source)} and {perturbed}",
+            )
+        members = [evolved.get((m.variant, m.run), m) for m in members]
+        self.__log_lineage(members, round_ * self.interval, sources)
+        return members
+
+    def __rank(self: Self, members: list[Config], round_: int) -> list[Config]:
+        """Rank members by their reward within the round, best first.
+
+        Args:
+            members (list[Config]): The members of the population.
+            round_ (int): The finished round.
+
+        Returns:
+            list[Config]: The ranked members, members without results are last.
+        """
+        import pandas as pd
+        from analysis.analyzer.reward_stats import summarize_rewards
+
+        logs = []
+        for member in members:
+            log_file = self.get_run_dir(member) / "train_log.csv"
+            if not log_file.exists():
+                continue
+            log_df = pd.read_csv(log_file)
+            log_df = log_df[log_df["episode"] > (round_ - 1) * self.interval]
+            log_df = log_df[log_df["episode"] <= round_ * self.interval]
+            logs.append(log_df.assign(variant=f"{member.variant}/{member.run}"))
+        if not logs:
+            return members
+
+        # every member is ranked as a variant of its own
+        ranking = summarize_rewards(pd.concat(logs), self.interval).index.tolist()
+        ranks = {m: i for i, m in enumerate(ranking)}
+        return sorted(
+            members, key=lambda m: ranks.get(f"{m.variant}/{m.run}", math.inf)
+        )
+
+    def __config_variant(self: Self, member: Config) -> str:
+        """Provide the variant whose configuration a member trains with."""
+        return self.__config_variants.get((member.variant, member.run), member.variant)
+
+    def __lineage_file(self: Self, members: list[Config]) -> Path:
+        return self.get_run_dir(members[0]).parents[1] / LINEAGE_FILE
+
+    def __log_lineage(
+        self: Self,
+        members: list[Config],
+        episode: int,
+        sources: dict[tuple[str, int], Config],
+    ) -> None:
+        """Log the hyperparameters of all members, and where they were copied from.
+
+        Args:
+            members (list[Config]): The members of the population.
+            episode (int): The episode after which the hyperparameters apply.
+            sources (dict[tuple[str, int], Config]): The members copied from, by
+                variant and run of the member.
+        """
+        lineage_file = self.__lineage_file(members)
+        rows: list[dict[str, Any]] = []
+        for member in members:
+            source = sources.get((member.variant, member.run))
+            rows.append(
+                {
+                    "episode": episode,
+                    "experiment": member.experiment,
+                    "variant": member.variant,
+                    "run": member.run,
+                    "source_variant": source.variant if source else None,
+                    "source_run": source.run if source else None,
+                    "config_variant": self.__config_variant(member),
+                }
+                | {k: getattr(member, k) for k in PBT_PERTURBATIONS}
+            )
+        lineage_file.parent.mkdir(parents=True, exist_ok=True)
+        is_new = not lineage_file.exists()
+        with open(lineage_file, "a", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            if is_new:
+                writer.writeheader()
+            writer.writerows(rows)
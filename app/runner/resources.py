@@ -0,0 +1,188 @@
+import os
+from dataclasses import dataclass
+from typing import Final, Self
+
+from app.config import Config
+
+__all__ = [
+    "NodeBudget",
+    "estimate_replay_bytes",
+    "estimate_run_cost",
+    "estimate_run_memory",
+    "limit_threads",
+    "pin_cpus",
+]
+
+# rough memory taken by a run's process: interpreter, torch, gym & ROM, networks
+BASE_RUN_MEMORY: Final[int] = 1_024**3
+
+# binarized frames compress to ~0.5% of their size, see ReplayMemory.push, estimated
+# at 2% to admit runs conservatively, as frames of busier games compress worse
+REPLAY_COMPRESSION_RATIO: Final[float] = 0.02
+
+# per-transition overhead of the bytes object and the deque slot
+TRANSITION_OVERHEAD: Final[int] = 128
+
+# share of the node's memory that runs may occupy
+MEMORY_FRACTION: Final[float] = 0.85
+
+# thread pools of the numerical libraries, read on their import, also by subprocesses
+THREAD_ENV_VARS: Final[tuple[str, ...]] = (
+    "OMP_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+)
+
+
+# relative cost of a learning step per net, compared to an emulator step
+NET_STEP_COST: Final[dict[str, float]] = {
+    "linear_flat_net": 1.0,
+    "linear_deep_net": 1.5,
+    "conv_net": 4.0,
+}
+
+# relative cost of an emulator step, including preprocessing
+ENV_STEP_COST: Final[float] = 1.0
+
+# relative cost of sampling the replay memory, per 100k transitions held
+REPLAY_SAMPLE_COST: Final[float] = 0.1
+
+
+def estimate_run_cost(config: Config) -> float:
+    """Estimate the relative compute cost of a run.
+
+    The cost is only meaningful relative to other runs, e.g. for ordering them.
+
+    Args:
+        config (Config): The configuration instance of the run.
+
+    Returns:
+        float: The estimated cost.
+    """
+    step_cost = ENV_STEP_COST
+    if config.agent_name != "random_walker":  # not learning
+        batch_factor = config.batch_size / 32
+        step_cost += NET_STEP_COST.get(config.net_name, 1.0) * batch_factor
+        step_cost += REPLAY_SAMPLE_COST * config.memory_size / 100_000
+    seeds = config.run_count if config.multi_seed else 1
+    return config.episodes * step_cost * seeds
+
+
+def estimate_replay_bytes(config: Config) -> int:
+    """Estimate the footprint of a full replay memory of a single run.
+
+    Args:
+        config (Config): The configuration instance of the run.
+
+    Returns:
+        int: The estimated number of bytes.
+    """
+    state_bytes = 4 * config.input_dim**2 * config.num_stacked_frames  # float32
+    transition_bytes = 2 * state_bytes * REPLAY_COMPRESSION_RATIO + TRANSITION_OVERHEAD
+    return int(config.memory_size * transition_bytes)
+
+
+def estimate_run_memory(config: Config) -> int:
+    """Estimate the peak memory of a run's process.
+
+    Multi-seed variants hold a replay memory per seed.
+
+    Args:
+        config (Config): The configuration instance of the run.
+
+    Returns:
+        int: The estimated number of bytes.
+    """
+    seeds = config.run_count if config.multi_seed else 1
+    return BASE_RUN_MEMORY + seeds * estimate_replay_bytes(config)
+
+
+def available_cpus() -> tuple[int, ...]:
+    """Return the ids of the CPUs the current process may run on."""
+    if hasattr(os, "sched_getaffinity"):
+        return tuple(sorted(os.sched_getaffinity(0)))
+    return tuple(range(os.cpu_count() or 1))
+
+
+def total_memory() -> int:
+    """Return the physical memory of the node in bytes."""
+    return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+
+
+@dataclass(frozen=True)
+class NodeBudget:
+    """The resources of a node to be shared among concurrent runs.
+
+    Attributes:
+        cpus (tuple[int, ...]): The ids of the CPUs available to runs.
+        memory (int): The number of bytes available to runs.
+        threads_per_run (int): The number of threads, and thus CPUs, per run.
+    """
+
+    cpus: tuple[int, ...]
+    memory: int
+    threads_per_run: int = 1
+
+    def __post_init__(self: Self) -> None:
+        if not 0 < self.threads_per_run <= len(self.cpus):
+            raise ValueError(f"Invalid threads per run: {self.threads_per_run}")
+
+    @classmethod
+    def detect(
+        cls, threads_per_run: int = 1, memory_fraction: float = MEMORY_FRACTION
+    ) -> Self:
+        """Derive the budget from the resources of the current node.
+
+        Args:
+            threads_per_run (int, optional): Threads per run. Defaults to 1.
+            memory_fraction (float, optional): The share of the node's memory
+                available to runs. Defaults to MEMORY_FRACTION.
+
+        Returns:
+            NodeBudget: The budget.
+        """
+        cpus = available_cpus()
+        memory = int(total_memory() * memory_fraction)
+        return cls(cpus, memory, min(threads_per_run, len(cpus)))
+
+    @property
+    def max_runs(self: Self) -> int:
+        """The number of runs that may be conducted at once, at least one."""
+        return max(1, len(self.cpus) // self.threads_per_run)
+
+
+def limit_threads(num_threads: int) -> None:
+    """Limit the thread pools of torch, OpenCV and BLAS of the current process.
+
+    The environment variables only size the pools of libraries loaded afterwards.
+    The pools of libraries loaded already, e.g. the BLAS of numpy imported by the
+    parent or a fork server, are limited at runtime.
+
+    Args:
+        num_threads (int): The number of threads.
+    """
+    for var in THREAD_ENV_VARS:
+        os.environ[var] = str(num_threads)
+
+    import cv2 as cv
+    import torch
+    from threadpoolctl import threadpool_limits
+
+    torch.set_num_threads(num_threads)
+    try:
+        torch.set_num_interop_threads(num_threads)
+    except RuntimeError:  # can only be set once, before any parallel work
+        pass
+    cv.setNumThreads(num_threads)
+    threadpool_limits(num_threads)
+
+
+def pin_cpus(cpus: tuple[int, ...]) -> None:
+    """Pin the current process to the given CPUs, if supported by the OS.
+
+    Args:
+        cpus (tuple[int, ...]): The ids of the CPUs.
+    """
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
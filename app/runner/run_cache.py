@@ -0,0 +1,186 @@
+import csv
+import hashlib
+import json
+import os
+import shutil
+from dataclasses import asdict
+from functools import cache
+from pathlib import Path
+from typing import Final, Self
+
+from app.config import Config
+from app.utils.logging import log_parts_dir, relabel_log_parts
+from app.utils.run_state import COMPLETE_FILE, is_complete, mark_complete
+
+__all__ = ["RunCache", "read_run_key", "remove_run_key", "run_key", "write_run_key"]
+
+APP_DIR: Final[Path] = Path(__file__).parents[1]
+
+# code affecting the results of a run, unlike e.g. orchestration and logging
+TRAINING_SOURCES: Final[tuple[Path, ...]] = (
+    APP_DIR / "agents",
+    APP_DIR / "nets",
+    APP_DIR / "memory",
+    APP_DIR / "envs",
+    APP_DIR / "loop.py",
+    APP_DIR / "loop_multi_seed.py",
+    APP_DIR / "config.py",
+)
+
+# config fields not affecting the results of a run
+COSMETIC_FIELDS: Final[frozenset[str]] = frozenset(
+    {
+        "experiment",
+        "variant",
+        "model_save_interval",
+        "checkpoint_keep",
+        "checkpoint_compress",
+        "snapshot_interval",
+        "video_record_interval",
+        "save_state_img",
+        "phase_timing_interval",
+        "resource_sample_interval",
+    }
+)
+
+RUN_KEY_FILE: Final[str] = "run_key"
+SOURCE_FILE: Final[str] = "cached_from"
+LOG_FILE: Final[str] = "train_log.csv"
+
+# files of the run dir not to copy when materializing its results elsewhere
+BOOKKEEPING_FILES: Final[frozenset[str]] = frozenset(
+    {LOG_FILE, RUN_KEY_FILE, SOURCE_FILE, COMPLETE_FILE, "error.log"}
+)
+
+
+@cache
+def code_version() -> str:
+    """Hash the source files of the app affecting the results of a run."""
+    digest = hashlib.sha256()
+    for file in sorted(APP_DIR.rglob("*.py")):
+        if not any(file.is_relative_to(s) for s in TRAINING_SOURCES):
+            continue
+        digest.update(file.relative_to(APP_DIR).as_posix().encode())
+        digest.update(file.read_bytes())
+    return digest.hexdigest()
+
+
+def run_key(config: Config) -> str:
+    """Derive a stable key of a run from its configuration and the code version.
+
+    Cosmetic fields are excluded, so that identical runs of different experiments
+    or variants share the same key. So is the run count, unless the runs of the
+    variant are trained together.
+
+    Args:
+        config (Config): The configuration instance of the run.
+
+    Returns:
+        str: The key.
+    """
+    fields = {k: v for k, v in asdict(config).items() if k not in COSMETIC_FIELDS}
+    if not config.multi_seed:
+        del fields["run_count"]
+    payload = json.dumps({"config": fields, "code": code_version()}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()[:24]
+
+
+def read_run_key(run_dir: Path) -> str | None:
+    """Read the key of the run last conducted in the run dir, if any."""
+    key_file = run_dir / RUN_KEY_FILE
+    return key_file.read_text().strip() if key_file.exists() else None
+
+
+def write_run_key(run_dir: Path, key: str) -> None:
+    """Record the key of the run conducted in the run dir."""
+    (run_dir / RUN_KEY_FILE).write_text(key)
+
+
+def remove_run_key(run_dir: Path) -> None:
+    """Withdraw the run dir from the cache, e.g. if its results are not reproducible."""
+    (run_dir / RUN_KEY_FILE).unlink(missing_ok=True)
+
+
+class RunCache:
+    """Index of completed runs in a results dir, by their run key.
+
+    A run is only conducted once, no matter how many experiments or variants
+    define it. Other occurrences are materialized from the completed run: they
+    receive a copy of its training log, relabeled to their experiment and
+    variant, and of its other result files, e.g. the resource samples, plus a
+    reference to the source run dir. Heavy artifacts like models and videos are
+    not copied, they are only stored with the source run. The logs
+    are copied rather than linked, as the analysis takes the labels from the logs,
+    and as the source run dir may be trained anew, e.g. for a changed config.
+    """
+
+    def __init__(self: Self, results_dir: Path):
+        self.index: dict[str, Path] = {}
+        for key_file in results_dir.glob(f"*/*/*/{RUN_KEY_FILE}"):
+            run_dir = key_file.parent
+            if is_complete(run_dir):
+                self.index.setdefault(key_file.read_text().strip(), run_dir)
+
+    def lookup(self: Self, config: Config) -> Path | None:
+        """Provide the dir of the completed run, if there is any.
+
+        Args:
+            config (Config): The configuration instance of the run.
+
+        Returns:
+            Path | None: The run dir.
+        """
+        return self.index.get(run_key(config))
+
+    def materialize(self: Self, config: Config, run_dir: Path) -> None:
+        """Provide the results of a completed run in another run dir.
+
+        Any results of runs conducted in the run dir before are removed.
+
+        Args:
+            config (Config): The configuration instance of the run.
+            run_dir (Path): The run dir to materialize the results in.
+
+        Raises:
+            KeyError: If the run has not been completed.
+        """
+        key = run_key(config)
+        source_dir = self.index[key]
+        if is_complete(run_dir) and read_run_key(run_dir) == key:
+            return
+
+        # start from an empty run dir, without stale models, videos or profiles
+        shutil.rmtree(run_dir, ignore_errors=True)
+        run_dir.mkdir(parents=True)
+        self.index = {k: d for k, d in self.index.items() if d != run_dir}
+
+        # copy training log, relabeled to experiment and variant
+        labels = {"experiment": config.experiment, "variant": config.variant}
+        tmp_file = run_dir / f"{LOG_FILE}.tmp"
+        with (
+            open(source_dir / LOG_FILE, newline="") as src,
+            open(tmp_file, "w", newline="") as dst,
+        ):
+            reader = csv.DictReader(src)
+            writer = csv.DictWriter(dst, fieldnames=reader.fieldnames or [])
+            writer.writeheader()
+            writer.writerows(row | labels for row in reader)
+        os.replace(tmp_file, run_dir / LOG_FILE)
+
+        # copy columnar training log, missing for runs logged before its introduction
+        parts_dir = log_parts_dir(run_dir / LOG_FILE)
+        source_parts_dir = log_parts_dir(source_dir / LOG_FILE)
+        if source_parts_dir.is_dir():
+            relabel_log_parts(source_parts_dir, parts_dir, **labels)
+
+        # copy other result files, e.g. the resource samples
+        for file in source_dir.iterdir():
+            if file.is_file() and file.name not in BOOKKEEPING_FILES:
+                shutil.copy2(file, run_dir / file.name)
+
+        # reference source
+        source = os.path.relpath(source_dir, run_dir)
+        (run_dir / SOURCE_FILE).write_text(source)
+        write_run_key(run_dir, key)
+        mark_complete(run_dir)
+        self.index.setdefault(key, run_dir)
@@ -0,0 +1,268 @@
+import multiprocessing
+import time
+import traceback
+from collections import deque
+from collections.abc import Callable, Iterable
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Self
+
+from app.config import Config
+from app.runner.resources import (
+    NodeBudget,
+    estimate_run_cost,
+    estimate_run_memory,
+    limit_threads,
+    pin_cpus,
+)
+from app.utils.logging import LogLevel, logger
+
+__all__ = ["RunFailure", "RunScheduler"]
+
+
+@dataclass(frozen=True)
+class Allocation:
+    """The share of the node budget held by a running run."""
+
+    config: Config
+    cpus: tuple[int, ...]
+    memory: int
+
+
+@dataclass(frozen=True)
+class RunFailure:
+    """A run that failed, after all its attempts."""
+
+    config: Config
+    attempts: int
+    error: str
+
+
+def run_pinned(
+    fn: Callable[[Config], None], config: Config, cpus: tuple[int, ...]
+) -> None:
+    """Run function on configuration, pinned to the given CPUs.
+
+    Args:
+        fn (Callable[[Config], None]): The function conducting the run.
+        config (Config): The configuration instance of the run.
+        cpus (tuple[int, ...]): The CPUs to pin to, no pinning if empty.
+    """
+    if cpus:
+        pin_cpus(cpus)
+    fn(config)
+
+
+class SweepProgress:
+    """Track the progress of a sweep, weighted by the estimated cost of its runs."""
+
+    def __init__(self: Self, configs: list[Config]):
+        self.total = len(configs)
+        self.total_cost = sum(estimate_run_cost(c) for c in configs)
+        self.finished = 0
+        self.failed = 0
+        self.finished_cost = 0.0
+        self.start_time = time.monotonic()
+
+    def finish(self: Self, config: Config, failed: bool = False) -> None:
+        self.finished += 1
+        self.failed += failed
+        self.finished_cost += estimate_run_cost(config)
+
+    @property
+    def eta(self: Self) -> timedelta | None:
+        if not self.finished_cost:
+            return None
+        elapsed = time.monotonic() - self.start_time
+        remaining = self.total_cost - self.finished_cost
+        return timedelta(seconds=round(elapsed * remaining / self.finished_cost))
+
+    def __str__(self: Self) -> str:
+        eta = "unknown" if self.eta is None else self.eta
+        return (
+            f"Sweep progress: {self.finished}/{self.total} runs finished "
+            f"({self.failed} failed), ETA: {eta}"
+        )
+
+
+class RunScheduler:
+    """Conduct runs in parallel, without oversubscribing the node.
+
+    Each run is assigned a fixed number of threads. Runs are only admitted if
+    enough CPUs are free and their estimated memory fits into the remaining budget.
+    A run that exceeds the memory budget on its own is admitted once the node is
+    otherwise idle.
+
+    Runs are handed out one at a time, the most expensive first, to keep all
+    workers busy until the end of a sweep. Failing runs are retried and, if still
+    failing, reported without affecting the other runs.
+
+    Use as context manager, to keep the worker processes across calls of `run`.
+    Workers can further be started from a fork server which has imported the given
+    modules before, so that workers start up fast and share the memory of these
+    modules copy-on-write.
+    """
+
+    def __init__(
+        self: Self,
+        budget: NodeBudget,
+        pin: bool = False,
+        max_retries: int = 1,
+        preload: Iterable[str] = (),
+    ):
+        """Initialize the scheduler.
+
+        Args:
+            budget (NodeBudget): The resources available to the runs.
+            pin (bool, optional): Whether to pin runs to their CPUs.
+                Defaults to False.
+            max_retries (int, optional): The number of retries of a failing run.
+                Defaults to 1.
+            preload (Iterable[str], optional): The modules for the fork server to
+                import, no fork server if empty. Defaults to ().
+        """
+        self.budget = budget
+        self.pin = pin
+        self.max_retries = max_retries
+        self.preload = list(preload)
+        self.executor: ProcessPoolExecutor | None = None
+
+    def __enter__(self: Self) -> Self:
+        self.executor = self.__create_executor()
+        return self
+
+    def __exit__(self: Self, *_) -> None:
+        if self.executor:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
+
+    def __create_executor(self: Self) -> ProcessPoolExecutor:
+        mp_context = None
+        if self.preload:
+            # the thread pools preloaded by the fork server are limited per worker
+            mp_context = multiprocessing.get_context("forkserver")
+            mp_context.set_forkserver_preload(self.preload)
+        return ProcessPoolExecutor(
+            max_workers=self.budget.max_runs,
+            mp_context=mp_context,
+            initializer=limit_threads,
+            initargs=(self.budget.threads_per_run,),
+        )
+
+    def run(
+        self: Self,
+        fn: Callable[[Config], None],
+        configs: list[Config],
+        on_finish: Callable[[Config], None] | None = None,
+    ) -> list[RunFailure]:
+        """Conduct all runs, admitting them as resources become available.
+
+        Args:
+            fn (Callable[[Config], None]): The function conducting a single run.
+            configs (list[Config]): The configuration instances of the runs.
+            on_finish (Callable[[Config], None]?): Called with each run that
+                finished, successfully or after all its attempts failed.
+
+        Returns:
+            list[RunFailure]: The runs that failed in all their attempts.
+        """
+        if not self.executor:
+            raise RuntimeError("Scheduler must be used as context manager.")
+
+        pending = deque(sorted(configs, key=estimate_run_cost, reverse=True))
+        running: dict[Future[None], Allocation] = {}
+        attempts: dict[Config, int] = {c: 0 for c in configs}
+        failures: list[RunFailure] = []
+        progress = SweepProgress(configs)
+        free_cpus = list(self.budget.cpus)
+        free_memory = self.budget.memory
+        threads = self.budget.threads_per_run
+
+        while pending or running:
+            # admit as many pending runs as the budget allows
+            while pending and len(free_cpus) >= threads:
+                config = self.__next_fitting(pending, free_memory, idle=not running)
+                if config is None:
+                    break
+                memory = estimate_run_memory(config)
+                cpus, free_cpus = tuple(free_cpus[:threads]), free_cpus[threads:]
+                free_memory -= memory
+                attempts[config] += 1
+                future = self.executor.submit(
+                    run_pinned, fn, config, cpus if self.pin else ()
+                )
+                running[future] = Allocation(config, cpus, memory)
+
+            # wait for a run to finish and release its resources
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            broken = any(isinstance(f.exception(), BrokenProcessPool) for f in done)
+            if broken:  # a crashed worker fails all runs of the pool
+                done, _ = wait(running)
+            for future in done:
+                allocation = running.pop(future)
+                free_cpus.extend(allocation.cpus)
+                free_memory += allocation.memory
+                config = allocation.config
+
+                if (error := future.exception()) is None:
+                    progress.finish(config)
+                    logger.log(str(LogLevel.GREEN), str(progress))
+                    if on_finish:
+                        on_finish(config)
+                    continue
+
+                # isolate failure, retry or give up on run
+                message = "".join(traceback.format_exception(error))
+                run_id = f"{config.experiment}/{config.variant}/{config.run}"
+                if attempts[config] <= self.max_retries:
+                    logger.log(
+                        str(LogLevel.FAILURE),
+                        f"Run {run_id} failed in attempt {attempts[config]}, "
+                        f"retrying: {error!r}",
+                    )
+                    pending.appendleft(config)
+                else:
+                    logger.log(str(LogLevel.FAILURE), f"Run {run_id} failed: {message}")
+                    failures.append(RunFailure(config, attempts[config], message))
+                    progress.finish(config, failed=True)
+                    logger.log(str(LogLevel.GREEN), str(progress))
+                    if on_finish:
+                        on_finish(config)
+
+            # replace broken pool
+            if broken:
+                self.executor.shutdown(wait=True, cancel_futures=True)
+                self.executor = self.__create_executor()
+
+        return failures
+
+    @staticmethod
+    def __next_fitting(
+        pending: deque[Config], free_memory: int, idle: bool
+    ) -> Config | None:
+        """Pop first pending run fitting into the free memory.
+
+        Args:
+            pending (deque[Config]): The pending runs.
+            free_memory (int): The free memory in bytes.
+            idle (bool): Whether no run is currently running.
+
+        Returns:
+            Config | None: The run to admit, None if no run fits.
+        """
+        for config in pending:
+            if estimate_run_memory(config) <= free_memory:
+                pending.remove(config)
+                return config
+        if idle:
+            config = pending.popleft()
+            memory_gib = estimate_run_memory(config) / 1_024**3
+            logger.log(
+                str(LogLevel.YELLOW),
+                f"Run {config.run}@{config.variant} is estimated to exceed the "
+                f"memory budget ({memory_gib:.1f} GiB), running it exclusively.",
+            )
+            return config
+        return None
@@ -0,0 +1,181 @@
+import gzip
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from queue import Queue
+from threading import Thread
+from typing import Any, Final, Self
+
+import torch
+from app.utils.logging import LogLevel, logger
+
+__all__ = ["CheckpointWriter", "load_checkpoint", "save_checkpoint"]
+
+COMPRESSED_SUFFIX: Final[str] = ".gz"
+
+
+@dataclass(frozen=True)
+class CheckpointStats:
+    """Statistics of a written checkpoint."""
+
+    path: Path
+    bytes: int
+    seconds: float
+
+
+def to_cpu(obj: Any) -> Any:
+    """Recursively copy all tensors of a (nested) state dict to the CPU.
+
+    The copy decouples the snapshot from the live training state.
+
+    Args:
+        obj (Any): The state dict or any of its values.
+
+    Returns:
+        Any: The snapshot.
+    """
+    if isinstance(obj, torch.Tensor):
+        return obj.detach().to("cpu", copy=True)
+    if isinstance(obj, dict):
+        return {k: to_cpu(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return type(obj)(to_cpu(v) for v in obj)
+    return obj
+
+
+def save_checkpoint(state: dict[str, Any], path: Path) -> int:
+    """Save checkpoint atomically, compressed if path ends on `.gz`.
+
+    The checkpoint is written to a temporary file first and renamed afterwards,
+    so that a crash never leaves a partially written checkpoint behind.
+
+    Args:
+        state (dict[str, Any]): The state to save.
+        path (Path): The file path to save to.
+
+    Returns:
+        int: The number of bytes written.
+    """
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    if path.suffix == COMPRESSED_SUFFIX:
+        with gzip.open(tmp_path, "wb", compresslevel=1) as f:
+            torch.save(state, f)
+    else:
+        torch.save(state, tmp_path)
+    os.replace(tmp_path, path)
+    return path.stat().st_size
+
+
+def load_checkpoint(path: Path) -> dict[str, Any]:
+    """Load checkpoint, compressed if path ends on `.gz`.
+
+    Args:
+        path (Path): The file path to load from.
+
+    Returns:
+        dict[str, Any]: The loaded state.
+    """
+    if path.suffix == COMPRESSED_SUFFIX:
+        with gzip.open(path, "rb") as f:
+            return torch.load(f)
+    return torch.load(path)
+
+
+class CheckpointWriter:
+    """Write checkpoints in a background thread.
+
+    Submitting a checkpoint only snapshots the state to the CPU, the (optionally
+    compressed) write happens in the background. If more than `max_pending`
+    checkpoints are queued, submitting blocks until the writer has caught up.
+
+    Use as context manager, to ensure all checkpoints are written on exit.
+    """
+
+    def __init__(
+        self: Self,
+        keep: int | None = None,
+        compress: bool = False,
+        max_pending: int = 2,
+    ):
+        """Initialize the writer and start its thread.
+
+        Args:
+            keep (int?): Number of most recent checkpoints per dir to retain.
+                Defaults to None (retain all).
+            compress (bool, optional): Whether to gzip checkpoints. Defaults to False.
+            max_pending (int, optional): Max number of queued checkpoints.
+                Defaults to 2.
+        """
+        if keep is not None and keep < 1:
+            raise ValueError("At least one checkpoint must be kept.")
+        self.keep = keep
+        self.compress = compress
+        self.stats: list[CheckpointStats] = []
+        self.__error: BaseException | None = None
+        self.__queue: Queue[tuple[dict[str, Any], Path] | None] = Queue(max_pending)
+        self.__thread = Thread(target=self.__work, name="checkpoints", daemon=True)
+        self.__thread.start()
+
+    def __enter__(self: Self) -> Self:
+        return self
+
+    def __exit__(self: Self, *_) -> None:
+        self.close()
+
+    def submit(self: Self, state: dict[str, Any], path: Path) -> Path:
+        """Snapshot state and schedule it for writing.
+
+        Args:
+            state (dict[str, Any]): The state to save.
+            path (Path): The file path to save to, `.gz` is appended if compressed.
+
+        Returns:
+            Path: The final file path of the checkpoint.
+        """
+        self.__raise_error()
+        if self.compress:
+            path = path.with_name(path.name + COMPRESSED_SUFFIX)
+        self.__queue.put((to_cpu(state), path))
+        return path
+
+    def close(self: Self) -> None:
+        """Write all pending checkpoints and stop the thread."""
+        if self.__thread.is_alive():
+            self.__queue.put(None)
+            self.__thread.join()
+        self.__raise_error()
+
+    def __raise_error(self: Self) -> None:
+        if self.__error:
+            error, self.__error = self.__error, None
+            raise RuntimeError("Writing checkpoint failed.") from error
+
+    def __work(self: Self) -> None:
+        while (item := self.__queue.get()) is not None:
+            if self.__error:
+                continue  # drain queue, error is raised in the training thread
+            state, path = item
+            try:
+                start = time.perf_counter()
+                num_bytes = save_checkpoint(state, path)
+                stats = CheckpointStats(path, num_bytes, time.perf_counter() - start)
+                self.stats.append(stats)
+                logger.log(
+                    str(LogLevel.SAVE),
+                    f"Saved model: {path} "
+                    f"({stats.bytes / 1_024**2:.1f} MiB in {stats.seconds:.2f}s)",
+                )
+                self.__retain(path)
+            except BaseException as e:  # noqa: BLE001, raised in the training thread
+                self.__error = e
+
+    def __retain(self: Self, path: Path) -> None:
+        """Delete all but the `keep` most recent checkpoints of the path's dir."""
+        if self.keep is None:
+            return
+        suffix = "".join(path.suffixes)
+        checkpoints = [p for p in path.parent.iterdir() if p.name.endswith(suffix)]
+        checkpoints.sort(key=lambda p: p.stat().st_mtime_ns)
+        for old in checkpoints[: -self.keep]:
+            old.unlink(missing_ok=True)
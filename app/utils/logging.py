@@ -1,13 +1,24 @@
 import csv
+import os
+import shutil
 import sys
 import time
-from dataclasses import asdict, dataclass, field
+from dataclasses import asdict, dataclass, field, fields
 from enum import Enum
 from pathlib import Path
-from typing import Self
+from typing import TYPE_CHECKING, Any, Final, Self
 
 from loguru import logger
 
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+# the number of episodes to buffer before flushing them to the log files
+LOG_BUFFER_SIZE: Final[int] = 100
+
+# seconds after which buffered episodes are flushed at the latest
+LOG_FLUSH_INTERVAL: Final[float] = 30.0
+
 
 class LogLevel(Enum):
     VICTORY = "VICTORY"
@@ -16,6 +27,7 @@ class LogLevel(Enum):
     SAVE = "SAVE"
     GREEN = "GREEN"
     YELLOW = "YELLOW"
+    FAILURE = "FAILURE"
 
     def __str__(self: Self) -> str:
         return self.value
@@ -33,6 +45,7 @@ logger.level(str(LogLevel.VIDEO), no=47, icon="🎥")
 logger.level(str(LogLevel.SAVE), no=46, icon="💾")
 logger.level(str(LogLevel.GREEN), no=36)
 logger.level(str(LogLevel.YELLOW), no=37)
+logger.level(str(LogLevel.FAILURE), no=45, icon="🔥")
 
 logger.add(
     sys.stderr,
@@ -54,6 +67,11 @@ logger.add(
     format=msg_fmt.format(color="yellow"),
     filter=lambda record: record["level"].name == str(LogLevel.SAVE),
 )
+logger.add(
+    sys.stderr,
+    format=msg_fmt.format(color="red"),
+    filter=lambda record: record["level"].name == str(LogLevel.FAILURE),
+)
 logger.add(
     sys.stderr,
     format="<green>{message}</>",
@@ -78,6 +96,36 @@ class EpisodeLog:
     steps: int = 0
     time: float = field(init=False)
 
+    # seconds spent per phase of the steps, see `PhaseTimer`
+    emulator_time: float = 0.0
+    preprocess_time: float = 0.0
+    act_time: float = 0.0
+    remember_time: float = 0.0
+    sample_time: float = 0.0
+    encode_time: float = 0.0
+    learn_time: float = 0.0
+    log_time: float = 0.0
+
+    @property
+    def phase_shares(self: Self) -> dict[str, float]:
+        """The share of each phase in the total time of the phases."""
+        times = {
+            f.name.removesuffix("_time"): getattr(self, f.name)
+            for f in fields(self)
+            if f.name.endswith("_time")
+        }
+        total = sum(times.values())
+        return {phase: t / total for phase, t in times.items()} if total else {}
+
+    def record_phases(self: Self, seconds: dict[str, float]) -> None:
+        """Record the seconds spent per phase of the steps.
+
+        Args:
+            seconds (dict[str, float]): The seconds by phase.
+        """
+        for phase, value in seconds.items():
+            setattr(self, f"{phase}_time", value)
+
     def start_timer(self: Self) -> None:
         self.__start_time = time.time()
 
@@ -97,26 +145,181 @@ class EpisodeLog:
             f"{self.steps:04d}",
             f"{self.time:05.2f}",
         )
+        if shares := self.phase_shares:
+            phase = max(shares, key=shares.__getitem__)
+            fields = (*fields, f"{phase} {shares[phase]:.0%}")
         return " | ".join(fields)
 
 
+def episode_log_schema() -> "pa.Schema":
+    """Provide the fixed schema of the columnar episode logs."""
+    import pyarrow as pa
+
+    types = {int: pa.int64(), float: pa.float64(), str: pa.string()}
+    return pa.schema([(f.name, types[f.type]) for f in fields(EpisodeLog)])
+
+
+def log_parts_dir(log_file: Path) -> Path:
+    """Provide the dir of the columnar parts of an episode log.
+
+    Args:
+        log_file (Path): The CSV file of the episode log.
+
+    Returns:
+        Path: The dir of the Parquet files, one per flushed batch of episodes.
+    """
+    return log_file.with_suffix(".parquet")
+
+
+def write_log_part(parts_dir: Path, table: "pa.Table") -> None:
+    """Write a batch of episodes as a Parquet file, named by its episode range.
+
+    Args:
+        parts_dir (Path): The dir of the columnar parts of the episode log.
+        table (pa.Table): The episodes, ordered by episode.
+    """
+    import pyarrow.parquet as pq
+
+    if table.num_rows == 0:
+        return
+    episodes = table.column("episode")
+    name = f"part-{episodes[0].as_py():06d}-{episodes[-1].as_py():06d}.parquet"
+
+    # write atomically, hidden files are ignored by readers
+    parts_dir.mkdir(parents=True, exist_ok=True)
+    tmp_file = parts_dir / f".{name}.tmp"
+    pq.write_table(table, tmp_file)
+    os.replace(tmp_file, parts_dir / name)
+
+
+def relabel_log_parts(source_dir: Path, target_dir: Path, **labels: str) -> None:
+    """Copy the columnar parts of an episode log into a single part, relabeled.
+
+    Args:
+        source_dir (Path): The dir of the parts to copy.
+        target_dir (Path): The dir to copy the parts to, replacing its parts.
+        labels (str): The values to replace the columns of the same names with.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = pq.read_table(source_dir, schema=episode_log_schema())
+    for name, value in labels.items():
+        column = pa.array([value] * table.num_rows, pa.string())
+        table = table.set_column(table.schema.get_field_index(name), name, column)
+    shutil.rmtree(target_dir, ignore_errors=True)
+    write_log_part(target_dir, table)
+
+
 class EpisodeLogger:
-    def __init__(self: Self, log_file: Path):
+    """Log episodes to the console immediately, and to files in batches.
+
+    Episodes are buffered and flushed to a Parquet file per batch, and appended
+    to a CSV file for compatibility. Batches are flushed once the buffer is full,
+    after a while, before snapshotting the training state, and on exit, if used as
+    context manager.
+    """
+
+    def __init__(
+        self: Self,
+        log_file: Path,
+        buffer_size: int = LOG_BUFFER_SIZE,
+        flush_interval: float = LOG_FLUSH_INTERVAL,
+    ):
+        """Initialize the logger.
+
+        Args:
+            log_file (Path): The CSV file, the Parquet files are stored beside.
+            buffer_size (int, optional): The number of episodes to buffer.
+                Defaults to LOG_BUFFER_SIZE.
+            flush_interval (float, optional): Seconds after which buffered episodes
+                are flushed at the latest. Defaults to LOG_FLUSH_INTERVAL.
+        """
         self.log_file = log_file
+        self.parts_dir = log_parts_dir(log_file)
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.buffer: list[dict[str, Any]] = []
+        self.last_flush = time.monotonic()
+
+    def __enter__(self: Self) -> Self:
+        return self
+
+    def __exit__(self: Self, *_) -> None:
+        self.flush()
 
     def log(self: Self, message: EpisodeLog | str, level: LogLevel | str = "") -> None:
         if isinstance(message, EpisodeLog):
             level = LogLevel.VICTORY if message.reward > 0 else LogLevel.DEFEAT
             logger.log(str(level), message)
-            self.__log_to_csv(message)
+            self.buffer.append(asdict(message))
+            if (
+                len(self.buffer) >= self.buffer_size
+                or time.monotonic() - self.last_flush >= self.flush_interval
+            ):
+                self.flush()
         else:
             logger.log(str(level), message)
 
-    def __log_to_csv(self: Self, episode_log: EpisodeLog) -> None:
+    def flush(self: Self) -> None:
+        """Write all buffered episodes to the log files."""
+        self.last_flush = time.monotonic()
+        if not self.buffer:
+            return
+        import pyarrow as pa
+
+        table = pa.Table.from_pylist(self.buffer, schema=episode_log_schema())
+        write_log_part(self.parts_dir, table)
+        self.__append_to_csv(self.buffer)
+        self.buffer = []
+
+    def __append_to_csv(self: Self, rows: list[dict[str, Any]]) -> None:
         self.log_file.parent.mkdir(parents=True, exist_ok=True)
-        self.log_file.touch()
         with open(self.log_file, "a", newline="") as f:
-            writer = csv.DictWriter(f, fieldnames=episode_log.__annotations__.keys())
+            writer = csv.DictWriter(f, fieldnames=rows[0].keys())
             if f.tell() == 0:  # file is empty, write a header
                 writer.writeheader()
-            writer.writerow(asdict(episode_log))
+            writer.writerows(rows)
+
+    def truncate(self: Self, last_episode: int) -> None:
+        """Drop all logged episodes after the given one, e.g. when resuming a run.
+
+        Args:
+            last_episode (int): The last episode to keep, 0 to drop all.
+        """
+        self.flush()
+        self.__truncate_parts(last_episode)
+        if not self.log_file.exists():
+            return
+        if last_episode == 0:
+            self.log_file.unlink()
+            return
+        tmp_file = self.log_file.with_name(f"{self.log_file.name}.tmp")
+        with (
+            open(self.log_file, newline="") as src,
+            open(tmp_file, "w", newline="") as dst,
+        ):
+            reader = csv.DictReader(src)
+            writer = csv.DictWriter(dst, fieldnames=reader.fieldnames or [])
+            writer.writeheader()
+            writer.writerows(r for r in reader if int(r["episode"]) <= last_episode)
+        os.replace(tmp_file, self.log_file)
+
+    def __truncate_parts(self: Self, last_episode: int) -> None:
+        if last_episode == 0:
+            shutil.rmtree(self.parts_dir, ignore_errors=True)
+            return
+        if not self.parts_dir.exists():
+            return
+        import pyarrow.compute as pc
+        import pyarrow.parquet as pq
+
+        for part in sorted(self.parts_dir.glob("part-*.parquet")):
+            first, last = map(int, part.stem.split("-")[1:])
+            if last <= last_episode:
+                continue
+            if first <= last_episode:
+                table = pq.read_table(part)
+                mask = pc.less_equal(table.column("episode"), last_episode)
+                write_log_part(self.parts_dir, table.filter(mask))
+            part.unlink()
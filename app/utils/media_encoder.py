@@ -0,0 +1,219 @@
+import multiprocessing as mp
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from queue import Full
+from typing import TYPE_CHECKING, Any, Final, Literal, NamedTuple, Self
+
+import numpy as np
+from app.utils.logging import LogLevel, logger
+from app.utils.silence_stdout import silence_stdout
+
+if TYPE_CHECKING:
+    import gym
+
+# the max number of frames and images queued for the encoder, about 100 KiB each
+MAX_PENDING_MEDIA: Final[int] = 512
+
+
+class MediaTask(NamedTuple):
+    """A piece of work for the encoder process."""
+
+    kind: Literal["frame", "video", "image"]
+    path: Path
+    data: Any  # the frame, the fps, or the state
+
+
+def take_picture_of_state(state: np.ndarray, f_name: Path) -> None:
+    """Save brightened picture of current state to file.
+
+    Args:
+        state (np.ndarray): The state to taken picture of, left unchanged.
+        f_name (Path): The file path to save to.
+    """
+    import cv2 as cv
+
+    state_transposed = np.transpose(state, (1, 2, 0)) * 255  # increase brightness
+    cv.imwrite(str(f_name), state_transposed)
+
+
+def write_video(path: Path, frames: list[np.ndarray], fps: int) -> None:
+    """Encode frames to a video file.
+
+    Args:
+        path (Path): The file path to save to.
+        frames (list[np.ndarray]): The RGB frames.
+        fps (int): The frames per second.
+    """
+    from moviepy.video.io.ImageSequenceClip import ImageSequenceClip
+
+    if not frames:
+        return
+    # shut the f*ck up, moviepy!
+    with silence_stdout():
+        ImageSequenceClip(frames, fps=fps).write_videofile(str(path), logger=None)
+
+
+def log_failure(path: Path, error: BaseException | None) -> None:
+    """Log the failure to encode a file, if any."""
+    if error:
+        message = "".join(traceback.format_exception(error))
+        logger.log(str(LogLevel.FAILURE), f"Encoding {path} failed: {message}")
+
+
+def encode_media(queue: "mp.Queue[MediaTask | None]") -> None:
+    """Consume media tasks until receiving None, the entry point of the encoder.
+
+    Frames are collected per video, which is encoded in a thread once complete, so
+    that the queue keeps being drained while encoding.
+
+    Args:
+        queue (mp.Queue[MediaTask | None]): The queue to consume.
+    """
+    videos: dict[Path, list[np.ndarray]] = {}
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        while (task := queue.get()) is not None:
+            if task.kind == "frame":
+                videos.setdefault(task.path, []).append(task.data)
+                continue
+            if task.kind == "video":
+                future = executor.submit(
+                    write_video, task.path, videos.pop(task.path, []), task.data
+                )
+            else:
+                future = executor.submit(take_picture_of_state, task.data, task.path)
+            future.add_done_callback(
+                lambda f, path=task.path: log_failure(path, f.exception())
+            )
+
+
+class MediaEncoder:
+    """Encode videos and images in a background process.
+
+    Frames and images are copied into a bounded queue, consumed by the encoder
+    process, which is started on first use. The training never waits for the
+    encoder: if the queue is full, frames and images are dropped, and the number
+    of dropped frames is logged with their video. Only the completion of a video
+    is always queued, waiting for a free slot if necessary.
+
+    Use as context manager, to wait for all media to be written on exit.
+    """
+
+    def __init__(self: Self, max_pending: int = MAX_PENDING_MEDIA):
+        """Initialize the encoder.
+
+        Args:
+            max_pending (int, optional): The max number of queued frames and images.
+                Defaults to MAX_PENDING_MEDIA.
+        """
+        self.max_pending = max_pending
+        self.dropped: dict[Path, int] = {}
+        self.__queue: mp.Queue[MediaTask | None] | None = None
+        self.__process: mp.process.BaseProcess | None = None
+
+    def __enter__(self: Self) -> Self:
+        return self
+
+    def __exit__(self: Self, *_) -> None:
+        self.close()
+
+    def record(self: Self, env: "gym.Env", path: Path) -> "VideoCapture":
+        """Start recording a video of the environment.
+
+        Args:
+            env (gym.Env): The environment to record.
+            path (Path): The file path to save the video to.
+
+        Returns:
+            VideoCapture: The capture, to capture frames with and to close.
+        """
+        return VideoCapture(self, env, path)
+
+    def save_image(self: Self, path: Path, state: np.ndarray) -> None:
+        """Save picture of the state, unless the queue is full.
+
+        Args:
+            path (Path): The file path to save to.
+            state (np.ndarray): The state to take a picture of.
+        """
+        # copy, as the queue pickles in the background
+        self.__offer(MediaTask("image", path, np.array(state)))
+
+    def add_frame(self: Self, path: Path, frame: np.ndarray) -> None:
+        """Add a frame to a video, unless the queue is full.
+
+        Args:
+            path (Path): The file path of the video.
+            frame (np.ndarray): The RGB frame.
+        """
+        if not self.__offer(MediaTask("frame", path, np.array(frame))):
+            self.dropped[path] = self.dropped.get(path, 0) + 1
+
+    def finish_video(self: Self, path: Path, fps: int) -> None:
+        """Complete a video, to be encoded from its frames.
+
+        Args:
+            path (Path): The file path of the video.
+            fps (int): The frames per second.
+        """
+        if dropped := self.dropped.pop(path, 0):
+            logger.log(
+                str(LogLevel.YELLOW),
+                f"Dropped {dropped} frames of video {path}, the encoder is behind.",
+            )
+        self.__start().put(MediaTask("video", path, fps))
+
+    def close(self: Self) -> None:
+        """Wait for all media to be written and stop the encoder process."""
+        if self.__queue is None or self.__process is None:
+            return
+        self.__queue.put(None)
+        self.__process.join()
+        self.__queue.close()
+        self.__queue = self.__process = None
+
+    def __offer(self: Self, task: MediaTask) -> bool:
+        """Queue the task, unless the queue is full.
+
+        Returns:
+            bool: Whether the task was queued.
+        """
+        try:
+            self.__start().put_nowait(task)
+            return True
+        except Full:
+            return False
+
+    def __start(self: Self) -> "mp.Queue[MediaTask | None]":
+        """Start the encoder process, unless running."""
+        if self.__queue is None:
+            # spawn, as forking the multi-threaded training process is unsafe
+            context = mp.get_context("spawn")
+            self.__queue = context.Queue(self.max_pending)
+            self.__process = context.Process(
+                target=encode_media, args=(self.__queue,), name="media", daemon=True
+            )
+            self.__process.start()
+        return self.__queue
+
+
+class VideoCapture:
+    """Capture frames of an environment as a video, encoded in the background.
+
+    A drop-in replacement for gym's `VideoRecorder`.
+    """
+
+    def __init__(self: Self, encoder: MediaEncoder, env: "gym.Env", path: Path):
+        self.encoder = encoder
+        self.env = env
+        self.path = path
+        self.fps = env.metadata.get("render_fps", 30)
+
+    def capture_frame(self: Self) -> None:
+        """Render the environment and add the frame to the video."""
+        if (frame := self.env.render()) is not None:
+            self.encoder.add_frame(self.path, frame)  # type: ignore
+
+    def close(self: Self) -> None:
+        """Complete the video."""
+        self.encoder.finish_video(self.path, self.fps)
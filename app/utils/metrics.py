@@ -0,0 +1,125 @@
+import json
+import os
+import resource
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Final, Self
+
+from app.utils.logging import EpisodeLog
+
+METRICS_FILE: Final[str] = "metrics.json"
+
+# seconds between publications of the metrics of a run
+METRICS_INTERVAL: Final[float] = 5.0
+
+# the number of episodes to average the recent reward over
+RECENT_EPISODES: Final[int] = 10
+
+
+def current_rss() -> int:
+    """Return the resident set size of the current process in bytes."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:  # no procfs, fall back to the peak
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1_024
+
+
+def read_metrics(file: Path) -> dict[str, Any] | None:
+    """Read the metrics published by a run.
+
+    Args:
+        file (Path): The metrics file.
+
+    Returns:
+        dict[str, Any] | None: The metrics, None if not published (yet).
+    """
+    try:
+        return json.loads(file.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+class MetricsWriter:
+    """Publish live metrics of a run to its result dir, for the sweep monitor.
+
+    Counters are updated after each episode, the metrics are written at most
+    every few seconds, atomically. Rates refer to the time since the previous
+    publication.
+    """
+
+    def __init__(self: Self, result_dir: Path, interval: float = METRICS_INTERVAL):
+        """Initialize the writer.
+
+        Args:
+            result_dir (Path): The result dir of the run.
+            interval (float, optional): Seconds between publications.
+                Defaults to METRICS_INTERVAL.
+        """
+        self.file = result_dir / METRICS_FILE
+        self.interval = interval
+        self.started = time.time()
+        self.episodes = 0
+        self.env_steps = 0
+        self.grad_steps = 0
+        self.rewards: deque[float] = deque(maxlen=RECENT_EPISODES)
+        self.labels: dict[str, Any] = {}
+        self.gauges: dict[str, float] = {}
+        self.last_write = time.monotonic()
+        self.last_counts = (0, 0, 0)
+
+    def update(
+        self: Self, episode_log: EpisodeLog, replay_fill: float, grad_steps: int
+    ) -> None:
+        """Account for a finished episode, publish the metrics if due.
+
+        Args:
+            episode_log (EpisodeLog): The log of the finished episode.
+            replay_fill (float): The fill ratio of the replay memory.
+            grad_steps (int): The number of gradient steps taken by the agent.
+        """
+        self.labels = {
+            "experiment": episode_log.experiment,
+            "variant": episode_log.variant,
+            "run": episode_log.run,
+        }
+        self.episodes += 1
+        self.env_steps += episode_log.steps
+        self.grad_steps = grad_steps
+        self.rewards.append(episode_log.reward)
+        self.gauges = {
+            "episode": episode_log.episode,
+            "epsilon": episode_log.epsilon,
+            "replay_fill": replay_fill,
+        }
+        if time.monotonic() - self.last_write >= self.interval:
+            self.write()
+
+    def write(self: Self) -> None:
+        """Publish the current metrics."""
+        if not self.labels:
+            return
+        now = time.monotonic()
+        elapsed = max(now - self.last_write, 1e-9)
+        counts = (self.episodes, self.env_steps, self.grad_steps)
+        episodes, env_steps, grad_steps = (
+            c - last for c, last in zip(counts, self.last_counts)
+        )
+        metrics = self.labels | {
+            "started": self.started,
+            "updated": time.time(),
+            "episodes": self.episodes,
+            "env_steps": self.env_steps,
+            "grad_steps": self.grad_steps,
+            "episodes_per_second": episodes / elapsed,
+            "env_steps_per_second": env_steps / elapsed,
+            "grad_steps_per_second": grad_steps / elapsed,
+            "recent_reward": sum(self.rewards) / len(self.rewards),
+            "rss_bytes": current_rss(),
+        }
+        tmp_file = self.file.with_name(f"{self.file.name}.tmp")
+        tmp_file.write_text(json.dumps(metrics | self.gauges))
+        os.replace(tmp_file, self.file)
+        self.last_write = now
+        self.last_counts = counts
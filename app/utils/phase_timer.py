@@ -0,0 +1,74 @@
+from time import perf_counter_ns
+from typing import Final, Self
+
+# the phases of a training step, in order of their occurrence
+PHASES: Final[tuple[str, ...]] = (
+    "emulator",
+    "preprocess",
+    "act",
+    "remember",
+    "sample",
+    "encode",
+    "learn",
+    "log",
+)
+
+
+class PhaseTimer:
+    """Accumulate the time spent in the phases of the training steps.
+
+    Each step is started by `tick`, each phase is ended by `lap`, attributing the
+    time since the previous lap to it. Thus, a step is covered completely, at the
+    cost of a single clock read per phase. To reduce the overhead further, only
+    every n-th step may be timed, the totals are extrapolated to all steps.
+    """
+
+    def __init__(self: Self, sample_interval: int = 1):
+        """Initialize the timer.
+
+        Args:
+            sample_interval (int, optional): Time every n-th step only, 0 to
+                disable timing. Defaults to 1.
+        """
+        self.sample_interval = sample_interval
+        self.reset()
+
+    def reset(self: Self) -> None:
+        """Discard all accumulated times, e.g. at the start of an episode."""
+        self.totals: dict[str, int] = {}
+        self.steps = 0
+        self.timed_steps = 0
+        self.timing = False
+        self.last = 0
+
+    def tick(self: Self) -> None:
+        """Start a step, which is timed if it is a sampled one."""
+        self.timing = (
+            self.sample_interval > 0 and self.steps % self.sample_interval == 0
+        )
+        self.steps += 1
+        if self.timing:
+            self.timed_steps += 1
+            self.last = perf_counter_ns()
+
+    def lap(self: Self, phase: str) -> None:
+        """End a phase of the current step.
+
+        Args:
+            phase (str): The phase, attributed the time since the previous lap.
+        """
+        if self.timing:
+            now = perf_counter_ns()
+            self.totals[phase] = self.totals.get(phase, 0) + now - self.last
+            self.last = now
+
+    def seconds(self: Self) -> dict[str, float]:
+        """Provide the total time per phase since the last reset.
+
+        Returns:
+            dict[str, float]: The seconds per phase, extrapolated to all steps.
+        """
+        if not self.timed_steps:
+            return {}
+        scale = self.steps / self.timed_steps / 1e9
+        return {phase: total * scale for phase, total in self.totals.items()}
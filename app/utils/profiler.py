@@ -0,0 +1,122 @@
+from pathlib import Path
+from typing import TYPE_CHECKING, Final, Self
+
+from app.config import Config
+from app.utils.logging import LogLevel, logger
+
+if TYPE_CHECKING:
+    import torch.profiler
+
+PROFILE_DIR: Final[str] = "profile"
+
+# the number of operators in the summary tables
+TOP_OPS: Final[int] = 30
+
+
+def profile_episodes(config: Config) -> range | None:
+    """Return the episodes of the run to profile, if any.
+
+    Args:
+        config (Config): The configuration object of the run.
+
+    Returns:
+        range | None: The episodes to profile, None if the run is not profiled.
+    """
+    if config.profile_episode is None:
+        return None
+    if config.profile_run is not None and config.run != config.profile_run:
+        return None
+    start = config.profile_episode
+    return range(start, start + config.profile_episode_count)
+
+
+class EpisodeProfiler:
+    """Profile a window of episodes with the torch profiler.
+
+    Records CPU (and CUDA) operators with their memory, shapes and call stacks,
+    every episode labelled as such. Once the window ends, the trace is exported in
+    the Chrome trace format, to be opened in `chrome://tracing` or Perfetto, along
+    with tables of the top operators by time and by memory.
+
+    Use as context manager, to export a pending trace on exit, even on failure.
+    """
+
+    def __init__(self: Self, profile_dir: Path, episodes: range | None):
+        """Initialize the profiler.
+
+        Args:
+            profile_dir (Path): The dir to save the traces and tables to.
+            episodes (range | None): The episodes to profile, None to profile none.
+        """
+        self.profile_dir = profile_dir
+        self.episodes = episodes or range(0)
+        self.__profile: torch.profiler.profile | None = None
+        self.__label: torch.profiler.record_function | None = None
+
+    def __enter__(self: Self) -> Self:
+        return self
+
+    def __exit__(self: Self, *_) -> None:
+        self.__stop()
+
+    def start_episode(self: Self, episode: int) -> None:
+        """Start profiling the episode, if in the window.
+
+        Args:
+            episode (int): The episode about to start.
+        """
+        if episode not in self.episodes:
+            return
+        import torch
+        import torch.profiler
+
+        if self.__profile is None:
+            activities = [torch.profiler.ProfilerActivity.CPU]
+            if torch.cuda.is_available():
+                activities.append(torch.profiler.ProfilerActivity.CUDA)
+            self.__profile = torch.profiler.profile(
+                activities=activities,
+                record_shapes=True,
+                profile_memory=True,
+                with_stack=True,
+            )
+            self.__profile.start()
+            logger.log(str(LogLevel.YELLOW), f"Profiling from episode {episode}")
+        self.__label = torch.profiler.record_function(f"episode_{episode}")
+        self.__label.__enter__()
+
+    def end_episode(self: Self, episode: int) -> None:
+        """Stop profiling the episode, export the trace if the window ends.
+
+        Args:
+            episode (int): The episode just finished.
+        """
+        if self.__label is not None:
+            self.__label.__exit__(None, None, None)
+            self.__label = None
+        if self.episodes and episode == self.episodes[-1]:
+            self.__stop()
+
+    def __stop(self: Self) -> None:
+        """Stop profiling and export the trace and tables, if profiling."""
+        if self.__profile is None:
+            return
+        if self.__label is not None:
+            self.__label.__exit__(None, None, None)
+            self.__label = None
+        profile, self.__profile = self.__profile, None
+        profile.stop()
+
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+        trace_file = self.profile_dir / "trace.json"
+        profile.export_chrome_trace(str(trace_file))
+        averages = profile.key_averages()
+        device = "cuda" if len(profile.activities) > 1 else "cpu"
+        sort_keys = {
+            "time": f"self_{device}_time_total",
+            "memory": f"self_{device}_memory_usage",
+        }
+        for name, sort_by in sort_keys.items():
+            table = averages.table(sort_by=sort_by, row_limit=TOP_OPS)
+            (self.profile_dir / f"top_ops_by_{name}.txt").write_text(table)
+        logger.log(str(LogLevel.YELLOW), f"Saved profile: {trace_file}")
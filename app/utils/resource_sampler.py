@@ -0,0 +1,112 @@
+import csv
+import os
+import threading
+import time
+from pathlib import Path
+from threading import Event, Thread
+from typing import Any, Final, Self
+
+from app.memory import ReplayMemory
+from app.utils.metrics import current_rss
+
+RESOURCES_FILE: Final[str] = "resources.csv"
+
+RESOURCE_COLUMNS: Final[tuple[str, ...]] = (
+    "time",
+    "episode",
+    "cpu_user",
+    "cpu_system",
+    "rss_bytes",
+    "replay_bytes",
+    "threads",
+    "torch_allocated_bytes",
+    "torch_reserved_bytes",
+)
+
+
+def count_threads() -> int:
+    """Return the number of OS threads of the current process."""
+    try:
+        return len(os.listdir("/proc/self/task"))
+    except OSError:  # no procfs, count the Python threads only
+        return threading.active_count()
+
+
+def torch_allocator_stats() -> tuple[int, int]:
+    """Return the bytes allocated and reserved by the CUDA caching allocator."""
+    import torch
+
+    if not torch.cuda.is_available():
+        return 0, 0
+    return torch.cuda.memory_allocated(), torch.cuda.memory_reserved()
+
+
+class ResourceSampler:
+    """Sample the resource usage of the current process in a background thread.
+
+    The samples are appended to a CSV file, tagged with the current episode, to
+    be joined with the training log. Use as context manager, to sample while in
+    context.
+    """
+
+    def __init__(
+        self: Self,
+        file: Path,
+        memory: ReplayMemory,
+        interval: float | None = 10.0,
+    ):
+        """Initialize the sampler.
+
+        Args:
+            file (Path): The file to append the samples to.
+            memory (ReplayMemory): The replay memory to sample the size of.
+            interval (float?): Seconds between samples, None to disable sampling.
+                Defaults to 10.0.
+        """
+        self.file = file
+        self.memory = memory
+        self.interval = interval
+        self.episode = 0
+        self.stopped = Event()
+        self.thread = Thread(target=self.__sample, name="sampler", daemon=True)
+
+    def __enter__(self: Self) -> Self:
+        if self.interval:
+            self.thread.start()
+        return self
+
+    def __exit__(self: Self, *_) -> None:
+        self.stopped.set()
+        if self.thread.is_alive():
+            self.thread.join()
+
+    def sample(self: Self) -> dict[str, Any]:
+        """Take a sample of the resource usage.
+
+        Returns:
+            dict[str, Any]: The sample, by column.
+        """
+        times = os.times()
+        allocated, reserved = torch_allocator_stats()
+        return {
+            "time": time.time(),
+            "episode": self.episode,
+            "cpu_user": times.user,
+            "cpu_system": times.system,
+            "rss_bytes": current_rss(),
+            "replay_bytes": self.memory.nbytes,
+            "threads": count_threads(),
+            "torch_allocated_bytes": allocated,
+            "torch_reserved_bytes": reserved,
+        }
+
+    def __sample(self: Self) -> None:
+        self.file.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.file, "a", newline="", buffering=1) as f:
+            writer = csv.DictWriter(f, fieldnames=RESOURCE_COLUMNS)
+            if f.tell() == 0:  # file is empty, write a header
+                writer.writeheader()
+            writer.writerow(self.sample())
+            while not self.stopped.wait(self.interval):
+                writer.writerow(self.sample())
+            writer.writerow(self.sample())
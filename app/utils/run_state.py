@@ -0,0 +1,179 @@
+import os
+import random
+import shutil
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Final
+
+from app.utils.logging import LogLevel, logger
+
+# torch is only imported where used, to keep the run markers cheap to import
+if TYPE_CHECKING:
+    from app.agents import DqnAbstractAgent
+
+__all__ = [
+    "copy_snapshot",
+    "has_snapshot",
+    "is_complete",
+    "load_snapshot",
+    "mark_complete",
+    "remove_snapshot",
+    "save_snapshot",
+]
+
+SNAPSHOT_DIR: Final[str] = "snapshot"
+SNAPSHOT_STATE_FILE: Final[str] = "state.pth"
+COMPLETE_FILE: Final[str] = "complete"
+
+
+def capture_rng_state() -> dict[str, Any]:
+    """Capture the state of all random number generators in use."""
+    import numpy as np
+    import torch
+
+    state = {
+        "python": random.getstate(),
+        "numpy": np.random.get_state(),
+        "torch": torch.get_rng_state(),
+    }
+    if torch.cuda.is_available():
+        state["cuda"] = torch.cuda.get_rng_state_all()
+    return state
+
+
+def restore_rng_state(state: dict[str, Any]) -> None:
+    """Restore the state of all random number generators in use."""
+    import numpy as np
+    import torch
+
+    random.setstate(state["python"])
+    np.random.set_state(state["numpy"])
+    torch.set_rng_state(state["torch"])
+    if "cuda" in state and torch.cuda.is_available():
+        torch.cuda.set_rng_state_all(state["cuda"])
+
+
+def has_snapshot(run_dir: Path) -> bool:
+    """Whether the run dir holds a snapshot to resume training from."""
+    return (run_dir / SNAPSHOT_DIR / SNAPSHOT_STATE_FILE).exists()
+
+
+def save_snapshot(run_dir: Path, episode: int, agent: "DqnAbstractAgent") -> None:
+    """Persist the full training state after the given episode.
+
+    The replay memory is dumped to a file named by episode first, the state file
+    referencing it is replaced afterwards. Thus, an interrupted snapshot always
+    leaves the previous snapshot intact.
+
+    Args:
+        run_dir (Path): The result dir of the run.
+        episode (int): The last completed episode.
+        agent (DqnAbstractAgent): The agent, including its replay memory.
+    """
+    from app.utils.checkpoint import save_checkpoint
+
+    snapshot_dir = run_dir / SNAPSHOT_DIR
+    snapshot_dir.mkdir(parents=True, exist_ok=True)
+
+    replay_file = f"replay_{episode}.bin"
+    agent.memory.dump(snapshot_dir / replay_file)
+    state = {
+        "episode": episode,
+        "agent": agent.training_state(),
+        "rng": capture_rng_state(),
+        "replay_file": replay_file,
+    }
+    save_checkpoint(state, snapshot_dir / SNAPSHOT_STATE_FILE)
+
+    # remove outdated replay dumps
+    for file in snapshot_dir.glob("replay_*.bin"):
+        if file.name != replay_file:
+            file.unlink()
+
+
+def load_snapshot(run_dir: Path, agent: "DqnAbstractAgent") -> int | None:
+    """Restore the full training state from the run dir's snapshot.
+
+    Args:
+        run_dir (Path): The result dir of the run.
+        agent (DqnAbstractAgent): The agent to restore, including its memory.
+
+    Returns:
+        int | None: The last completed episode, None if there is no valid snapshot.
+    """
+    from app.utils.checkpoint import load_checkpoint
+
+    snapshot_dir = run_dir / SNAPSHOT_DIR
+    if not has_snapshot(run_dir):
+        return None
+    try:
+        state = load_checkpoint(snapshot_dir / SNAPSHOT_STATE_FILE)
+        agent.memory.load(snapshot_dir / state["replay_file"])
+    except (OSError, ValueError, RuntimeError) as e:
+        logger.log(str(LogLevel.YELLOW), f"Discarding invalid snapshot: {e}")
+        return None
+    agent.load_training_state(state["agent"])
+    restore_rng_state(state["rng"])
+    return state["episode"]
+
+
+def copy_snapshot(source_dir: Path, target_dir: Path, copy_replay: bool = True) -> None:
+    """Continue the target run from the snapshot of the source run.
+
+    The target run keeps the states of its random number generators, so that both
+    runs diverge from here on. Unless the replay memory is copied as well, the
+    target run also keeps its own replay memory, if it has any.
+
+    Args:
+        source_dir (Path): The result dir of the run to copy from.
+        target_dir (Path): The result dir of the run to copy to.
+        copy_replay (bool, optional): Whether to copy the replay memory.
+            Defaults to True.
+    """
+    from app.utils.checkpoint import load_checkpoint, save_checkpoint
+
+    source_snapshot_dir = source_dir / SNAPSHOT_DIR
+    target_snapshot_dir = target_dir / SNAPSHOT_DIR
+    state = load_checkpoint(source_snapshot_dir / SNAPSHOT_STATE_FILE)
+    if has_snapshot(target_dir):
+        target_state = load_checkpoint(target_snapshot_dir / SNAPSHOT_STATE_FILE)
+        state["rng"] = target_state["rng"]
+        if not copy_replay:
+            state["replay_file"] = target_state["replay_file"]
+    else:
+        copy_replay = True  # nothing to keep
+    target_snapshot_dir.mkdir(parents=True, exist_ok=True)
+
+    replay_file = target_snapshot_dir / state["replay_file"]
+    if copy_replay:
+        tmp_file = replay_file.with_name(f"{replay_file.name}.tmp")
+        shutil.copyfile(source_snapshot_dir / state["replay_file"], tmp_file)
+        os.replace(tmp_file, replay_file)
+    save_checkpoint(state, target_snapshot_dir / SNAPSHOT_STATE_FILE)
+
+    # remove outdated replay dumps
+    for file in target_snapshot_dir.glob("replay_*.bin"):
+        if file != replay_file:
+            file.unlink()
+
+
+def remove_snapshot(run_dir: Path) -> None:
+    """Remove the run dir's snapshot, if any."""
+    shutil.rmtree(run_dir / SNAPSHOT_DIR, ignore_errors=True)
+
+
+def is_complete(run_dir: Path) -> bool:
+    """Whether the run has completed all its episodes."""
+    return (run_dir / COMPLETE_FILE).exists()
+
+
+def mark_complete(run_dir: Path, complete: bool = True) -> None:
+    """Mark run as complete, or as incomplete.
+
+    Args:
+        run_dir (Path): The result dir of the run.
+        complete (bool, optional): Whether the run is complete. Defaults to True.
+    """
+    if complete:
+        (run_dir / COMPLETE_FILE).touch()
+    else:
+        (run_dir / COMPLETE_FILE).unlink(missing_ok=True)
@@ -0,0 +1,250 @@
+"""Benchmark each stage of the analysis of an experiment, at several scales.
+
+Synthesizes the results tree of an experiment per scale, i.e. a number of
+variants, of runs per variant and of episodes per run, and runs each stage of
+`analyze` on it in a fresh interpreter, reporting its time and peak memory, i.e.
+the peak resident set size during the stage, and its increase over the memory held
+before, e.g. by the results:
+
+- `collect_cold`: Collecting the results into the empty ingestion cache.
+- `collect_warm`: Collecting the results from the up-to-date ingestion cache.
+- `statistics`: Exporting the reward statistics, without bootstrapping.
+- `curves`: Aggregating the reward curves, without their cache.
+- `reward_distribution`: Plotting the reward distribution.
+- `reward`: Plotting the reward curves.
+
+The results are saved as JSON along with the commit benchmarked, and compared to
+the results of a former benchmark if given, to spot regressions between commits.
+A stage failing, e.g. running out of memory, is reported as such.
+
+Usage:
+    python benchmarks/analysis_pipeline.py [--scales <variants>x<runs>x<episodes>,...]
+        [--dir <path>] [--out <file>] [--compare <file>]
+"""
+
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any, Final
+
+ROOT_DIR: Final[Path] = Path(__file__).parents[1]
+sys.path.insert(0, str(ROOT_DIR))
+
+from analysis.__main__ import SMOOTH_WINDOW, TAIL_EPISODES
+from analysis.analyzer.reward_curves import CURVES_PREFIX
+from analysis.provider.result_cache import CACHE_DIR
+
+# the scales as the number of variants, runs per variant and episodes per run
+SCALES: Final[str] = "4x3x5000,10x10x5000,20x25x10000"
+STAGES: Final[tuple[str, ...]] = (
+    "collect_cold",
+    "collect_warm",
+    "statistics",
+    "curves",
+    "reward_distribution",
+    "reward",
+)
+OUT_FILE: Final[str] = "analysis_pipeline.json"
+
+
+def parse_scales(scales: str) -> list[tuple[int, int, int]]:
+    """Parse scales given as `<variants>x<runs>x<episodes>`, separated by commas."""
+    return [tuple(map(int, s.split("x"))) for s in scales.split(",")]  # type: ignore
+
+
+def synthesize_tree(result_dir: Path, variants: int, runs: int, episodes: int) -> None:
+    """Write the logs of a synthetic experiment, see `write_results_tree`."""
+    from analysis.provider.result_synthesizer import (
+        synthesize_experiment_results,
+        write_results_tree,
+    )
+
+    names = [f"var_{i + 1}" for i in range(variants)]
+    result_df = synthesize_experiment_results(names, runs, episodes, seed=0)
+    write_results_tree(result_df, result_dir)
+
+
+def prepare(stage: str, result_dir: Path) -> Callable[[], Any]:
+    """Prepare the inputs of a stage, from the caches of the former stages.
+
+    Args:
+        stage (str): The stage to prepare.
+        result_dir (Path): The experiment dir.
+
+    Returns:
+        Callable[[], Any]: The stage to benchmark.
+    """
+    from analysis.analyzer.plot_reward import plot_reward
+    from analysis.analyzer.plot_reward_dist import plot_reward_distribution
+    from analysis.analyzer.reward_curves import load_reward_curves
+    from analysis.analyzer.reward_stats import export_reward_statistics
+    from analysis.provider.result_collector import collect_experiment_results
+
+    cache_dir, out_dir = result_dir / CACHE_DIR, result_dir / "analysis"
+    out_dir.mkdir(exist_ok=True)
+    if stage == "collect_cold":
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    if stage.startswith("collect"):
+        return lambda: collect_experiment_results(result_dir)
+
+    result_df = collect_experiment_results(result_dir)
+    if stage == "statistics":
+        return lambda: export_reward_statistics(result_df, TAIL_EPISODES, out_dir)
+    if stage == "curves":
+        for curves_file in cache_dir.glob(f"{CURVES_PREFIX}-*.parquet"):
+            curves_file.unlink()
+        return lambda: load_reward_curves(result_df, cache_dir, SMOOTH_WINDOW)
+    if stage == "reward_distribution":
+        return lambda: plot_reward_distribution(result_df, TAIL_EPISODES, out_dir)
+    curves = load_reward_curves(result_df, cache_dir, SMOOTH_WINDOW)
+    return lambda: plot_reward(
+        curves, out_dir, tail=TAIL_EPISODES, smooth=SMOOTH_WINDOW
+    )
+
+
+def memory_mb(field: str) -> float:
+    """Return a memory figure of the current process in MiB, e.g. `VmHWM`.
+
+    Falls back to the max resident set size where `/proc` is not available.
+    """
+    try:
+        status = Path("/proc/self/status").read_text()
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1_024
+    line = next(line for line in status.splitlines() if line.startswith(field))
+    return int(line.split()[1]) / 1_024
+
+
+def reset_peak_memory() -> None:
+    """Reset the peak resident set size of the current process, on Linux."""
+    try:
+        Path("/proc/self/clear_refs").write_text("5")
+    except OSError:
+        pass
+
+
+def measure(stage: str, result_dir: Path) -> dict[str, float]:
+    """Run a stage, in the current process.
+
+    Args:
+        stage (str): The stage to run.
+        result_dir (Path): The experiment dir.
+
+    Returns:
+        dict[str, float]: The seconds, the peak memory during the stage and its
+            increase over the memory before, in MiB.
+    """
+    run_stage = prepare(stage, result_dir)
+    baseline_mb = memory_mb("VmRSS")
+    reset_peak_memory()
+    start = time.perf_counter()
+    run_stage()
+    seconds = time.perf_counter() - start
+    peak_mb = memory_mb("VmHWM")
+    return {
+        "seconds": seconds,
+        "peak_mb": peak_mb,
+        "peak_increase_mb": max(peak_mb - baseline_mb, 0),
+    }
+
+
+def benchmark(stage: str, result_dir: Path) -> dict[str, Any]:
+    """Run a stage in a fresh interpreter, reporting its error if it fails."""
+    result = subprocess.run(
+        [sys.executable, __file__, "--measure", stage, "--dir", str(result_dir)],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    if result.returncode != 0:
+        lines = result.stderr.strip().splitlines() or [f"exit {result.returncode}"]
+        return {"error": lines[-1]}
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def current_commit() -> str | None:
+    """Return the commit of the working tree, None if unknown."""
+    result = subprocess.run(
+        ["git", "rev-parse", "--short", "HEAD"],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    return result.stdout.strip() or None
+
+
+def main() -> None:
+    def arg(name: str, default: Any) -> Any:  # a poor man's CLI ;-)
+        if name not in sys.argv:
+            return default
+        return type(default)(sys.argv[sys.argv.index(name) + 1])
+
+    if "--measure" in sys.argv:
+        print(json.dumps(measure(arg("--measure", ""), Path(arg("--dir", "")))))
+        return
+
+    former: dict[tuple, dict[str, Any]] = {}
+    if compare_file := arg("--compare", ""):
+        for r in json.loads(Path(compare_file).read_text())["results"]:
+            former[(r["variants"], r["runs"], r["episodes"], r["stage"])] = r
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for variants, runs, episodes in parse_scales(arg("--scales", SCALES)):
+            scale = f"{variants}x{runs}x{episodes}"
+            result_dir = Path(arg("--dir", tmp_dir)) / scale
+            if not result_dir.exists():
+                start = time.perf_counter()
+                synthesize_tree(result_dir, variants, runs, episodes)
+                seconds = time.perf_counter() - start
+                print(f"Synthesized {scale} in {seconds:.1f}s")
+
+            print(
+                f"{'scale':<16} {'stage':<20} {'seconds':>8} {'peak MiB':>9} "
+                f"{'+ MiB':>7} {'vs former':>9}"
+            )
+            for stage in STAGES:
+                r = {
+                    "variants": variants,
+                    "runs": runs,
+                    "episodes": episodes,
+                    "rows": variants * runs * episodes,
+                    "stage": stage,
+                    **benchmark(stage, result_dir),
+                }
+                results.append(r)
+                if "error" in r:
+                    print(f"{scale:<16} {stage:<20} failed: {r['error']}")
+                    continue
+                f = former.get((variants, runs, episodes, stage), {})
+                vs = f"{r['seconds'] / f['seconds']:.2f}x" if "seconds" in f else "-"
+                print(
+                    f"{scale:<16} {stage:<20} {r['seconds']:>8.2f} "
+                    f"{r['peak_mb']:>9.0f} {r['peak_increase_mb']:>7.0f} {vs:>9}"
+                )
+
+    out_file = Path(arg("--out", OUT_FILE))
+    report = {
+        "commit": current_commit(),
+        "date": datetime.now(UTC).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "results": results,
+    }
+    out_file.write_text(json.dumps(report, indent=2))
+    print(f"Saved the results to {out_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""Benchmark the ingestion of training logs by the analysis.
+
+Synthesizes a results tree of many runs, and ingests it with each strategy in a
+fresh interpreter, reporting its time and peak memory, i.e. its max resident set
+size, in total and on top of the imports:
+
+- `legacy`: A sequential `pd.read_csv` per log with inferred types, then a
+  `pd.concat`, as done before the typed ingestion.
+- `typed`: Reading all logs in parallel with explicit types, without the cache.
+- `cold`: Reading all logs into the empty ingestion cache.
+- `warm`: Reading the results from the up-to-date ingestion cache.
+
+Usage:
+    python benchmarks/ingestion.py [--runs <n>] [--episodes <n>] [--dir <path>]
+"""
+
+import json
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any, Final
+
+import numpy as np
+
+ROOT_DIR: Final[Path] = Path(__file__).parents[1]
+sys.path.insert(0, str(ROOT_DIR))
+
+from analysis.provider.result_cache import CACHE_DIR
+from analysis.provider.result_collector import LOG_FILE
+
+RUNS: Final[int] = 2_000
+EPISODES: Final[int] = 1_000
+VARIANT_COUNT: Final[int] = 20
+STRATEGIES: Final[tuple[str, ...]] = ("legacy", "typed", "cold", "warm")
+
+# the columns of the training log besides the ids, see `EpisodeLog`
+METRIC_COLUMNS: Final[tuple[str, ...]] = (
+    "epsilon",
+    "reward",
+    "loss",
+    "steps",
+    "time",
+    "emulator_time",
+    "preprocess_time",
+    "act_time",
+    "remember_time",
+    "sample_time",
+    "encode_time",
+    "learn_time",
+    "log_time",
+)
+
+
+def synthesize_results(result_dir: Path, runs: int, episodes: int) -> None:
+    """Write the logs of synthetic runs, spread evenly across variants.
+
+    Args:
+        result_dir (Path): The experiment dir to write the results tree to.
+        runs (int): The total number of runs.
+        episodes (int): The number of episodes per run.
+    """
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+
+    rng = np.random.default_rng(0)
+    options = pa_csv.WriteOptions(quoting_style="none")
+    for i in range(runs):
+        variant, run = f"variant_{i % VARIANT_COUNT}", i // VARIANT_COUNT + 1
+        metrics = {c: rng.random(episodes) for c in METRIC_COLUMNS}
+        metrics["steps"] = rng.integers(800, 3_000, episodes)
+        table = pa.table(
+            {
+                "episode": np.arange(1, episodes + 1),
+                "experiment": [result_dir.name] * episodes,
+                "variant": [variant] * episodes,
+                "run": np.full(episodes, run),
+                **metrics,
+            }
+        )
+        log_file = result_dir / variant / str(run) / LOG_FILE
+        log_file.parent.mkdir(parents=True, exist_ok=True)
+        pa_csv.write_csv(table, log_file, write_options=options)
+
+
+def read_legacy(result_dir: Path) -> Any:
+    """Read all logs as done before the typed ingestion."""
+    import pandas as pd
+
+    frames = [pd.read_csv(f) for f in result_dir.rglob(LOG_FILE)]
+    return pd.concat(frames)
+
+
+def read_typed(result_dir: Path) -> Any:
+    from analysis.provider.result_collector import collect_experiment_results
+
+    return collect_experiment_results(result_dir, cache=False)
+
+
+def read_cached(result_dir: Path) -> Any:
+    from analysis.provider.result_collector import collect_experiment_results
+
+    return collect_experiment_results(result_dir)
+
+
+READERS: Final[dict[str, Callable[[Path], Any]]] = {
+    "legacy": read_legacy,
+    "typed": read_typed,
+    "cold": read_cached,
+    "warm": read_cached,
+}
+
+
+def peak_rss_mb() -> float:
+    """Return the max resident set size of the current process in MiB."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1_024
+
+
+def measure(strategy: str, result_dir: Path) -> dict[str, float]:
+    """Ingest the results with a strategy, in the current process.
+
+    Args:
+        strategy (str): The strategy to ingest with.
+        result_dir (Path): The experiment dir.
+
+    Returns:
+        dict[str, float]: The rows, seconds, peak memory and its increase in MiB,
+            and the memory of the resulting frame in MiB.
+    """
+    # the imports are not to be accounted for
+    import pandas
+    import pyarrow
+
+    if strategy == "cold":
+        shutil.rmtree(result_dir / CACHE_DIR, ignore_errors=True)
+    baseline_mb = peak_rss_mb()
+    start = time.perf_counter()
+    df = READERS[strategy](result_dir)
+    seconds = time.perf_counter() - start
+    return {
+        "rows": len(df),
+        "seconds": seconds,
+        "peak_mb": peak_rss_mb(),
+        "peak_increase_mb": peak_rss_mb() - baseline_mb,
+        "frame_mb": df.memory_usage(deep=True).sum() / 1_024**2,
+    }
+
+
+def benchmark(strategy: str, result_dir: Path) -> dict[str, float]:
+    """Ingest the results with a strategy, in a fresh interpreter."""
+    result = subprocess.run(
+        [sys.executable, __file__, "--measure", strategy, "--dir", str(result_dir)],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def main() -> None:
+    def arg(name: str, default: Any) -> Any:  # a poor man's CLI ;-)
+        if name not in sys.argv:
+            return default
+        return type(default)(sys.argv[sys.argv.index(name) + 1])
+
+    if "--measure" in sys.argv:
+        print(json.dumps(measure(arg("--measure", ""), Path(arg("--dir", "")))))
+        return
+
+    runs, episodes = arg("--runs", RUNS), arg("--episodes", EPISODES)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        result_dir = Path(arg("--dir", tmp_dir)) / "synthetic_experiment"
+        if not result_dir.exists():
+            start = time.perf_counter()
+            synthesize_results(result_dir, runs, episodes)
+            seconds = time.perf_counter() - start
+            print(f"Synthesized {runs} runs of {episodes} episodes in {seconds:.1f}s")
+
+        print(
+            f"{'strategy':<8} {'rows':>10} {'seconds':>8} {'peak MiB':>9} "
+            f"{'+ MiB':>7} {'frame MiB':>9}"
+        )
+        for strategy in STRATEGIES:
+            r = benchmark(strategy, result_dir)
+            print(
+                f"{strategy:<8} {r['rows']:>10,} {r['seconds']:>8.2f} "
+                f"{r['peak_mb']:>9.0f} {r['peak_increase_mb']:>7.0f} "
+                f"{r['frame_mb']:>9.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
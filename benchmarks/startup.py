@@ -0,0 +1,118 @@
+"""Benchmark the import time of the training CLI and of its worker processes.
+
+Each target module is imported in a fresh interpreter with `-X importtime`, the
+median over several repetitions is compared against the target's budget. The CLI
+must further not import any of the heavy modules, which are only to be imported
+by the workers or the analysis.
+
+Usage:
+    python benchmarks/startup.py [--repeat <n>]
+
+Exits with a non-zero status if any budget is exceeded.
+"""
+
+import statistics
+import subprocess
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Final
+
+ROOT_DIR: Final[Path] = Path(__file__).parents[1]
+REPEAT: Final[int] = 5
+TOP_MODULES: Final[int] = 10
+
+# modules only to be imported where used
+HEAVY_MODULES: Final[tuple[str, ...]] = (
+    "torch",
+    "gym",
+    "cv2",
+    "pandas",
+    "pyarrow",
+    "scipy",
+    "matplotlib",
+    "seaborn",
+    "lightning",
+)
+
+
+@dataclass(frozen=True)
+class Target:
+    """A module to import, with its budget."""
+
+    name: str
+    module: str
+    budget_ms: float
+    forbidden: tuple[str, ...] = ()
+
+
+TARGETS: Final[tuple[Target, ...]] = (
+    Target("cli", "app.__main__", budget_ms=400, forbidden=HEAVY_MODULES),
+    Target("worker", "app.loop", budget_ms=4_000),
+)
+
+
+def measure(module: str) -> dict[str, int]:
+    """Import module in a fresh interpreter.
+
+    Args:
+        module (str): The module to import.
+
+    Returns:
+        dict[str, int]: The cumulative import time in µs, by imported module.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times: dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.removeprefix("import time:").split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def benchmark(target: Target, repeat: int) -> bool:
+    """Benchmark the import of a target and report it.
+
+    Args:
+        target (Target): The target to benchmark.
+        repeat (int): The number of repetitions.
+
+    Returns:
+        bool: Whether the target stays within its budget.
+    """
+    runs = [measure(target.module) for _ in range(repeat)]
+    total_ms = statistics.median(r[target.module] for r in runs) / 1_000
+
+    print(f"{target.name} ({target.module}): {total_ms:.0f} ms")
+    top = sorted(runs[-1].items(), key=lambda i: i[1], reverse=True)
+    for name, cumulative in top[1 : TOP_MODULES + 1]:
+        print(f"  {cumulative / 1_000:>8.0f} ms  {name}")
+
+    passed = True
+    if total_ms > target.budget_ms:
+        print(f"  FAILED: exceeds budget of {target.budget_ms:.0f} ms")
+        passed = False
+    if imported := [m for m in target.forbidden if m in runs[-1]]:
+        print(f"  FAILED: imports heavy modules: {', '.join(imported)}")
+        passed = False
+    return passed
+
+
+def main() -> None:
+    repeat = REPEAT
+    if "--repeat" in sys.argv:  # a poor man's CLI ;-)
+        repeat = int(sys.argv[sys.argv.index("--repeat") + 1])
+
+    results = [benchmark(t, repeat) for t in TARGETS]
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
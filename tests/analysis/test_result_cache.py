@@ -0,0 +1,90 @@
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+import pytest
+from analysis.provider import result_cache
+from analysis.provider.result_collector import LOG_FILE, collect_experiment_results
+from analysis.provider.result_synthesizer import (
+    synthesize_experiment_results,
+    write_results_tree,
+)
+
+VARIANTS = ["var_one", "var_two"]
+RUNS = 2
+EPISODES = 60
+ROWS = len(VARIANTS) * RUNS * EPISODES
+CHANGED_LOG = f"var_one/1/{LOG_FILE}"
+
+
+@pytest.fixture
+def reads(monkeypatch: pytest.MonkeyPatch) -> dict[str, dict[str, Any] | None]:
+    """Record the logs read by the ingestion, with the entries read from."""
+    reads: dict[str, dict[str, Any] | None] = {}
+    read_log_increment = result_cache.read_log_increment
+
+    def record(log_file: Path, entry: dict[str, Any] | None = None) -> Any:
+        reads[log_file.relative_to(log_file.parents[2]).as_posix()] = entry
+        return read_log_increment(log_file, entry)
+
+    monkeypatch.setattr(result_cache, "read_log_increment", record)
+    return reads
+
+
+def synthesize_experiment(result_dir: Path, seed: int = 0) -> list[bytes]:
+    """Write the logs of an experiment, returning the lines of the changed log."""
+    result_df = synthesize_experiment_results(VARIANTS, RUNS, EPISODES, seed=seed)
+    write_results_tree(result_df, result_dir)
+    return (result_dir / CHANGED_LOG).read_bytes().splitlines(keepends=True)
+
+
+def assert_ingested(result_dir: Path) -> None:
+    """Assert the cached results equal the results read anew."""
+    cached_df = collect_experiment_results(result_dir)
+    expected_df = collect_experiment_results(result_dir, cache=False)
+    pd.testing.assert_frame_equal(cached_df, expected_df)
+
+
+def test_ingest_appended_log(tmp_path: Path, reads: dict) -> None:
+    lines = synthesize_experiment(tmp_path)
+    (tmp_path / CHANGED_LOG).write_bytes(b"".join(lines[:31]))
+    assert_ingested(tmp_path)
+    reads.clear()
+
+    # the appended rows are read from the offset, a line being written is left
+    with open(tmp_path / CHANGED_LOG, "ab") as f:
+        f.write(b"".join(lines[31:-1]) + lines[-1][:10])
+    assert len(collect_experiment_results(tmp_path)) == ROWS - 1
+    assert list(reads) == [CHANGED_LOG]
+    assert reads[CHANGED_LOG]["rows"] == 30
+
+    with open(tmp_path / CHANGED_LOG, "ab") as f:
+        f.write(lines[-1][10:])
+    assert_ingested(tmp_path)
+    assert reads[CHANGED_LOG]["rows"] == EPISODES - 1
+    assert len(collect_experiment_results(tmp_path)) == ROWS
+
+
+def test_ingest_truncated_log(tmp_path: Path, reads: dict) -> None:
+    lines = synthesize_experiment(tmp_path)
+    assert_ingested(tmp_path)
+    reads.clear()
+
+    # resuming a run truncates its log to the episodes of the snapshot
+    (tmp_path / CHANGED_LOG).write_bytes(b"".join(lines[:21]))
+    assert_ingested(tmp_path)
+    assert reads == {CHANGED_LOG: None}
+    assert len(collect_experiment_results(tmp_path)) == ROWS - 40
+
+
+def test_ingest_rewritten_log(tmp_path: Path, reads: dict) -> None:
+    synthesize_experiment(tmp_path)
+    assert_ingested(tmp_path)
+    reads.clear()
+
+    # a run trained anew rewrites its log, the size alone does not tell
+    lines = synthesize_experiment(tmp_path.with_name(f"{tmp_path.name}-anew"), 1)
+    (tmp_path / CHANGED_LOG).write_bytes(b"".join(lines) + lines[-1])
+    assert_ingested(tmp_path)
+    assert reads == {CHANGED_LOG: None}
+    assert len(collect_experiment_results(tmp_path)) == ROWS + 1
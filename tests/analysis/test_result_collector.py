@@ -0,0 +1,79 @@
+import csv
+from pathlib import Path
+
+import pandas as pd
+from analysis.analyzer.resource_profile import export_resource_profile
+from analysis.provider.result_collector import (
+    RESOURCES_FILE,
+    collect_experiment_results,
+    collect_resource_samples,
+    join_resource_samples,
+)
+from analysis.provider.result_synthesizer import (
+    synthesize_experiment_results,
+    write_results_tree,
+)
+from app.utils.resource_sampler import RESOURCE_COLUMNS
+
+VARIANTS = ["var_one", "var_two"]
+RUNS = 2
+EPISODES = 50
+
+
+def write_resource_samples(run_dir: Path, episodes: list[int]) -> None:
+    """Write the resource samples of a run, as the sampler does."""
+    with open(run_dir / RESOURCES_FILE, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=RESOURCE_COLUMNS)
+        writer.writeheader()
+        for i, episode in enumerate(episodes):
+            sample = {c: i for c in RESOURCE_COLUMNS}
+            writer.writerow(sample | {"time": 100.0 + i, "episode": episode})
+
+
+def synthesize_experiment(result_dir: Path) -> None:
+    result_df = synthesize_experiment_results(VARIANTS, RUNS, EPISODES, seed=0)
+    write_results_tree(result_df, result_dir)
+    for run_dir in {f.parent for f in result_dir.rglob("train_log.csv")}:
+        write_resource_samples(run_dir, [0, 10, 30])
+
+
+def test_join_resource_samples(tmp_path: Path) -> None:
+    synthesize_experiment(tmp_path)
+    result_df = collect_experiment_results(tmp_path)
+    resource_df = collect_resource_samples(tmp_path)
+
+    joined_df = join_resource_samples(result_df, resource_df)
+
+    assert len(joined_df) == len(VARIANTS) * RUNS * EPISODES
+    assert joined_df["variant"].dtype == result_df["variant"].dtype
+    joined_df = joined_df.set_index(["variant", "run", "episode"]).sort_index()
+    # each episode takes the latest sample up to it
+    samples = joined_df.loc[("var_two", 2), "threads"]
+    assert samples.loc[1:9].eq(0).all()
+    assert samples.loc[10:29].eq(1).all()
+    assert samples.loc[30:].eq(2).all()
+
+
+def test_export_resource_profile(tmp_path: Path) -> None:
+    synthesize_experiment(tmp_path)
+    result_df = collect_experiment_results(tmp_path)
+    resource_df = collect_resource_samples(tmp_path)
+
+    export_resource_profile(result_df, resource_df, tmp_path)
+
+    profile = pd.read_csv(tmp_path / "resource_profile.csv", index_col="variant")
+    assert profile.index.tolist() == VARIANTS
+    episodes = pd.read_csv(tmp_path / "resource_episodes.csv")
+    assert len(episodes) == len(VARIANTS) * EPISODES
+
+
+def test_collect_resource_samples_of_run_dirs(tmp_path: Path) -> None:
+    synthesize_experiment(tmp_path)
+    # e.g. a backup of a run dir
+    (tmp_path / "var_one" / "1.bak").mkdir()
+    write_resource_samples(tmp_path / "var_one" / "1.bak", [0])
+
+    resource_df = collect_resource_samples(tmp_path)
+
+    assert len(resource_df) == len(VARIANTS) * RUNS * 3
+    assert sorted(resource_df["run"].unique()) == list(range(1, RUNS + 1))
@@ -0,0 +1,30 @@
+import pandas as pd
+import pytest
+from analysis.analyzer.reward_stats import summarize_rewards
+
+
+def test_summarize_tail_means_of_runs() -> None:
+    # a steady variant, and a variant with a better tail but runs far apart
+    rewards = {
+        ("steady", 0): [0, 0, 5, 5],
+        ("steady", 1): [0, 0, 6, 6],
+        ("steady", 2): [0, 0, 7, 7],
+        ("spread", 0): [9, 9, 0, 0],
+        ("spread", 1): [0, 0, 0, 0],
+        ("spread", 2): [0, 0, 21, 21],
+    }
+    result_df = pd.DataFrame(
+        [
+            {"variant": variant, "run": run, "episode": i + 1, "reward": reward}
+            for (variant, run), run_rewards in rewards.items()
+            for i, reward in enumerate(run_rewards)
+        ]
+    )
+
+    summary = summarize_rewards(result_df, tail=2)
+
+    # the runs are the samples, not their episodes
+    assert summary.index.tolist() == ["steady", "spread"]
+    assert summary["count"].tolist() == [3, 3]
+    assert summary["mean"].tolist() == pytest.approx([6, 7])
+    assert summary["std"].tolist() == pytest.approx([1, 12.124356])
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+from analysis.analyzer.utils.statistics import pairwise_mannwhitneyu
+from scipy import stats
+
+
+def assert_like_scipy(samples: list[np.ndarray]) -> None:
+    """Assert the tests of all pairs agree with `scipy.stats.mannwhitneyu`."""
+    u, p_values = pairwise_mannwhitneyu(samples)
+
+    assert np.isnan(np.diag(u)).all() and np.isnan(np.diag(p_values)).all()
+    for i, x in enumerate(samples):
+        for j, y in enumerate(samples):
+            if i != j:
+                result = stats.mannwhitneyu(x, y)
+                assert u[i, j] == pytest.approx(result.statistic)
+                assert p_values[i, j] == pytest.approx(result.pvalue, rel=1e-9)
+
+
+def test_continuous_samples() -> None:
+    rng = np.random.default_rng(0)
+    assert_like_scipy([rng.normal(i / 4, 1, 50 + 10 * i) for i in range(4)])
+
+
+def test_tied_samples() -> None:
+    # the rewards of Pong are integers, so ties are common
+    rng = np.random.default_rng(1)
+    samples = [rng.integers(-3 + i, 3, 40 + 5 * i).astype(np.float32) for i in range(4)]
+    samples.append(np.full(30, 2.0))
+    assert_like_scipy(samples)
+
+
+def test_small_samples() -> None:
+    rng = np.random.default_rng(2)
+    # without ties, the pairs with a sample of at most 8 values are tested exactly
+    assert_like_scipy([rng.normal(0, 1, 3), rng.normal(1, 1, 8), rng.normal(0, 1, 30)])
+    # with ties, they are approximated
+    assert_like_scipy([np.array([1.0, 2, 2, 3]), np.array([2.0, 3, 3, 4, 5])])
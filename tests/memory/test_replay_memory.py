@@ -0,0 +1,70 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+from app.memory import ReplayMemory, Transition
+
+
+def make_transition(i: int) -> Transition:
+    state = np.full((1, 8, 8), i, dtype=np.float32)
+    return Transition(state, i % 3, float(i), state + 1, i % 5 == 0)
+
+
+def assert_transitions_equal(memory: ReplayMemory, expected: ReplayMemory) -> None:
+    assert len(memory) == len(expected)
+    for i in range(len(memory)):
+        for value, expected_value in zip(memory[i], expected[i]):
+            np.testing.assert_array_equal(value, expected_value)
+
+
+def test_dump_load_round_trip(tmp_path: Path) -> None:
+    memory = ReplayMemory(capacity=10, batch_size=4)
+    for i in range(15):
+        memory.push(make_transition(i))
+    memory.dump(tmp_path / "replay.bin")
+
+    loaded = ReplayMemory(capacity=10, batch_size=4)
+    loaded.push(make_transition(-1))
+    loaded.load(tmp_path / "replay.bin")
+
+    assert_transitions_equal(loaded, memory)
+    assert loaded.nbytes == memory.nbytes
+    assert list(tmp_path.iterdir()) == [tmp_path / "replay.bin"]
+    # the loaded memory keeps evicting the oldest transitions
+    loaded.push(make_transition(15))
+    assert len(loaded) == 10
+    assert loaded[0].reward == 6.0
+
+
+def test_load_smaller_capacity(tmp_path: Path) -> None:
+    memory = ReplayMemory(capacity=10, batch_size=4)
+    for i in range(10):
+        memory.push(make_transition(i))
+    memory.dump(tmp_path / "replay.bin")
+
+    loaded = ReplayMemory(capacity=4, batch_size=4)
+    loaded.load(tmp_path / "replay.bin")
+
+    # the most recent transitions are kept
+    assert [t.reward for t in (loaded[i] for i in range(4))] == [6.0, 7.0, 8.0, 9.0]
+    assert loaded.nbytes == sum(map(len, loaded.buffer))
+
+
+def test_load_rejects_other_files(tmp_path: Path) -> None:
+    (tmp_path / "replay.bin").write_bytes(b"not a replay memory dump")
+
+    with pytest.raises(ValueError, match="Not a replay memory dump"):
+        ReplayMemory(capacity=10, batch_size=4).load(tmp_path / "replay.bin")
+
+
+def test_load_rejects_truncated_dumps(tmp_path: Path) -> None:
+    memory = ReplayMemory(capacity=10, batch_size=4)
+    for i in range(10):
+        memory.push(make_transition(i))
+    memory.dump(tmp_path / "replay.bin")
+    dump = (tmp_path / "replay.bin").read_bytes()
+
+    for size in (10, 20, len(dump) - 1):
+        (tmp_path / "replay.bin").write_bytes(dump[:size])
+        with pytest.raises(ValueError, match="Truncated replay memory dump"):
+            ReplayMemory(capacity=10, batch_size=4).load(tmp_path / "replay.bin")
@@ -0,0 +1,80 @@
+from collections.abc import Callable
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from app.config import Config
+from app.runner.halving import SuccessiveHalving, rung_budgets
+from app.runner.run_cache import run_key, write_run_key
+from app.utils.run_state import mark_complete
+
+VARIANTS = 9
+RUNS = 2
+EPISODES = 90
+
+
+class InlineScheduler:
+    """Conduct the runs one after another in the current process, recording them."""
+
+    def __init__(self) -> None:
+        self.runs: list[Config] = []
+
+    def run(self, fn: Callable[[Config], None], configs: list[Config]) -> list:
+        self.runs.extend(configs)
+        for config in configs:
+            fn(config)
+        return []
+
+
+def conduct(results_dir: Path, config: Config) -> None:
+    """Conduct a run by logging a constant reward by variant, as a stage does."""
+    run_dir = results_dir / config.variant / str(config.run)
+    run_dir.mkdir(parents=True, exist_ok=True)
+    write_run_key(run_dir, run_key(config))
+    reward = int(config.variant.split("_")[1]) + config.run / 10
+    episodes = range(1, config.episodes + 1)
+    log_df = pd.DataFrame(
+        {"episode": episodes, "variant": config.variant, "run": config.run}
+    )
+    log_df.assign(reward=reward).to_csv(run_dir / "train_log.csv", index=False)
+    mark_complete(run_dir)
+
+
+@pytest.mark.parametrize(
+    ("episodes", "expected"),
+    [(5_000, [555, 1_666, 5_000]), (1_000, [1_000]), (1_500, [500, 1_500])],
+)
+def test_rung_budgets(episodes: int, expected: list[int]) -> None:
+    assert rung_budgets(episodes) == expected
+
+
+def test_promote_top_variants(tmp_path: Path) -> None:
+    variants = [
+        Config(experiment="exp", variant=f"var_{i}", run_count=RUNS, episodes=EPISODES)
+        for i in range(VARIANTS)
+    ]
+    scheduler = InlineScheduler()
+    halving = SuccessiveHalving(
+        scheduler,  # type: ignore[arg-type]
+        lambda config: tmp_path / config.variant / str(config.run),
+        min_episodes=10,
+    )
+
+    assert not halving.run(lambda config: conduct(tmp_path, config), variants)
+
+    # the top third of the variants are promoted to each next rung
+    trained = {
+        episodes: sorted({r.variant for r in scheduler.runs if r.episodes == episodes})
+        for episodes in (10, 30, 90)
+    }
+    assert trained == {
+        10: [v.variant for v in variants],
+        30: ["var_6", "var_7", "var_8"],
+        90: ["var_8"],
+    }
+    assert len(scheduler.runs) == (9 + 3 + 1) * RUNS
+
+    # runs trained for their budget are not trained again
+    scheduler.runs.clear()
+    assert not halving.run(lambda config: conduct(tmp_path, config), variants)
+    assert not scheduler.runs
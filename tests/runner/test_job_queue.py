@@ -0,0 +1,130 @@
+import multiprocessing
+import os
+import signal
+import time
+from functools import partial
+from pathlib import Path
+
+import pytest
+from app.config import Config
+from app.runner import job_queue
+from app.runner.job_queue import JobQueue, job_name, run_worker
+
+WORKERS = 3
+# seconds a job takes, the claims outlive the staleness only by their heartbeats
+JOB_SECONDS = 1.0
+STALE_AFTER = 0.5
+HEARTBEAT_INTERVAL = 0.1
+POLL_INTERVAL = 0.05
+
+
+def conduct(out_dir: Path, config: Config) -> None:
+    """Conduct a run by recording it, the first attempt of a `crash` run kills the
+    worker, as a crashing node would."""
+    name = job_name(config)
+    attempts = list(out_dir.glob(f"{name}.*"))
+    (out_dir / f"{name}.{os.getpid()}.{len(attempts)}").touch()
+    if config.variant == "crash" and not attempts:
+        os.kill(os.getpid(), signal.SIGKILL)
+    time.sleep(JOB_SECONDS)
+
+
+def work(queue_dir: Path, out_dir: Path) -> None:
+    queue = JobQueue(queue_dir, stale_after=STALE_AFTER)
+    failures = run_worker(queue, partial(conduct, out_dir), POLL_INTERVAL)
+    assert not failures
+
+
+def run_workers(tmp_path: Path, variants: list[str]) -> tuple[JobQueue, Path]:
+    """Enqueue a run per variant and conduct them by worker processes."""
+    queue = JobQueue(tmp_path / "queue", stale_after=STALE_AFTER)
+    queue.enqueue([Config(experiment="exp", variant=v, run=1) for v in variants])
+    out_dir = tmp_path / "out"
+    out_dir.mkdir()
+
+    context = multiprocessing.get_context("fork")
+    workers = [
+        context.Process(target=work, args=(queue.queue_dir, out_dir))
+        for _ in range(WORKERS)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=30)
+    assert not any(w.is_alive() for w in workers)
+    return queue, out_dir
+
+
+@pytest.fixture(autouse=True)
+def heartbeat_interval(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(job_queue, "HEARTBEAT_INTERVAL", HEARTBEAT_INTERVAL)
+
+
+def test_workers_conduct_each_job_once(tmp_path: Path) -> None:
+    variants = [f"var_{i}" for i in range(2 * WORKERS)]
+
+    queue, out_dir = run_workers(tmp_path, variants)
+
+    # idle workers do not reclaim the jobs in progress, as they have a heartbeat
+    conducted = sorted(f.name.rsplit(".", 2)[0] for f in out_dir.iterdir())
+    assert conducted == sorted(f"exp--{v}--1.yaml" for v in variants)
+    assert len({f.name.split(".")[-2] for f in out_dir.iterdir()}) == WORKERS
+    assert queue.is_drained
+    assert len(list(queue.done_dir.iterdir())) == len(variants)
+
+
+def test_workers_reclaim_jobs_of_crashed_worker(tmp_path: Path) -> None:
+    queue, out_dir = run_workers(tmp_path, ["crash", "var_1", "var_2"])
+
+    # the job of the crashed worker is reclaimed and conducted once more
+    attempts = sorted(out_dir.glob("exp--crash--1.yaml.*"))
+    assert len(attempts) == 2
+    assert attempts[0].name.split(".")[-2] != attempts[1].name.split(".")[-2]
+    assert queue.is_drained
+    assert len(list(queue.done_dir.iterdir())) == 3
+    assert not any(queue.failed_dir.iterdir())
+
+
+def test_enqueue_updates_pending_jobs(tmp_path: Path) -> None:
+    queue = JobQueue(tmp_path)
+    config = Config(experiment="exp", variant="var", run=1, episodes=10)
+    queue.enqueue([config])
+
+    assert queue.enqueue([Config(experiment="exp", variant="var", run=1)]) == 1
+
+    job = queue.claim("worker")
+    assert job is not None
+    assert job.config.episodes == Config.episodes
+    assert job.attempts == 1
+    # claimed jobs keep their config
+    assert queue.enqueue([config]) == 0
+    assert not any(queue.pending_dir.iterdir())
+
+
+def test_reclaim_interrupted_reclaim(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    queue = JobQueue(tmp_path, stale_after=STALE_AFTER)
+    queue.enqueue([Config(experiment="exp", variant="var", run=1)])
+    assert queue.claim("crashed") is not None
+    time.sleep(STALE_AFTER)
+
+    def kill(*_) -> None:
+        raise KeyboardInterrupt
+
+    with monkeypatch.context() as m:
+        m.setattr(JobQueue, "fail", kill)
+        with pytest.raises(KeyboardInterrupt):
+            queue.reclaim_stale("reclaimer")
+
+    # the job is not lost, the interrupted reclaimer holds its claim instead
+    claims = [p.name for p in queue.claimed_dir.iterdir()]
+    assert claims == ["exp--var--1.yaml@reclaimer"]
+    assert queue.reclaim_stale("worker") == 0
+    time.sleep(STALE_AFTER)
+    assert queue.reclaim_stale("worker") == 1
+
+    job = queue.claim("worker")
+    assert job is not None
+    assert job.attempts == 2
+    assert not any(queue.claimed_dir.glob("*@reclaimer"))
@@ -0,0 +1,88 @@
+from dataclasses import replace
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from analysis.provider.result_collector import collect_experiment_results
+from analysis.provider.result_synthesizer import (
+    synthesize_experiment_results,
+    write_results_tree,
+)
+from app.config import Config
+from app.runner.run_cache import (
+    LOG_FILE,
+    SOURCE_FILE,
+    RunCache,
+    read_run_key,
+    run_key,
+    write_run_key,
+)
+from app.utils.logging import log_parts_dir
+from app.utils.resource_sampler import RESOURCES_FILE
+from app.utils.run_state import is_complete, mark_complete
+
+CONFIG = Config(experiment="exp", variant="var", run=1)
+
+
+def test_run_key_ignores_cosmetic_fields() -> None:
+    cosmetic = replace(
+        CONFIG,
+        experiment="other",
+        variant="other",
+        model_save_interval=100,
+        video_record_interval=10,
+        resource_sample_interval=None,
+    )
+    assert run_key(cosmetic) == run_key(CONFIG)
+    # so does the run count, unless the runs are trained together
+    assert run_key(replace(CONFIG, run_count=5)) == run_key(CONFIG)
+    multi_seed = replace(CONFIG, multi_seed=True)
+    assert run_key(replace(multi_seed, run_count=5)) != run_key(multi_seed)
+
+    assert run_key(replace(CONFIG, run=2)) != run_key(CONFIG)
+    assert run_key(replace(CONFIG, alpha=2 * CONFIG.alpha)) != run_key(CONFIG)
+
+
+@pytest.fixture
+def results_dir(tmp_path: Path) -> Path:
+    """Provide a results dir holding a completed run of `CONFIG`."""
+    results_dir = tmp_path / "results"
+    result_df = synthesize_experiment_results([CONFIG.variant], 1, 50, seed=0)
+    write_results_tree(result_df, results_dir / CONFIG.experiment, columnar=True)
+    run_dir = results_dir / CONFIG.experiment / CONFIG.variant / str(CONFIG.run)
+    (run_dir / RESOURCES_FILE).write_text("elapsed,rss\n1.0,1024\n")
+    (run_dir / "model").mkdir()
+    write_run_key(run_dir, run_key(CONFIG))
+    mark_complete(run_dir)
+    return results_dir
+
+
+def test_materialize_relabeled_results(results_dir: Path) -> None:
+    source_dir = results_dir / CONFIG.experiment / CONFIG.variant / str(CONFIG.run)
+    config = replace(CONFIG, experiment="other", variant="copy")
+    run_dir = results_dir / config.experiment / config.variant / str(config.run)
+    # the artifacts of a run trained in the run dir before
+    (run_dir / "model").mkdir(parents=True)
+    (run_dir / "video").mkdir()
+    (run_dir / "error.log").touch()
+    cache = RunCache(results_dir)
+
+    assert cache.lookup(config) == source_dir
+    cache.materialize(config, run_dir)
+
+    source_df = collect_experiment_results(results_dir / CONFIG.experiment)
+    result_df = collect_experiment_results(results_dir / config.experiment)
+    assert (result_df["experiment"] == "other").all()
+    assert (result_df["variant"] == "copy").all()
+    columns = ["episode", "run", "reward"]
+    pd.testing.assert_frame_equal(result_df[columns], source_df[columns])
+    assert (run_dir / RESOURCES_FILE).read_text() == (
+        source_dir / RESOURCES_FILE
+    ).read_text()
+    assert [d for d in run_dir.iterdir() if d.is_dir()] == [
+        log_parts_dir(run_dir / LOG_FILE)
+    ]
+    assert not (run_dir / "error.log").exists()
+    assert (run_dir / SOURCE_FILE).read_text() == "../../../exp/var/1"
+    assert read_run_key(run_dir) == run_key(CONFIG)
+    assert is_complete(run_dir)
@@ -0,0 +1,157 @@
+import os
+import signal
+import time
+from functools import partial
+from pathlib import Path
+
+import app.__main__ as cli
+import pytest
+from app.config import Config
+from app.runner.resources import NodeBudget, estimate_run_memory
+from app.runner.scheduler import RunFailure, RunScheduler
+
+# seconds a run takes, long enough for concurrent runs to overlap
+RUN_SECONDS = 0.5
+
+
+def conduct(out_dir: Path, config: Config) -> None:
+    """Conduct a run by recording its attempt and its time span, the first attempt
+    of a `crash` run kills the worker, of a `flaky` run fails, a `broken` run always
+    fails."""
+    attempts = list(out_dir.glob(f"{config.variant}.*"))
+    record = out_dir / f"{config.variant}.{len(attempts)}"
+    start = time.monotonic()
+    record.write_text(f"{start}")
+    if config.variant == "crash" and not attempts:
+        os.kill(os.getpid(), signal.SIGKILL)
+    if config.variant == "broken" or (config.variant == "flaky" and not attempts):
+        raise RuntimeError(f"{config.variant} run")
+    time.sleep(RUN_SECONDS)
+    record.write_text(f"{start} {time.monotonic()}")
+
+
+def spans(out_dir: Path) -> dict[str, tuple[float, float]]:
+    """Read the time spans of the successful attempts, by variant."""
+    return {
+        f.name.split(".")[0]: tuple(map(float, f.read_text().split()))
+        for f in out_dir.iterdir()
+        if " " in f.read_text()
+    }
+
+
+def max_concurrency(out_dir: Path) -> int:
+    """Count the most runs running at once."""
+    ranges = spans(out_dir).values()
+    return max(sum(s <= start < e for s, e in ranges) for start, _ in ranges)
+
+
+def make_configs(variants: list[str], **kwargs) -> list[Config]:
+    return [Config(experiment="exp", variant=v, run=1, **kwargs) for v in variants]
+
+
+def schedule(
+    tmp_path: Path, budget: NodeBudget, configs: list[Config]
+) -> tuple[list[RunFailure], Path]:
+    """Conduct the runs by a scheduler, returning its failures and the records."""
+    out_dir = tmp_path / "out"
+    out_dir.mkdir()
+    with RunScheduler(budget) as scheduler:
+        failures = scheduler.run(partial(conduct, out_dir), configs)
+    return failures, out_dir
+
+
+def test_admit_runs_by_cpus(tmp_path: Path) -> None:
+    budget = NodeBudget((0, 1, 2, 3), 2**50, threads_per_run=2)
+
+    failures, out_dir = schedule(tmp_path, budget, make_configs(list("abcd")))
+
+    assert not failures
+    assert len(spans(out_dir)) == 4
+    assert max_concurrency(out_dir) == 2
+
+
+def test_admit_runs_by_memory(tmp_path: Path) -> None:
+    configs = make_configs(list("abcd"))
+    budget = NodeBudget((0, 1, 2, 3), 2 * estimate_run_memory(configs[0]))
+
+    failures, out_dir = schedule(tmp_path, budget, configs)
+
+    assert not failures
+    assert len(spans(out_dir)) == 4
+    assert max_concurrency(out_dir) == 2
+
+
+def test_run_exceeding_memory_exclusively(tmp_path: Path) -> None:
+    configs = make_configs(["large"], memory_size=10**7) + make_configs(list("ab"))
+    budget = NodeBudget((0, 1, 2), 2 * estimate_run_memory(configs[1]))
+
+    failures, out_dir = schedule(tmp_path, budget, configs)
+
+    assert not failures
+    large_start, large_end = spans(out_dir).pop("large")
+    # the large run is admitted first, as the most expensive, but only on its own
+    assert all(large_end <= s for s, _ in spans(out_dir).values() if s > large_start)
+    assert max_concurrency(out_dir) == 2
+
+
+def test_schedule_longest_first(tmp_path: Path) -> None:
+    budget = NodeBudget((0,), 2**50)
+    configs = [
+        Config(experiment="exp", variant=f"var_{episodes}", run=1, episodes=episodes)
+        for episodes in (100, 300, 200)
+    ]
+
+    failures, out_dir = schedule(tmp_path, budget, configs)
+
+    assert not failures
+    order = sorted(spans(out_dir).items(), key=lambda item: item[1][0])
+    assert [variant for variant, _ in order] == ["var_300", "var_200", "var_100"]
+
+
+def test_retry_failing_runs_once(tmp_path: Path) -> None:
+    budget = NodeBudget((0, 1), 2**50)
+
+    failures, out_dir = schedule(
+        tmp_path, budget, make_configs(["flaky", "broken", "ok"])
+    )
+
+    # the flaky run succeeds in its retry, the broken run fails without affecting
+    # the other runs
+    assert set(spans(out_dir)) == {"flaky", "ok"}
+    assert len(list(out_dir.glob("flaky.*"))) == 2
+    assert len(list(out_dir.glob("broken.*"))) == 2
+    assert [f.config.variant for f in failures] == ["broken"]
+    assert failures[0].attempts == 2
+    assert "RuntimeError: broken run" in failures[0].error
+
+
+def test_save_failures_to_error_log(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    budget = NodeBudget((0,), 2**50)
+    failures, _ = schedule(tmp_path, budget, make_configs(["broken"]))
+    monkeypatch.setattr(cli, "RESULTS_DIR", tmp_path / "results")
+
+    cli.save_failures(failures)
+
+    error_log = tmp_path / "results" / "exp" / "broken" / "1" / "error.log"
+    assert error_log.read_text() == f"Attempts: 2\n\n{failures[0].error}"
+
+
+def test_replace_broken_pool(tmp_path: Path) -> None:
+    budget = NodeBudget((0, 1), 2**50)
+    out_dir = tmp_path / "out"
+    out_dir.mkdir()
+
+    with RunScheduler(budget) as scheduler:
+        executor = scheduler.executor
+        failures = scheduler.run(
+            partial(conduct, out_dir), make_configs(["crash", "ok"])
+        )
+        # the pool broken by the crashed worker is replaced, for later calls too
+        assert scheduler.executor is not executor
+        failures += scheduler.run(partial(conduct, out_dir), make_configs(["later"]))
+
+    assert not failures
+    assert set(spans(out_dir)) == {"crash", "ok", "later"}
+    assert len(list(out_dir.glob("crash.*"))) == 2
@@ -0,0 +1,61 @@
+from pathlib import Path
+
+import pytest
+import torch
+from app.utils import checkpoint
+from app.utils.checkpoint import CheckpointWriter, load_checkpoint, save_checkpoint
+
+
+def make_state(value: float) -> dict[str, torch.Tensor]:
+    return {"weight": torch.full((4, 4), value)}
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_keep_most_recent_checkpoints(tmp_path: Path, compress: bool) -> None:
+    with CheckpointWriter(keep=2, compress=compress) as writer:
+        paths = [writer.submit(make_state(i), tmp_path / f"{i}.pth") for i in range(5)]
+
+    assert sorted(tmp_path.iterdir()) == paths[-2:]
+    assert len(writer.stats) == 5
+    for i, path in enumerate(paths[-2:], 3):
+        assert torch.equal(load_checkpoint(path)["weight"], make_state(i)["weight"])
+
+
+def test_snapshot_state_on_submit(tmp_path: Path) -> None:
+    state = make_state(1)
+
+    with CheckpointWriter() as writer:
+        path = writer.submit(state, tmp_path / "1.pth")
+        state["weight"].fill_(2)  # training continues meanwhile
+
+    assert torch.equal(load_checkpoint(path)["weight"], make_state(1)["weight"])
+
+
+def test_save_checkpoint_atomically(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    path = tmp_path / "1.pth"
+    save_checkpoint(make_state(1), path)
+
+    def crash(_, file: Path) -> None:
+        file.write_bytes(b"partial")
+        raise OSError("disk full")
+
+    # a crash while writing keeps the previous checkpoint intact
+    with monkeypatch.context() as m:
+        m.setattr(checkpoint.torch, "save", crash)
+        with pytest.raises(OSError):
+            save_checkpoint(make_state(2), path)
+    assert torch.equal(load_checkpoint(path)["weight"], make_state(1)["weight"])
+
+    save_checkpoint(make_state(2), path)
+    assert torch.equal(load_checkpoint(path)["weight"], make_state(2)["weight"])
+    assert sorted(tmp_path.iterdir()) == [path]
+
+
+def test_raise_error_of_writer(tmp_path: Path) -> None:
+    writer = CheckpointWriter()
+    writer.submit(make_state(1), tmp_path / "missing" / "1.pth")
+
+    with pytest.raises(RuntimeError, match="Writing checkpoint failed"):
+        writer.close()
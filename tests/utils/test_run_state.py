@@ -0,0 +1,62 @@
+import random
+from pathlib import Path
+
+import numpy as np
+import torch
+from app.agents import DqnAbstractAgent, make_agent
+from app.memory import Transition
+from app.nets import make_net
+from app.utils.run_state import has_snapshot, load_snapshot, save_snapshot
+
+
+def make_trained_agent(seed: int) -> DqnAbstractAgent:
+    """Create an agent which learned from a few random transitions."""
+    torch.manual_seed(seed)
+    rng = np.random.default_rng(seed)
+    agent = make_agent(
+        "double_dqn",
+        net=make_net("linear_flat_net"),
+        state_shape=(1, 8, 8),
+        action_space=3,
+        memory_size=100,
+        batch_size=4,
+        target_net_update_interval=3,
+    )
+    for _ in range(20):
+        state = rng.random((1, 8, 8), dtype=np.float32)
+        agent.remember(Transition(state, int(rng.integers(3)), 1.0, state, False))
+        agent.replay()
+    agent.epsilon = 0.5
+    return agent
+
+
+def draw_random() -> tuple:
+    return random.random(), np.random.random(), torch.rand(1).item()
+
+
+def test_resume_from_snapshot(tmp_path: Path) -> None:
+    agent = make_trained_agent(0)
+    save_snapshot(tmp_path, 10, agent)
+    expected_losses = [agent.replay() for _ in range(3)]
+    expected_draws = draw_random()
+
+    resumed = make_trained_agent(1)
+    assert has_snapshot(tmp_path)
+    assert load_snapshot(tmp_path, resumed) == 10
+
+    # training continues as if not interrupted, from the same weights, optimizer
+    # state, replay memory and states of the random number generators
+    assert resumed.epsilon == 0.5
+    assert len(resumed.memory) == 20
+    assert [resumed.replay() for _ in range(3)] == expected_losses
+    assert draw_random() == expected_draws
+
+
+def test_discard_invalid_snapshot(tmp_path: Path) -> None:
+    agent = make_trained_agent(0)
+    save_snapshot(tmp_path, 10, agent)
+    # e.g. as the disk was full while copying it
+    for file in (tmp_path / "snapshot").glob("replay_*.bin"):
+        file.write_bytes(file.read_bytes()[:-1])
+
+    assert load_snapshot(tmp_path, make_trained_agent(1)) is None